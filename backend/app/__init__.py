@@ -19,6 +19,39 @@ def create_app(config_class=Config):
     migrate.init_app(app, db)
     bcrypt.init_app(app)
 
+    from .utils.passwords import password_hasher
+    password_hasher.init_app(app)
+
+    from .utils import db_pool
+    db_pool.init_app(app)
+
+    from .utils.metrics import metrics
+    metrics.init_app(app)
+
+    from .utils.skill_index import skill_index
+    skill_index.init_app(app)
+
+    from .utils.skill_catalog import skill_catalog
+    skill_catalog.init_app(app)
+
+    from .utils.user_search import user_search
+    user_search.init_app(app)
+
+    from .utils.user_count import user_count
+    user_count.init_app(app)
+
+    from .utils.skill_typeahead import skill_typeahead
+    skill_typeahead.init_app(app)
+
+    from .utils.pubsub import pubsub
+    pubsub.init_app(app)
+
+    from .utils.message_writer import message_writer
+    message_writer.init_app(app)
+
+    from .utils.match_store import match_worker
+    match_worker.init_app(app)
+
     
     # Configure CORS with more permissive settings for development
     CORS(app, 
@@ -28,7 +61,7 @@ def create_app(config_class=Config):
                  "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
                  "allow_headers": ["Content-Type", "Authorization", "X-Requested-With", "Accept"],
                  "supports_credentials": True,
-                 "expose_headers": ["Content-Type", "X-Total-Count", "Content-Disposition"],
+                 "expose_headers": ["Content-Type", "X-Total-Count", "X-Next-Cursor", "Content-Disposition", "Server-Timing"],
                  "max_age": 600  # Cache preflight request for 10 minutes
              }
          })
@@ -40,6 +73,24 @@ def create_app(config_class=Config):
     except ImportError as e:
         print(f"Error importing models: {e}")
 
+    from . import auth
+    auth.init_app(app)
+
+    from .utils import serializers
+    serializers.init_app(app)
+
+    from .utils import query_plans
+    query_plans.init_app(app)
+
+    from .utils import barter_cycles
+    barter_cycles.init_app(app)
+
+    from .utils import user_import
+    user_import.init_app(app)
+
+    from .utils import user_export
+    user_export.init_app(app)
+
     # Register blueprints
     from .routes.auth import auth_bp
     from .routes.profile import profile_bp
@@ -57,7 +108,7 @@ def create_app(config_class=Config):
     app.register_blueprint(portfolio_bp, url_prefix='/api/portfolio')
     app.register_blueprint(matches_bp, url_prefix='/api')
     app.register_blueprint(chat_bp, url_prefix='/api/chat')
-    app.register_blueprint(skills_bp, url_prefix='/api')
+    app.register_blueprint(skills_bp)
     app.register_blueprint(sessions_bp, url_prefix='/api/sessions')
     app.register_blueprint(matching_bp, url_prefix='/api/matching')
     app.register_blueprint(users_bp)
@@ -1,21 +1,206 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+
+import jwt
+from flask import current_app, g, jsonify, request
 from flask_httpauth import HTTPTokenAuth
+
 from app.models import User
 from app import db
 
 token_auth = HTTPTokenAuth(scheme='Bearer')
 
-@token_auth.verify_token
+# Cheap projection of the authenticated user, built from the token claims only
+Identity = namedtuple('Identity', ['user_id', 'claims'])
+
+
+class AuthError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a per-entry deadline"""
+
+    def __init__(self, maxsize=10000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+claims_cache = TTLCache()
+
+
+def init_app(app):
+    claims_cache.maxsize = app.config.get('AUTH_CLAIMS_CACHE_SIZE', 10000)
+    claims_cache.ttl = app.config.get('AUTH_CLAIMS_CACHE_TTL', 300)
+    claims_cache.clear()
+
+
 def verify_token(token):
+    """
+    Verify an HS256 token and return its claims
+
+    Verified claims are cached by token digest until the cache TTL or the
+    token's own expiry, whichever comes first.
+
+    Raises:
+        AuthError: if the token is expired or invalid
+    """
+    key = hashlib.sha256(token.encode('utf-8')).digest()
+    claims = claims_cache.get(key)
+    if claims is not None:
+        if claims.get('exp', float('inf')) > time.time():
+            return claims
+        raise AuthError('Token has expired!')
+
+    try:
+        claims = jwt.decode(
+            token,
+            current_app.config.get('JWT_SECRET_KEY'),
+            algorithms=['HS256']
+        )
+    except jwt.ExpiredSignatureError:
+        raise AuthError('Token has expired!')
+    except jwt.InvalidTokenError:
+        raise AuthError('Invalid token!')
+
+    expires_in = claims['exp'] - time.time() if 'exp' in claims else None
+    claims_cache.set(key, claims, ttl=expires_in)
+    return claims
+
+
+def _token_from_request():
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        return auth_header[len('Bearer '):].strip() or None
+    return None
+
+
+def authenticate(token=None):
+    """
+    Authenticate the current request once and memoize the result on `g`
+
+    Returns:
+        Identity: the authenticated identity
+
+    Raises:
+        AuthError: if the token is missing, expired or invalid
+    """
+    identity = g.get('identity')
+    if identity is not None:
+        return identity
+
+    token = token or _token_from_request()
+    if not token:
+        raise AuthError('Token is missing!')
+    claims = verify_token(token)
+    try:
+        user_id = int(claims['sub'])
+    except (KeyError, TypeError, ValueError):
+        raise AuthError('Invalid token subject.')
+
+    g.identity = Identity(user_id=user_id, claims=claims)
+    return g.identity
+
+
+def current_identity():
+    """The authenticated identity for this request, without a DB round trip"""
+    return authenticate()
+
+
+def load_current_user():
+    """
+    The authenticated User for this request, loaded at most once per request
+
+    Raises:
+        AuthError: if authentication fails or the user no longer exists
+    """
+    if 'current_user' in g:
+        return g.current_user
+    identity = authenticate()
+    # Skill collections load on first access instead of with every request
+    user = db.session.get(User, identity.user_id, options=[
+        db.lazyload(User.offered_skills),
+        db.lazyload(User.required_skills)
+    ])
+    if user is None:
+        raise AuthError('User not found!')
+    g.current_user = user
+    return user
+
+
+def token_required(f):
+    """Authenticate the request and pass the current User as the first argument"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        try:
+            current_user = load_current_user()
+        except AuthError as e:
+            return jsonify({'message': e.message}), 401
+        return f(current_user, *args, **kwargs)
+    return decorated
+
+
+def identity_required(f):
+    """Like token_required, but passes the Identity so no user row is loaded"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        try:
+            identity = current_identity()
+        except AuthError as e:
+            return jsonify({'message': e.message}), 401
+        return f(identity, *args, **kwargs)
+    return decorated
+
+
+@token_auth.verify_token
+def verify_bearer_token(token):
     if not token:
         return None
-    user = User.verify_auth_token(token)
-    if not user:
+    try:
+        authenticate(token)
+        return load_current_user()
+    except AuthError:
         return None
-    return user
 
 @token_auth.get_user_roles
 def get_user_roles(user):
     return []
-
-def init_app(app):
-    pass
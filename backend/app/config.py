@@ -15,6 +15,73 @@ class Config:
         f"{os.environ.get('MYSQL_HOST')}/"
         f"{os.environ.get('MYSQL_DB')}"
     )
-    print(f"Database URI: {SQLALCHEMY_DATABASE_URI}")  # Debug output
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'super-secret-key-for-dev'
\ No newline at end of file
+    # Shared connection pool used by the app and the analytics/matcher code
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true',
+        # Sessions run in UTC, so CURRENT_TIMESTAMP defaults and the app's
+        # utcnow() values agree and TIMESTAMP columns read back as UTC
+        'connect_args': {'init_command': "SET time_zone = '+00:00'"},
+    }
+    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'super-secret-key-for-dev'
+    # bcrypt cost; existing hashes are upgraded on the next successful login
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    # Password hashing process pool: workers (0 = hash inline), queued jobs
+    # before logins/signups get a 503, and per-job timeout in seconds
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 0)) or PASSWORD_HASH_WORKERS * 4
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    # Verified token claims are cached per process by token digest
+    AUTH_CLAIMS_CACHE_SIZE = int(os.environ.get('AUTH_CLAIMS_CACHE_SIZE', 10000))
+    AUTH_CLAIMS_CACHE_TTL = int(os.environ.get('AUTH_CLAIMS_CACHE_TTL', 300))
+    # Seconds before the in-memory skill index is rebuilt to pick up changes
+    # committed by other worker processes (0 disables the rebuild)
+    SKILL_INDEX_MAX_AGE = int(os.environ.get('SKILL_INDEX_MAX_AGE', 300))
+    # Same for the in-memory user search index
+    SEARCH_INDEX_MAX_AGE = int(os.environ.get('SEARCH_INDEX_MAX_AGE', 300))
+    # Seconds the approximate user count behind GET /api/users' X-Total-Count is cached
+    USER_COUNT_TTL = int(os.environ.get('USER_COUNT_TTL', 60))
+    # Suggestions kept per prefix, and seconds between re-ranking them by popularity
+    SKILL_TYPEAHEAD_TOP_K = int(os.environ.get('SKILL_TYPEAHEAD_TOP_K', 10))
+    SKILL_TYPEAHEAD_RESCORE_INTERVAL = int(os.environ.get('SKILL_TYPEAHEAD_RESCORE_INTERVAL', 60))
+    # Build the typeahead trie in a background thread when a worker starts serving
+    # (see gunicorn.conf.py) or on the first request, instead of on first use
+    SKILL_TYPEAHEAD_PRELOAD = os.environ.get('SKILL_TYPEAHEAD_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+    # Chat stream: seconds between keep-alive comments, and messages buffered
+    # per subscriber before a slow client is told to resync
+    CHAT_STREAM_HEARTBEAT = int(os.environ.get('CHAT_STREAM_HEARTBEAT', 15))
+    PUBSUB_SUBSCRIBER_BUFFER = int(os.environ.get('PUBSUB_SUBSCRIBER_BUFFER', 1000))
+    # Redis relaying chat messages between worker processes (redis://host:6379/0);
+    # unset, a stream only sees messages sent through its own process
+    PUBSUB_REDIS_URL = os.environ.get('PUBSUB_REDIS_URL')
+    PUBSUB_REDIS_PREFIX = os.environ.get('PUBSUB_REDIS_PREFIX', 'pubsub:')
+    # Chat write-behind: messages are inserted in batches of up to
+    # CHAT_WRITE_BATCH_SIZE rows, at most CHAT_WRITE_FLUSH_INTERVAL seconds after
+    # the first is queued. Senders wait CHAT_WRITE_ENQUEUE_TIMEOUT seconds for
+    # room in a full buffer before getting a 503, and up to CHAT_WRITE_ACK_TIMEOUT
+    # seconds for their batch to commit.
+    CHAT_WRITE_BEHIND = os.environ.get('CHAT_WRITE_BEHIND', 'true').lower() in ('1', 'true', 'yes')
+    CHAT_WRITE_BATCH_SIZE = int(os.environ.get('CHAT_WRITE_BATCH_SIZE', 500))
+    CHAT_WRITE_FLUSH_INTERVAL = float(os.environ.get('CHAT_WRITE_FLUSH_INTERVAL', 0.005))
+    CHAT_WRITE_MAX_PENDING = int(os.environ.get('CHAT_WRITE_MAX_PENDING', 10000))
+    CHAT_WRITE_ENQUEUE_TIMEOUT = float(os.environ.get('CHAT_WRITE_ENQUEUE_TIMEOUT', 0.5))
+    CHAT_WRITE_ACK_TIMEOUT = float(os.environ.get('CHAT_WRITE_ACK_TIMEOUT', 10))
+    # match_candidates upkeep: refresh changed users in a background thread,
+    # MATCH_CANDIDATES_DEBOUNCE seconds after the first change (False: inline)
+    MATCH_CANDIDATES_WORKER = os.environ.get('MATCH_CANDIDATES_WORKER', 'true').lower() in ('1', 'true', 'yes')
+    MATCH_CANDIDATES_DEBOUNCE = float(os.environ.get('MATCH_CANDIDATES_DEBOUNCE', 0.05))
+    # Statements slower than this (seconds) are logged with their route. GET
+    # /metrics serves Prometheus metrics with the METRICS_TOKEN bearer token
+    # (unset: not served); METRICS_ENDPOINT=false turns it off regardless
+    SLOW_QUERY_SECONDS = float(os.environ.get('SLOW_QUERY_SECONDS', 0.5))
+    METRICS_ENDPOINT = os.environ.get('METRICS_ENDPOINT', 'true').lower() in ('1', 'true', 'yes')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    # GET /api/users/export is only served with this bearer token (unset:
+    # disabled, use `flask export-users`), to at most EXPORT_MAX_CONCURRENT
+    # clients at once per process (each holds two pooled connections)
+    EXPORT_TOKEN = os.environ.get('EXPORT_TOKEN')
+    EXPORT_MAX_CONCURRENT = int(os.environ.get('EXPORT_MAX_CONCURRENT', 2))
@@ -4,3 +4,7 @@ from .portfolio import Portfolio
 from .barter_session import BarterSession, Feedback
 from .skill import Skill
 from .message import Message
+from .reputation import UserReputation
+from .match_candidate import MatchCandidate
+from .barter_cycle import BarterCycle, BarterCycleMember
+from .data_version import DataVersion, skill_tombstones
@@ -0,0 +1,51 @@
+import datetime
+
+from app import db
+
+
+class BarterCycle(db.Model):
+    """
+    A ring exchange found by the offline cycle search (app.utils.barter_cycles)
+
+    Every member teaches the next one (the last teaches the first). Each run
+    of the search writes a new `generation` and drops the older ones in one
+    transaction, so readers only look at the latest generation.
+    """
+    __tablename__ = 'barter_cycles'
+    __table_args__ = (
+        db.Index('ix_barter_cycles_generation', 'generation'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    generation = db.Column(db.Integer, nullable=False)
+    length = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow, server_default=db.func.now())
+
+    members = db.relationship('BarterCycleMember', backref='cycle', lazy=True,
+                              order_by='BarterCycleMember.position')
+
+    @classmethod
+    def latest_generation(cls):
+        return db.session.query(db.func.max(cls.generation)).scalar()
+
+    def __repr__(self):
+        return f'<BarterCycle {self.id}: {[m.user_id for m in self.members]}>'
+
+
+class BarterCycleMember(db.Model):
+    __tablename__ = 'barter_cycle_members'
+    __table_args__ = (
+        # Finds a user's cycles
+        db.Index('ix_barter_cycle_members_user_cycle', 'user_id', 'cycle_id'),
+    )
+    cycle_id = db.Column(db.Integer, db.ForeignKey('barter_cycles.id'), primary_key=True)
+    position = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    # A deleted user's rings are skipped until the next search replaces them
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    # Skill this member teaches the next member of the cycle
+    skill_id = db.Column(db.Integer, db.ForeignKey('skills.id'), nullable=False)
+
+    user = db.relationship('User')
+    skill = db.relationship('Skill')
+
+    def __repr__(self):
+        return f'<BarterCycleMember {self.cycle_id}/{self.position}: {self.user_id}>'
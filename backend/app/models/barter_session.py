@@ -1,18 +1,29 @@
+import datetime
+
 from app import db
 from .user import User
 from .skill import Skill
 
 class BarterSession(db.Model):
     __tablename__ = 'barter_sessions'
+    __table_args__ = (
+        # Covers the duplicate-session check in create_barter_session
+        db.Index('ix_barter_sessions_duplicate', 'requester_id', 'provider_id',
+                 'offered_skill_id', 'requested_skill_id', 'status'),
+        db.Index('ix_barter_sessions_provider_status', 'provider_id', 'status'),
+    )
+    STATUSES = ('pending', 'accepted', 'rejected', 'completed', 'cancelled')
     
     id = db.Column(db.Integer, primary_key=True)
     requester_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     provider_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     offered_skill_id = db.Column(db.Integer, db.ForeignKey('skills.id'), nullable=False)
     requested_skill_id = db.Column(db.Integer, db.ForeignKey('skills.id'), nullable=False)
-    status = db.Column(db.Enum('pending', 'accepted', 'rejected', 'completed', 'cancelled'), 
-                      default='pending', nullable=False)
-    created_at = db.Column(db.TIMESTAMP, server_default=db.func.now())
+    status = db.Column(db.Enum(*STATUSES), default='pending', nullable=False)
+    # Set by the app (UTC, like CURRENT_TIMESTAMP in the UTC sessions pinned
+    # by Config.SQLALCHEMY_ENGINE_OPTIONS) so keyset cursors compare correctly
+    # on SQLite too
+    created_at = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow, server_default=db.func.now())
 
     # Relationships
     requester = db.relationship('User', foreign_keys=[requester_id], 
@@ -22,11 +33,27 @@ class BarterSession(db.Model):
     offered_skill = db.relationship('Skill', foreign_keys=[offered_skill_id])
     requested_skill = db.relationship('Skill', foreign_keys=[requested_skill_id])
 
+    @classmethod
+    def open_duplicate_query(cls, requester_id, provider_id, offered_skill_id, requested_skill_id):
+        """Pending or accepted sessions for the same users and skills"""
+        return cls.query.filter(
+            cls.requester_id == requester_id,
+            cls.provider_id == provider_id,
+            cls.offered_skill_id == offered_skill_id,
+            cls.requested_skill_id == requested_skill_id,
+            cls.status.in_(['pending', 'accepted'])
+        )
+
     def __repr__(self):
-        return f'<BarterSession {self.id}: {self.requester.name} -> {self.provider.name}>'
+        # Ids only: names would lazy-load both users
+        return f'<BarterSession {self.id}: {self.requester_id} -> {self.provider_id}>'
 
 class Feedback(db.Model):
     __tablename__ = 'feedback'
+    __table_args__ = (
+        # One rating per participant and session, so reputations count each once
+        db.UniqueConstraint('session_id', 'reviewer_id', name='uq_feedback_session_reviewer'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('barter_sessions.id'), nullable=False)
@@ -0,0 +1,58 @@
+from sqlalchemy import DDL, event, insert, select, update
+
+from app import db
+
+# Users deleted at a skills version, so incremental readers of the skill
+# tables can drop them (their users row, and with it skills_version, is gone)
+skill_tombstones = db.Table('skill_tombstones',
+    db.Column('version', db.BigInteger, primary_key=True, autoincrement=False),
+    db.Column('user_id', db.Integer, primary_key=True, autoincrement=False)
+)
+
+
+class DataVersion(db.Model):
+    """
+    Named counters bumped in the same transaction as the data they version.
+
+    ``bump`` is an UPDATE of the counter row, which keeps the row locked
+    until the transaction ends, so versions are committed in the order they
+    are handed out: once a reader sees version N, every change numbered N or
+    lower is visible too. Timestamps give no such guarantee, as a
+    transaction can commit after a later one with an earlier timestamp.
+    """
+    __tablename__ = 'data_versions'
+    SKILLS = 'skills'
+    # Generations of barter_cycles (app.utils.barter_cycles)
+    BARTER_CYCLES = 'barter_cycles'
+    NAMES = (SKILLS, BARTER_CYCLES)
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+    @classmethod
+    def bump(cls, connection, name):
+        """Increment counter `name` in `connection`'s transaction and return the new value"""
+        table = cls.__table__
+        result = connection.execute(
+            update(table).where(table.c.name == name).values(version=table.c.version + 1)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(name=name, version=1))
+            return 1
+        return connection.execute(select(table.c.version).where(table.c.name == name)).scalar_one()
+
+    @classmethod
+    def current(cls, connection, name):
+        table = cls.__table__
+        return connection.execute(select(table.c.version).where(table.c.name == name)).scalar() or 0
+
+    def __repr__(self):
+        return f'<DataVersion {self.name}={self.version}>'
+
+
+# Tables made by create_all start with the counter rows, so the first bumps
+# never race on inserting them
+event.listen(DataVersion.__table__, 'after_create', DDL(
+    'INSERT INTO data_versions (name, version) VALUES '
+    + ', '.join(f"('{name}', 0)" for name in DataVersion.NAMES)
+))
@@ -0,0 +1,60 @@
+import datetime
+
+from app import db
+
+
+def _join_ids(ids):
+    return ','.join(str(i) for i in sorted(ids))
+
+
+def _split_ids(value):
+    return [int(i) for i in value.split(',') if i] if value else []
+
+
+class MatchCandidate(db.Model):
+    """
+    Materialized reciprocal match: `candidate_id` offers at least one skill
+    `user_id` requires and requires at least one skill `user_id` offers.
+
+    Both directions of a pair are stored, so a user's matches are one range
+    read of the primary key. Rows are maintained by app.utils.match_store.
+    """
+    __tablename__ = 'match_candidates'
+    __table_args__ = (
+        # Finds the rows pointing at a user whose skills changed
+        db.Index('ix_match_candidates_candidate_id', 'candidate_id'),
+    )
+    # Deleted with either user
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    candidate_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    score = db.Column(db.Integer, nullable=False)
+    # Comma-separated skill ids the candidate offers that the user requires
+    offered_skill_ids = db.Column(db.Text, nullable=False)
+    # Comma-separated skill ids the candidate requires that the user offers
+    required_skill_ids = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    candidate = db.relationship('User', foreign_keys=[candidate_id])
+
+    @staticmethod
+    def row(user_id, candidate_id, offered_ids, required_ids):
+        """Column values for a Core insert"""
+        return {
+            'user_id': user_id,
+            'candidate_id': candidate_id,
+            'score': len(offered_ids) + len(required_ids),
+            'offered_skill_ids': _join_ids(offered_ids),
+            'required_skill_ids': _join_ids(required_ids),
+            'updated_at': datetime.datetime.utcnow(),
+        }
+
+    @property
+    def offered_ids(self):
+        return _split_ids(self.offered_skill_ids)
+
+    @property
+    def required_ids(self):
+        return _split_ids(self.required_skill_ids)
+
+    def __repr__(self):
+        return f'<MatchCandidate {self.user_id} -> {self.candidate_id} ({self.score})>'
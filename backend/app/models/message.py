@@ -1,12 +1,45 @@
+import datetime
+
 from app import db
 
 class Message(db.Model):
     __tablename__ = 'messages'
+    __table_args__ = (
+        # One conversation direction in time order
+        db.Index('ix_messages_sender_receiver_timestamp', 'sender_id', 'receiver_id', 'timestamp'),
+        # A retried send with the same client_id is stored once
+        db.UniqueConstraint('sender_id', 'client_id', name='uq_messages_sender_client_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     receiver_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    timestamp = db.Column(db.TIMESTAMP, server_default=db.func.now())
+    # Optional id the sender picks per message, to retry sends safely
+    client_id = db.Column(db.String(64), nullable=True)
+    # Set by the app (UTC, like CURRENT_TIMESTAMP in the UTC sessions pinned
+    # by Config.SQLALCHEMY_ENGINE_OPTIONS) so every row has the same precision
+    # and history cursors compare correctly on SQLite too
+    timestamp = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow, server_default=db.func.now())
 
     sender = db.relationship('User', foreign_keys=[sender_id])
     receiver = db.relationship('User', foreign_keys=[receiver_id])
+
+    @classmethod
+    def conversation_query(cls, user_id, other_id):
+        """Messages between two users, newest first"""
+        return cls.query.filter(
+            db.or_(
+                db.and_(cls.sender_id == user_id, cls.receiver_id == other_id),
+                db.and_(cls.sender_id == other_id, cls.receiver_id == user_id)
+            )
+        ).order_by(cls.timestamp.desc(), cls.id.desc())
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'sender_id': self.sender_id,
+            'receiver_id': self.receiver_id,
+            'content': self.content,
+            'client_id': self.client_id,
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None
+        }
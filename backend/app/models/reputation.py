@@ -0,0 +1,86 @@
+import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+
+# Number of latest ratings kept for the recent average
+RECENT_WINDOW = 10
+
+
+class UserReputation(db.Model):
+    """
+    Running rating totals per user, kept in step with Feedback inserts.
+
+    Updated in the feedback transaction by ``record_rating``, so reading a
+    user's reputation is one row instead of an aggregate over ``feedback``.
+    """
+    __tablename__ = 'user_reputations'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    # Latest ratings first, as comma-separated digits, at most RECENT_WINDOW
+    recent_ratings = db.Column(db.String(64), nullable=False, default='')
+    updated_at = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    # Deleted with the user by the foreign key
+    user = db.relationship('User', backref=db.backref('reputation', uselist=False, lazy=True,
+                                                      passive_deletes=True))
+
+    @classmethod
+    def record_rating(cls, user_id, rating):
+        """
+        Add a rating to `user_id`'s totals in the current transaction
+
+        The row is locked (SELECT ... FOR UPDATE) so concurrent feedback for
+        the same user cannot lose an update. A user's first rating inserts
+        the row in a savepoint: if a concurrent first rating inserted it
+        first, only the savepoint is rolled back and the winner's row is
+        locked instead. Does not commit.
+        """
+        reputation = cls._locked(user_id)
+        if reputation is None:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(cls(user_id=user_id, rating_count=0, rating_sum=0, recent_ratings=''))
+            except IntegrityError:
+                pass
+            reputation = cls._locked(user_id)
+        reputation.rating_count += 1
+        reputation.rating_sum += rating
+        recent = [str(rating)] + reputation.recent[:RECENT_WINDOW - 1]
+        reputation.recent_ratings = ','.join(str(r) for r in recent)
+        return reputation
+
+    @classmethod
+    def _locked(cls, user_id):
+        return cls.query.filter_by(user_id=user_id).with_for_update().populate_existing().first()
+
+    @property
+    def recent(self):
+        return [int(r) for r in self.recent_ratings.split(',') if r] if self.recent_ratings else []
+
+    @property
+    def average(self):
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+    @property
+    def recent_average(self):
+        recent = self.recent
+        return sum(recent) / len(recent) if recent else None
+
+    @staticmethod
+    def summary(reputation):
+        """Payload for a reputation row, or for a user without ratings (None)"""
+        if reputation is None:
+            return {'count': 0, 'average': None, 'recent_average': None}
+        average = reputation.average
+        recent_average = reputation.recent_average
+        return {
+            'count': reputation.rating_count,
+            'average': round(average, 2) if average is not None else None,
+            'recent_average': round(recent_average, 2) if recent_average is not None else None
+        }
+
+    def __repr__(self):
+        return f'<UserReputation {self.user_id}: {self.rating_sum}/{self.rating_count}>'
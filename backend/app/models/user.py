@@ -1,16 +1,23 @@
 import jwt
 import datetime
-from app import db, bcrypt
+from app import db
 from flask import current_app
+from sqlalchemy import event, inspect, insert
+from app.models.data_version import DataVersion, skill_tombstones
+from app.utils.passwords import password_hasher
 
+# The (skill_id, user_id) indexes serve skill -> users lookups; the primary
+# keys only cover user -> skills
 user_offered_skills = db.Table('user_offered_skills',
     db.Column('user_id', db.Integer, db.ForeignKey('users.id'), primary_key=True),
-    db.Column('skill_id', db.Integer, db.ForeignKey('skills.id'), primary_key=True)
+    db.Column('skill_id', db.Integer, db.ForeignKey('skills.id'), primary_key=True),
+    db.Index('ix_user_offered_skills_skill_user', 'skill_id', 'user_id')
 )
 
 user_required_skills = db.Table('user_required_skills',
     db.Column('user_id', db.Integer, db.ForeignKey('users.id'), primary_key=True),
-    db.Column('skill_id', db.Integer, db.ForeignKey('skills.id'), primary_key=True)
+    db.Column('skill_id', db.Integer, db.ForeignKey('skills.id'), primary_key=True),
+    db.Index('ix_user_required_skills_skill_user', 'skill_id', 'user_id')
 )
 
 class User(db.Model):
@@ -21,6 +28,11 @@ class User(db.Model):
     name = db.Column(db.String(100), nullable=False)
     google_id = db.Column(db.String(120), unique=True, nullable=True)
     created_at = db.Column(db.TIMESTAMP, server_default=db.func.now())
+    # Set whenever offered/required skills change
+    skills_updated_at = db.Column(db.TIMESTAMP, nullable=True, index=True)
+    # DataVersion.SKILLS counter value of the latest skill change, for
+    # incremental readers of the skill tables
+    skills_version = db.Column(db.BigInteger, nullable=True, index=True)
 
     profile = db.relationship('Profile', back_populates='user', uselist=False, cascade="all, delete-orphan")
     portfolios = db.relationship('Portfolio', backref='user', lazy=True, cascade="all, delete-orphan")
@@ -29,32 +41,54 @@ class User(db.Model):
     required_skills = db.relationship('Skill', secondary=user_required_skills, lazy='subquery',
                                       backref=db.backref('users_requiring', lazy=True))
 
+    # Hashing runs on the bounded password pool and may raise PasswordHasherBusy
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return password_hasher.check(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
         
     def generate_auth_token(self, expires_in=3600):
         payload = {
             'exp': datetime.datetime.utcnow() + datetime.timedelta(seconds=expires_in),
             'iat': datetime.datetime.utcnow(),
-            'sub': self.id
+            'sub': str(self.id)
         }
         return jwt.encode(
             payload,
-            current_app.config['SECRET_KEY'],
+            current_app.config['JWT_SECRET_KEY'],
             algorithm='HS256'
         )
 
     @staticmethod
     def verify_auth_token(token):
+        from app.auth import AuthError, verify_token
         try:
-            payload = jwt.decode(
-                token,
-                current_app.config['SECRET_KEY'],
-                algorithms=['HS256']
-            )
-            return User.query.get(payload['sub'])
-        except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
+            payload = verify_token(token)
+            return db.session.get(User, int(payload['sub']))
+        except (AuthError, KeyError, TypeError, ValueError):
             return None
+
+
+def _touch_skills(target, value, initiator):
+    target.skills_updated_at = db.func.now()
+    return value
+
+def _version_skills(mapper, connection, target):
+    if inspect(target).attrs.skills_updated_at.history.has_changes():
+        target.skills_version = DataVersion.bump(connection, DataVersion.SKILLS)
+
+def _tombstone_skills(mapper, connection, target):
+    version = DataVersion.bump(connection, DataVersion.SKILLS)
+    connection.execute(insert(skill_tombstones).values(version=version, user_id=target.id))
+
+for _collection in (User.offered_skills, User.required_skills):
+    event.listen(_collection, 'append', _touch_skills, retval=True)
+    event.listen(_collection, 'remove', _touch_skills)
+
+event.listen(User, 'before_insert', _version_skills)
+event.listen(User, 'before_update', _version_skills)
+event.listen(User, 'after_delete', _tombstone_skills)
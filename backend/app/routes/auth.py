@@ -2,9 +2,17 @@ from flask import Blueprint, request, jsonify
 from app import db
 from app.models import User, Profile
 from app.utils.auth import generate_token
+from app.utils.passwords import PasswordHasherBusy
 
 auth_bp = Blueprint('auth', __name__)
 
+@auth_bp.errorhandler(PasswordHasherBusy)
+def password_hasher_busy(e):
+    response = jsonify({'message': 'Server is busy, please try again shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
 @auth_bp.route('/signup', methods=['POST'])
 def signup():
     data = request.get_json()
@@ -37,6 +45,14 @@ def login():
     user = User.query.filter_by(email=email).first()
 
     if user and user.check_password(password):
+        # Transparently upgrade hashes made with an outdated bcrypt cost;
+        # only an optimisation, so a busy pool just defers it to a later login
+        if user.password_needs_rehash():
+            try:
+                user.set_password(password)
+                db.session.commit()
+            except PasswordHasherBusy:
+                pass
         token = generate_token(user.id)
         has_profile = True if user.profile else False
         return jsonify({'token': token, 'userId': user.id, 'has_profile': has_profile})
@@ -1,10 +1,214 @@
-from flask import Blueprint, request, jsonify
+import datetime
+from concurrent.futures import TimeoutError
+
+from flask import Blueprint, Response, current_app, request, jsonify
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app import db
+from app.auth import AuthError, authenticate, identity_required
+from app.models import Message, User
+from app.utils.message_writer import MessageQueueFull, message_writer
+from app.utils.pagination import decode_cursor, encode_cursor, parse_limit
+from app.utils.pubsub import pubsub
+from app.utils.serializers import dumps, json_list_response
 
 chat_bp = Blueprint('chat', __name__)
 
+@chat_bp.errorhandler(MessageQueueFull)
+def message_queue_full(e):
+    response = jsonify({'message': 'Server is busy, please try again shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+# Messages replayed to a reconnecting stream client at most
+REPLAY_LIMIT = 200
+
+
+def user_topic(user_id):
+    return f'user:{user_id}'
+
+
+def publish_messages(payloads):
+    """Fan committed messages out to both participants' streams"""
+    for payload in payloads:
+        pubsub.publish(user_topic(payload['receiver_id']), payload)
+        # The sender's other tabs stay in sync too
+        pubsub.publish(user_topic(payload['sender_id']), payload)
+
+
+message_writer.add_listener(publish_messages)
+
+
+def sse_event(data, event=None, event_id=None):
+    """Encode one server-sent event"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event:
+        lines.append(f'event: {event}')
+    lines.append('data: ' + dumps(data).decode('utf-8'))
+    return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+
 @chat_bp.route('/send', methods=['POST'])
-def send_message():
-    return jsonify({'message': 'Message sent'})
+@identity_required
+def send_message(identity):
+    """
+    Send a message to another user
+
+    Body: {"receiver_id": int, "content": str, "client_id": str (optional)}
+
+    `client_id` is picked by the client per message (a UUID, say). A send
+    repeated with the same one, e.g. after a 503, is stored once: it answers
+    200 with the stored message instead of storing it again.
+
+    Answers 201 with the stored message once its batch has committed: the
+    write-behind buffer is in memory, so an earlier answer could be lost
+    with the process.
+    """
+    data = request.get_json(silent=True) or {}
+    content = (data.get('content') or '').strip()
+    client_id = data.get('client_id')
+    if client_id is not None and not (isinstance(client_id, str) and 0 < len(client_id) <= 64):
+        return jsonify({'error': 'client_id must be a string of at most 64 characters'}), 400
+    try:
+        receiver_id = int(data.get('receiver_id'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'receiver_id is required'}), 400
+    if not content:
+        return jsonify({'error': 'content is required'}), 400
+    if receiver_id == identity.user_id:
+        return jsonify({'error': 'Cannot send a message to yourself'}), 400
+    if db.session.get(User, receiver_id) is None:
+        return jsonify({'error': 'Receiver not found'}), 404
+    if client_id is not None:
+        stored = db.session.scalar(select(Message).where(Message.sender_id == identity.user_id,
+                                                         Message.client_id == client_id))
+        if stored is not None:
+            return jsonify(stored.to_dict()), 200
+    
+    # Don't hold a pooled connection while the writer thread needs one
+    db.session.close()
+    
+    # Batched with other messages into one transaction by the writer thread
+    future = message_writer.submit(identity.user_id, receiver_id, content, client_id)
+    try:
+        payload = future.result(timeout=current_app.config.get('CHAT_WRITE_ACK_TIMEOUT', 10))
+    except TimeoutError:
+        # Still queued and may yet be stored: a retry with the same client_id is safe
+        raise MessageQueueFull('Message was not stored in time')
+    except IntegrityError:
+        # The receiver was deleted after the check above
+        return jsonify({'error': 'Receiver not found'}), 404
+    except SQLAlchemyError:
+        # Logged by the writer thread
+        response = jsonify({'error': 'Message could not be stored, please try again'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        return response
+    return jsonify(payload), 201
+
+@chat_bp.route('/<int:other_id>', methods=['GET'])
+@identity_required
+def get_conversation(identity, other_id):
+    """
+    Messages exchanged with another user, newest first
+
+    Query Parameters:
+        - limit: Page size (default 50, max 100)
+        - cursor: X-Next-Cursor of the previous page, for older messages
+    """
+    try:
+        limit = parse_limit(request.args.get('limit'), default=50)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    before = None
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            timestamp, message_id = decode_cursor(cursor, 2)
+            before = (datetime.datetime.fromisoformat(timestamp), int(message_id))
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+    
+    query = Message.conversation_query(identity.user_id, other_id)
+    if before is not None:
+        # Keyset on (timestamp, id): no OFFSET, so deep pages cost the same
+        timestamp, message_id = before
+        query = query.filter(
+            (Message.timestamp < timestamp) |
+            ((Message.timestamp == timestamp) & (Message.id < message_id))
+        )
+    messages = query.limit(limit + 1).all()
+    
+    headers = {}
+    if len(messages) > limit:
+        messages = messages[:limit]
+        last = messages[-1]
+        headers['X-Next-Cursor'] = encode_cursor(last.timestamp.isoformat(), last.id)
+    
+    return json_list_response([message.to_dict() for message in messages], headers=headers)
+
+@chat_bp.route('/stream', methods=['GET'])
+def stream():
+    """
+    Server-sent events with the current user's new messages
+
+    EventSource cannot set headers, so the token may also be passed as
+    ?token=. A reconnecting client sends Last-Event-ID and first gets the
+    messages it missed, REPLAY_LIMIT at a time: after a full batch a
+    'resync' event asks it to reconnect for the next one, as when it falls
+    too far behind or the pub/sub broker connection dropped. Idle connections only wait on their subscription; the
+    gevent workers of gunicorn.conf.py hold thousands of them per process,
+    while a threaded server ties up a thread per connection.
+    """
+    try:
+        identity = authenticate(request.args.get('token'))
+    except AuthError as e:
+        return jsonify({'message': e.message}), 401
+    user_id = identity.user_id
+    heartbeat = current_app.config.get('CHAT_STREAM_HEARTBEAT', 15)
+    
+    # Subscribe before reading the backlog so nothing falls in between
+    subscription = pubsub.subscribe(user_topic(user_id))
+    missed = []
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if last_event_id and last_event_id.isdigit():
+        missed = [message.to_dict() for message in Message.query.filter(
+            (Message.sender_id == user_id) | (Message.receiver_id == user_id),
+            Message.id > int(last_event_id)
+        ).order_by(Message.id).limit(REPLAY_LIMIT + 1)]
+    truncated = len(missed) > REPLAY_LIMIT
+    missed = missed[:REPLAY_LIMIT]
+    replayed_up_to = missed[-1]['id'] if missed else 0
+    
+    def generate():
+        with subscription:
+            yield b'retry: 3000\n\n'
+            for payload in missed:
+                yield sse_event(payload, 'message', payload['id'])
+            if truncated:
+                # More were missed: the reconnect replays from the last id sent
+                yield sse_event({}, 'resync')
+                return
+            while True:
+                payload = subscription.get(timeout=heartbeat)
+                if subscription.overflowed:
+                    # Too far behind: make the client reconnect and replay
+                    yield sse_event({}, 'resync')
+                    return
+                if payload is None:
+                    yield b': keep-alive\n\n'
+                elif payload['id'] > replayed_up_to:
+                    yield sse_event(payload, 'message', payload['id'])
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 @chat_bp.route('/request', methods=['POST'])
 def request_barter():
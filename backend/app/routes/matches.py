@@ -1,89 +1,153 @@
 from flask import Blueprint, request, jsonify, g
 from app import db
-from app.models.user import User, user_offered_skills, user_required_skills
+from app.models.user import User
 from app.models.skill import Skill
 from app.models.barter_session import BarterSession
-from sqlalchemy import and_, or_
+from app.models.reputation import UserReputation
+from app.models.match_candidate import MatchCandidate
+from app.models.barter_cycle import BarterCycle, BarterCycleMember
+from sqlalchemy import select
 from app.auth import token_auth
+from app.utils.serializers import UserDTO, json_list_response, requested_fields
+from app.utils.skill_index import skill_index
+
+# Fields of the 'user' object in match payloads
+MATCH_USER_FIELDS = ('name', 'photo_url', 'location', 'bio', 'reputation')
 
 bp = Blueprint('matches', __name__)
 
-@bp.route('/api/matches', methods=['GET'])
+@bp.route('/matches', methods=['GET'])
 @token_auth.login_required
 def get_matches():
+    """
+    Get reciprocal matches for the current user
+
+    Always a JSON list, empty when the user lacks offered or required skills
+    or has no candidates yet.
+
+    Query Parameters:
+        - fields: Comma-separated subset of the 'user' fields to return
+    """
     current_user = g.current_user
+    fields = requested_fields(MATCH_USER_FIELDS, default=MATCH_USER_FIELDS)
     
-    # Get current user's offered and required skills
-    current_offered_skills = [skill.id for skill in current_user.offered_skills]
-    current_required_skills = [skill.id for skill in current_user.required_skills]
+    # Current user's skills come from the in-memory skill index, so building
+    # the match list never touches the user/skill join tables
+    current_offered_skills = skill_index.offered_by(current_user.id)
+    current_required_skills = skill_index.required_by(current_user.id)
     
     if not current_offered_skills or not current_required_skills:
-        return jsonify({
-            'message': 'Please add both offered and required skills to your profile',
-            'matches': []
-        }), 200
-    
-    # Find users who have at least one skill the current user needs
-    # and need at least one skill the current user offers
-    potential_matches = db.session.query(User).filter(
-        User.id != current_user.id,
-        User.offered_skills.any(Skill.id.in_(current_required_skills)),
-        User.required_skills.any(Skill.id.in_(current_offered_skills))
-    ).all()
+        return json_list_response([])
+    
+    # Pairs are precomputed in match_candidates (kept current by
+    # app.utils.match_store), so this is one primary-key range read
+    rows = MatchCandidate.query.options(
+        db.joinedload(MatchCandidate.candidate).options(
+            db.joinedload(User.profile),
+            db.joinedload(User.reputation),
+            db.lazyload(User.offered_skills),
+            db.lazyload(User.required_skills)
+        )
+    ).filter(MatchCandidate.user_id == current_user.id).order_by(MatchCandidate.candidate_id).all()
     
+    skill_names = skill_index.skill_names
     matches = []
-    for user in potential_matches:
-        # Get matching skills
-        user_offered = {skill.id: skill.name for skill in user.offered_skills}
-        user_required = {skill.id: skill.name for skill in user.required_skills}
-        
-        # Find overlapping skills
-        matching_offered = {
-            skill_id: user_offered[skill_id] 
-            for skill_id in user_offered 
-            if skill_id in current_required_skills
-        }
-        
-        matching_required = {
-            skill_id: user_required[skill_id]
-            for skill_id in user_required
-            if skill_id in current_offered_skills
-        }
+    for row in rows:
+        user = row.candidate
+        profile = user.profile
+        dto = UserDTO(
+            user.id,
+            user.name,
+            bio=profile.bio if profile else None,
+            photo_url=profile.photo_url if profile else None,
+            location=profile.location if profile else None,
+            reputation=UserReputation.summary(user.reputation)
+        )
         
         # Generate possible exchanges
         possible_exchanges = []
-        for req_skill_id, req_skill_name in matching_required.items():
-            for off_skill_id, off_skill_name in matching_offered.items():
+        for req_skill_id in row.required_ids:
+            for off_skill_id in row.offered_ids:
                 possible_exchanges.append({
                     'offered_skill_id': req_skill_id,
-                    'offered_skill_name': req_skill_name,
+                    'offered_skill_name': skill_names.get(req_skill_id),
                     'requested_skill_id': off_skill_id,
-                    'requested_skill_name': off_skill_name
+                    'requested_skill_name': skill_names.get(off_skill_id)
                 })
         
-        if possible_exchanges:
-            matches.append({
-                'user': {
-                    'id': user.id,
-                    'name': user.name,
-                    'photo_url': user.photo_url,
-                    'location': user.location,
-                    'bio': user.bio
-                },
-                'offered_skills': [
-                    {'id': skill_id, 'name': name} 
-                    for skill_id, name in user_offered.items()
-                ],
-                'requested_skills': [
-                    {'id': skill_id, 'name': name}
-                    for skill_id, name in user_required.items()
-                ],
-                'possible_exchanges': possible_exchanges
+        matches.append({
+            'user': dto.to_dict(fields),
+            'offered_skills': skill_index.skills_payload(skill_index.offered_by(user.id)),
+            'requested_skills': skill_index.skills_payload(skill_index.required_by(user.id)),
+            'possible_exchanges': possible_exchanges
+        })
+    
+    return json_list_response(matches)
+
+@bp.route('/barter-cycles', methods=['GET'])
+@token_auth.login_required
+def get_barter_cycles():
+    """
+    Get the barter rings (3-4 users, each teaching the next) the current
+    user is part of, from the latest `flask find-barter-cycles` run
+
+    Query Parameters:
+        - fields: Comma-separated subset of the member 'user' fields to return
+    """
+    current_user = g.current_user
+    fields = requested_fields(MATCH_USER_FIELDS, default=MATCH_USER_FIELDS)
+    
+    generation = BarterCycle.latest_generation()
+    if generation is None:
+        return jsonify([])
+    
+    cycle_ids = select(BarterCycleMember.cycle_id).where(BarterCycleMember.user_id == current_user.id)
+    cycles = BarterCycle.query.options(
+        db.selectinload(BarterCycle.members).options(
+            db.joinedload(BarterCycleMember.user).options(
+                db.joinedload(User.profile),
+                db.joinedload(User.reputation),
+                db.lazyload(User.offered_skills),
+                db.lazyload(User.required_skills)
+            )
+        )
+    ).filter(
+        BarterCycle.generation == generation,
+        BarterCycle.id.in_(cycle_ids)
+    ).order_by(BarterCycle.length, BarterCycle.id).all()
+    
+    skill_index.ensure_loaded()
+    skill_names = skill_index.skill_names
+    result = []
+    for cycle in cycles:
+        members = cycle.members
+        if len(members) != cycle.length:
+            # A member was deleted since the search: the ring is broken
+            continue
+        payload = []
+        for position, member in enumerate(members):
+            user = member.user
+            profile = user.profile
+            dto = UserDTO(
+                user.id,
+                user.name,
+                bio=profile.bio if profile else None,
+                photo_url=profile.photo_url if profile else None,
+                location=profile.location if profile else None,
+                reputation=UserReputation.summary(user.reputation)
+            )
+            # Each member learns from the one before them
+            received_skill_id = members[position - 1].skill_id
+            payload.append({
+                'user': dto.to_dict(fields),
+                'teaches': {'id': member.skill_id, 'name': skill_names.get(member.skill_id)},
+                'learns': {'id': received_skill_id, 'name': skill_names.get(received_skill_id)}
             })
+        result.append({'id': cycle.id, 'length': cycle.length, 'members': payload})
     
-    return jsonify(matches)
+    return json_list_response(result)
 
-@bp.route('/api/barter-sessions', methods=['POST'])
+@bp.route('/barter-sessions', methods=['POST'])
 @token_auth.login_required
 def create_barter_session():
     current_user = g.current_user
@@ -110,12 +174,8 @@ def create_barter_session():
         return jsonify({'error': 'Invalid requested skill'}), 400
     
     # Check if a similar barter session already exists
-    existing_session = BarterSession.query.filter(
-        BarterSession.requester_id == current_user.id,
-        BarterSession.provider_id == provider.id,
-        BarterSession.offered_skill_id == offered_skill.id,
-        BarterSession.requested_skill_id == requested_skill.id,
-        BarterSession.status.in_(['pending', 'accepted'])
+    existing_session = BarterSession.open_duplicate_query(
+        current_user.id, provider.id, offered_skill.id, requested_skill.id
     ).first()
     
     if existing_session:
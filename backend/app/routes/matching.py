@@ -1,6 +1,9 @@
-from flask import Blueprint, jsonify, request
-from app.utils.auth import token_required
-from app.utils.matching import find_matches, get_available_skills
+from flask import Blueprint, Response, jsonify, request
+from app.auth import token_required, identity_required
+from app.utils.matching import find_matches, find_ranked_matches
+from app.utils.pagination import parse_limit
+from app.utils.serializers import UserDTO, json_list_response, json_response, requested_fields
+from app.utils.skill_catalog import skill_catalog
 
 matching_bp = Blueprint('matching', __name__)
 
@@ -12,8 +15,14 @@ def get_matches(current_user):
     Query Parameters:
         - skill_id: Filter by specific skill ID
         - location: Filter by location (partial match)
+        - limit: Return only the top `limit` matches ranked by reciprocal
+          overlap (the total goes in X-Total-Count)
+        - cursor: `next_cursor` from the previous ranked page
+        - sort: Ranked order, 'score' (default) or 'reputation'
+        - fields: Comma-separated subset of user fields to return
     """
     filters = {}
+    fields = requested_fields(UserDTO.FIELDS, default=UserDTO.LIST_FIELDS)
     
     if 'skill_id' in request.args:
         try:
@@ -24,12 +33,23 @@ def get_matches(current_user):
     if 'location' in request.args:
         filters['location'] = request.args.get('location')
     
-    try:
-        matches = find_matches(current_user.id, filters)
-        return jsonify({
+    if 'limit' in request.args or 'cursor' in request.args or 'sort' in request.args:
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            result = find_ranked_matches(current_user.id, filters, limit=limit,
+                                         cursor=request.args.get('cursor'), fields=fields,
+                                         sort=request.args.get('sort', 'score'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        return json_response({
             'success': True,
-            'data': matches
-        })
+            'data': result['matches'],
+            'next_cursor': result['next_cursor']
+        }, headers={'X-Total-Count': str(result['total'])})
+
+    try:
+        matches = find_matches(current_user.id, filters, fields=fields)
+        return json_list_response(matches, prefix=b'{"success":true,"data":', suffix=b'}')
     except Exception as e:
         return jsonify({
             'success': False,
@@ -37,15 +57,17 @@ def get_matches(current_user):
         }), 500
 
 @matching_bp.route('/skills', methods=['GET'])
-@token_required
-def get_skills(current_user):
-    """Get all available skills for filtering"""
+@identity_required
+def get_skills(identity):
+    """Get all available skills for filtering (cached, supports conditional GET)"""
     try:
-        skills = [{'id': s.id, 'name': s.name} for s in get_available_skills()]
-        return jsonify({
+        if skill_catalog.not_modified():
+            return skill_catalog.add_validators(Response(status=304))
+        body = skill_catalog.body('matching', lambda skills: {
             'success': True,
-            'data': skills
+            'data': [{'id': s['id'], 'name': s['name']} for s in skills]
         })
+        return skill_catalog.add_validators(Response(body, mimetype='application/json'))
     except Exception as e:
         return jsonify({
             'success': False,
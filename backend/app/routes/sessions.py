@@ -1,11 +1,176 @@
-from flask import Blueprint, jsonify
+import datetime
+
+from flask import Blueprint, jsonify, request
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.auth import identity_required
+from app.models import BarterSession, Feedback, User, UserReputation
+from app.utils.pagination import decode_cursor, encode_cursor, parse_limit
+from app.utils.serializers import SkillDTO, json_response
 
 sessions_bp = Blueprint('sessions', __name__)
 
+
+def _user_summary(user):
+    return {'id': user.id, 'name': user.name} if user else None
+
+
+def session_to_dict(session, user_id):
+    return {
+        'id': session.id,
+        'status': session.status,
+        'created_at': session.created_at.isoformat() if session.created_at else None,
+        'role': 'requester' if session.requester_id == user_id else 'provider',
+        'requester': _user_summary(session.requester),
+        'provider': _user_summary(session.provider),
+        'offered_skill': SkillDTO.from_model(session.offered_skill).to_dict() if session.offered_skill else None,
+        'requested_skill': SkillDTO.from_model(session.requested_skill).to_dict() if session.requested_skill else None,
+    }
+
+
 @sessions_bp.route('/', methods=['GET'])
-def get_sessions():
-    return jsonify({'message': 'List of barter sessions'})
+@identity_required
+def get_sessions(identity):
+    """
+    The current user's barter sessions, as requester or provider, newest first
+
+    Query Parameters:
+        - status: Only sessions with this status (comma-separated for several)
+        - role: 'requester' or 'provider' to only list one side
+        - limit: Page size (default 20, max 100)
+        - cursor: `next_cursor` from the previous page
+
+    Returns {'sessions', 'counts', 'total', 'next_cursor'}; `counts` has every
+    status (for all of the user's sessions, ignoring the filters) and `total`
+    is their sum. Two queries regardless of the number of sessions.
+    """
+    user_id = identity.user_id
+    
+    statuses = [s.strip() for s in request.args.get('status', '').split(',') if s.strip()]
+    unknown = set(statuses) - set(BarterSession.STATUSES)
+    if unknown:
+        return jsonify({'error': f"Unknown status(es): {', '.join(sorted(unknown))}"}), 400
+    role = request.args.get('role')
+    if role not in (None, 'requester', 'provider'):
+        return jsonify({'error': "role must be 'requester' or 'provider'"}), 400
+    try:
+        limit = parse_limit(request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    before = None
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            created_at, session_id = decode_cursor(cursor, 2)
+            before = (datetime.datetime.fromisoformat(created_at), int(session_id))
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+    
+    if role == 'requester':
+        mine = BarterSession.requester_id == user_id
+    elif role == 'provider':
+        mine = BarterSession.provider_id == user_id
+    else:
+        mine = (BarterSession.requester_id == user_id) | (BarterSession.provider_id == user_id)
+    
+    # Both users and both skills come from joins in the same query
+    query = BarterSession.query.options(
+        db.joinedload(BarterSession.requester).lazyload(User.offered_skills),
+        db.joinedload(BarterSession.requester).lazyload(User.required_skills),
+        db.joinedload(BarterSession.provider).lazyload(User.offered_skills),
+        db.joinedload(BarterSession.provider).lazyload(User.required_skills),
+        db.joinedload(BarterSession.offered_skill),
+        db.joinedload(BarterSession.requested_skill)
+    ).filter(mine)
+    if statuses:
+        query = query.filter(BarterSession.status.in_(statuses))
+    if before is not None:
+        created_at, session_id = before
+        query = query.filter(
+            (BarterSession.created_at < created_at) |
+            ((BarterSession.created_at == created_at) & (BarterSession.id < session_id))
+        )
+    sessions = query.order_by(BarterSession.created_at.desc(), BarterSession.id.desc()).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(sessions) > limit:
+        sessions = sessions[:limit]
+        last = sessions[-1]
+        next_cursor = encode_cursor(last.created_at.isoformat(), last.id)
+    
+    # Per-status counts for the dashboard tabs in one GROUP BY
+    counts = dict.fromkeys(BarterSession.STATUSES, 0)
+    counts.update(db.session.execute(
+        select(BarterSession.status, func.count())
+        .where((BarterSession.requester_id == user_id) | (BarterSession.provider_id == user_id))
+        .group_by(BarterSession.status)
+    ).all())
+    
+    return json_response({
+        'sessions': [session_to_dict(session, user_id) for session in sessions],
+        'counts': counts,
+        'total': sum(counts.values()),
+        'next_cursor': next_cursor
+    })
 
 @sessions_bp.route('/<int:session_id>/feedback', methods=['POST'])
-def give_feedback(session_id):
-    return jsonify({'message': f'Feedback given for session {session_id}'})
+@identity_required
+def give_feedback(identity, session_id):
+    """
+    Rate the other participant of a barter session
+
+    Body: {"rating": 1-5, "comment": str (optional)}
+
+    Only completed sessions can be rated, once per participant. The feedback
+    row and the reviewee's reputation totals are written in one transaction.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        rating = int(data.get('rating'))
+    except (TypeError, ValueError):
+        rating = None
+    if rating is None or not 1 <= rating <= 5:
+        return jsonify({'error': 'rating must be an integer from 1 to 5'}), 400
+    
+    session = db.session.get(BarterSession, session_id)
+    if session is None:
+        return jsonify({'error': 'Session not found'}), 404
+    if identity.user_id not in (session.requester_id, session.provider_id):
+        return jsonify({'error': 'Not a participant of this session'}), 403
+    if session.status != 'completed':
+        return jsonify({'error': 'Feedback can only be given for completed sessions'}), 400
+    
+    already_given = db.session.scalar(
+        select(Feedback.id).where(Feedback.session_id == session_id,
+                                  Feedback.reviewer_id == identity.user_id).limit(1)
+    )
+    if already_given is not None:
+        return jsonify({'error': 'Feedback already given for this session'}), 400
+    
+    reviewee_id = session.provider_id if identity.user_id == session.requester_id else session.requester_id
+    feedback = Feedback(
+        session_id=session_id,
+        reviewer_id=identity.user_id,
+        reviewee_id=reviewee_id,
+        rating=rating,
+        comment=data.get('comment')
+    )
+    db.session.add(feedback)
+    try:
+        # Flushed first, so a concurrent duplicate fails before touching the totals
+        db.session.flush()
+        reputation = UserReputation.record_rating(reviewee_id, rating)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Feedback already given for this session'}), 400
+    
+    return jsonify({
+        'message': 'Feedback submitted',
+        'feedback_id': feedback.id,
+        'reviewee_id': reviewee_id,
+        'reputation': UserReputation.summary(reputation)
+    }), 201
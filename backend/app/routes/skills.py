@@ -1,7 +1,12 @@
-from flask import Blueprint, jsonify, g
-from app import db
+from flask import Blueprint, Response, jsonify, g, request
 from app.auth import token_auth
-from app.models import Skill, User, user_offered_skills, user_required_skills
+from app.models import User, user_offered_skills
+from app.utils.loaders import get_user_loader, without_skill_collections
+from app.utils.serializers import UserDTO, json_list_response, json_response, requested_fields
+from app.utils.pagination import decode_numeric_cursor, encode_cursor, parse_limit
+from app.utils.skill_catalog import skill_catalog
+from app.utils.skill_index import skill_index
+from app.utils.skill_typeahead import skill_typeahead
 
 bp = Blueprint('skills', __name__, url_prefix='/api/skills')
 
@@ -9,72 +14,82 @@ bp = Blueprint('skills', __name__, url_prefix='/api/skills')
 def get_skills():
     """
     Get all available skills with user counts
+
+    Served from the skill catalog cache; supports If-None-Match and
+    If-Modified-Since.
+    """
+    if skill_catalog.not_modified():
+        return skill_catalog.add_validators(Response(status=304))
+    
+    body = skill_catalog.body('skills', lambda skills: skills)
+    return skill_catalog.add_validators(Response(body, mimetype='application/json'))
+
+@bp.route('/autocomplete', methods=['GET'])
+def autocomplete_skills():
+    """
+    Suggest skills for a partially typed name, most popular first
+
+    Query Parameters:
+        - q: Prefix of any word of the skill name (empty for the most popular skills)
+        - limit: Number of suggestions (default and max SKILL_TYPEAHEAD_TOP_K)
     """
-    skills = db.session.query(
-        Skill.id,
-        Skill.name,
-        db.func.count(user_offered_skills.c.user_id).label('user_count')
-    ).outerjoin(
-        user_offered_skills, user_offered_skills.c.skill_id == Skill.id
-    ).group_by(Skill.id).all()
+    try:
+        limit = parse_limit(request.args.get('limit'), default=skill_typeahead.top_k,
+                            maximum=skill_typeahead.top_k)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify([{
-        'id': skill.id,
-        'name': skill.name,
-        'user_count': skill.user_count
-    } for skill in skills])
+    skill_ids = skill_typeahead.complete(request.args.get('q', ''), limit)
+    return json_response(skill_typeahead.payload(skill_ids))
 
 @bp.route('/<int:skill_id>/users', methods=['GET'])
 @token_auth.login_required
 def get_users_by_skill(skill_id):
     """
-    Get all users who have a specific skill
+    Get a page of the users who offer a specific skill, ordered by id
+
+    X-Total-Count is the number of users offering the skill (from the skill
+    index); X-Next-Cursor is set when there are more pages.
+
+    Query Parameters:
+        - limit: Page size (default 20, max 100)
+        - cursor: X-Next-Cursor of the previous page
+        - fields: Comma-separated subset of fields to return
     """
     # Get the current user
     current_user = g.current_user
+    fields = requested_fields(UserDTO.FIELDS, default=UserDTO.LIST_FIELDS)
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+        after_id = decode_numeric_cursor(cursor, 1)[0] if cursor else 0
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Get users who have this skill as an offered skill and are not the current user
-    users = User.query.join(
+    # Keyset page over the (skill_id, user_id) index of users offering the skill
+    users = without_skill_collections(User.query).join(
         user_offered_skills, user_offered_skills.c.user_id == User.id
     ).filter(
         user_offered_skills.c.skill_id == skill_id,
+        user_offered_skills.c.user_id > after_id,
         User.id != current_user.id
-    ).all()
+    ).order_by(user_offered_skills.c.user_id).limit(limit + 1).all()
+    
+    headers = {}
+    if len(users) > limit:
+        users = users[:limit]
+        headers['X-Next-Cursor'] = encode_cursor(users[-1].id)
+    total = skill_index.offerer_count(skill_id) - (skill_id in skill_index.offered_by(current_user.id))
+    headers['X-Total-Count'] = str(max(total, 0))
+    
+    # Batch-load the page's offered and requested skills and profiles
+    loader = get_user_loader().load([user.id for user in users])
     
-    # Get each user's offered and requested skills
-    result = []
-    for user in users:
-        # Get offered skills
-        offered_skills = db.session.query(Skill).join(
-            user_offered_skills, user_offered_skills.c.skill_id == Skill.id
-        ).filter(
-            user_offered_skills.c.user_id == user.id
-        ).all()
-        
-        # Get requested skills
-        requested_skills = db.session.query(Skill).join(
-            user_required_skills, user_required_skills.c.skill_id == Skill.id
-        ).filter(
-            user_required_skills.c.user_id == user.id
-        ).all()
-        
-        user_data = {
-            'id': user.id,
-            'name': user.name,
-            'email': user.email,
-            'bio': user.bio,
-            'location': user.location,
-            'photo_url': user.photo_url,
-            'offered_skills': [{
-                'id': skill.id,
-                'name': skill.name
-            } for skill in offered_skills],
-            'requested_skills': [{
-                'id': skill.id,
-                'name': skill.name
-            } for skill in requested_skills]
-        }
-        
-        result.append(user_data)
+    result = [
+        UserDTO.from_loader(user, loader).to_dict(
+            fields, renames={'required_skills': 'requested_skills'}
+        )
+        for user in users
+    ]
     
-    return jsonify(result)
+    return json_list_response(result, headers=headers)
@@ -1,7 +1,18 @@
-from flask import Blueprint, jsonify, g, request
+import hmac
+
+from flask import Blueprint, Response, current_app, jsonify, g, request
 from app import db
-from app.models import User, Skill
+from app.models import User
 from app.auth import token_auth
+from app.utils.loaders import get_user_loader, without_skill_collections
+from app.utils.pagination import decode_numeric_cursor, encode_cursor, parse_limit
+from app.utils.serializers import UserDTO, json_list_response, json_response, requested_fields
+from app.utils.user_count import user_count
+from app.utils.user_export import export_slots, iter_ndjson
+from app.utils.user_search import user_search
+
+# Empty strings rather than nulls for these, as the frontend expects
+TEXT_DEFAULTS = {'bio': '', 'location': '', 'availability': ''}
 
 bp = Blueprint('users', __name__)
 
@@ -9,93 +20,115 @@ bp = Blueprint('users', __name__)
 @token_auth.login_required
 def get_users():
     """
-    Get all users with their skills
+    Get a page of users with their skills
+
+    Users are ordered by id, or by rank when searching. X-Total-Count is
+    the number of matches when searching, otherwise an approximate user
+    count (cached for USER_COUNT_TTL seconds). X-Next-Cursor is set when
+    there are more pages.
+
+    Query Parameters:
+        - search: Ranked search over name, bio, location and skill names
+          (whole words or word fragments of 3+ characters)
+        - limit: Page size (default 20, max 100)
+        - cursor: X-Next-Cursor of the previous page
+        - fields: Comma-separated subset of fields to return
     """
     current_user = g.current_user
+    fields = requested_fields(UserDTO.FIELDS, default=UserDTO.LIST_FIELDS)
     
     # Get query parameters for filtering
     search = request.args.get('search', '')
+    headers = {}
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+        after = decode_numeric_cursor(cursor, 2 if search else 1) if cursor else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Base query
-    query = User.query.filter(User.id != current_user.id)
-    
-    # Apply search filter
     if search:
-        search = f"%{search}%"
-        query = query.filter(
-            (User.name.ilike(search)) | 
-            (User.bio.ilike(search) if hasattr(User, 'bio') else False) |
-            (User.offered_skills.any(Skill.name.ilike(search))) |
-            (User.required_skills.any(Skill.name.ilike(search)))
-        )
+        total, page, more = user_search.search_page(search, limit, after=after, exclude=current_user.id)
+        headers['X-Total-Count'] = str(total)
+        if more:
+            headers['X-Next-Cursor'] = encode_cursor(*page[-1])
+        
+        # Load the page's users and keep the ranking order
+        ids = [user_id for _, user_id in page]
+        by_id = {user.id: user for user in without_skill_collections(User.query).filter(User.id.in_(ids))} if ids else {}
+        users = [by_id[user_id] for user_id in ids if user_id in by_id]
+    else:
+        # Keyset page over the primary key, bounded even on the first page so it
+        # is a range read; skills and profiles are batch-loaded below
+        after_id = after[0] if after is not None else 0
+        users = without_skill_collections(User.query).filter(
+            User.id > after_id, User.id != current_user.id
+        ).order_by(User.id).limit(limit + 1).all()
+        if len(users) > limit:
+            users = users[:limit]
+            headers['X-Next-Cursor'] = encode_cursor(users[-1].id)
+        headers['X-Total-Count'] = str(max(user_count.get() - 1, 0))
     
-    users = query.all()
+    loader = get_user_loader().load([user.id for user in users])
     
     # Format the response
-    result = []
-    for user in users:
-        user_data = {
-            'id': user.id,
-            'name': user.name,
-            'email': user.email,
-            'bio': user.bio if hasattr(user, 'bio') else '',
-            'photo_url': user.photo_url if hasattr(user, 'photo_url') else None,
-            'location': user.location if hasattr(user, 'location') else '',
-            'offered_skills': [{
-                'id': skill.id,
-                'name': skill.name
-            } for skill in user.offered_skills],
-            'required_skills': [{
-                'id': skill.id,
-                'name': skill.name
-            } for skill in user.required_skills]
-        }
-        result.append(user_data)
+    result = [
+        UserDTO.from_loader(user, loader).to_dict(fields, defaults=TEXT_DEFAULTS)
+        for user in users
+    ]
+    
+    return json_list_response(result, headers=headers)
+
+@bp.route('/api/users/export', methods=['GET'])
+def export_users():
+    """
+    Stream every user with profile and skills as NDJSON, one user per line
+
+    Operators only: requires `Authorization: Bearer <EXPORT_TOKEN>`, and is
+    not found when EXPORT_TOKEN is unset (use `flask export-users`). Answers
+    503 while EXPORT_MAX_CONCURRENT exports are already streaming.
+
+    Query Parameters:
+        - after_id: Only users with a greater id, to resume an interrupted export
+    """
+    token = current_app.config.get('EXPORT_TOKEN')
+    if not token:
+        return jsonify({'error': 'Not found'}), 404
+    provided = request.headers.get('Authorization', '').encode('utf-8')
+    if not hmac.compare_digest(provided, f'Bearer {token}'.encode('utf-8')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    after_id = request.args.get('after_id', '0')
+    if not after_id.isdigit():
+        return jsonify({'error': 'after_id must be a non-negative integer'}), 400
     
-    return jsonify(result)
+    if not export_slots.acquire():
+        response = jsonify({'error': 'Too many exports running, please try again later'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+    response = Response(iter_ndjson(db.engine, after_id=int(after_id)), mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Runs when the response is closed, finished or not
+    response.call_on_close(export_slots.release)
+    return response
 
 @bp.route('/api/users/<int:user_id>', methods=['GET'])
 @token_auth.login_required
 def get_user(user_id):
     """
     Get a user's profile by ID
+
+    Query Parameters:
+        - fields: Comma-separated subset of fields to return
     """
-    # Get the requested user
-    user = User.query.get_or_404(user_id)
-    
-    # Get offered skills
-    offered_skills = db.session.query(Skill).join(
-        'users_offering',
-        User.offered_skills
-    ).filter(
-        User.id == user_id
-    ).all()
+    fields = requested_fields(UserDTO.FIELDS)
     
-    # Get requested skills
-    required_skills = db.session.query(Skill).join(
-        'users_requiring',
-        User.required_skills
-    ).filter(
-        User.id == user_id
-    ).all()
+    # Get the requested user
+    user = without_skill_collections(User.query).filter(User.id == user_id).first_or_404()
     
-    # Format the response
-    user_data = {
-        'id': user.id,
-        'name': user.name,
-        'email': user.email,
-        'bio': user.bio if hasattr(user, 'bio') else '',
-        'photo_url': user.photo_url if hasattr(user, 'photo_url') else None,
-        'location': user.location if hasattr(user, 'location') else '',
-        'availability': user.availability if hasattr(user, 'availability') else '',
-        'offered_skills': [{
-            'id': skill.id,
-            'name': skill.name
-        } for skill in offered_skills],
-        'required_skills': [{
-            'id': skill.id,
-            'name': skill.name
-        } for skill in required_skills]
-    }
+    # Get offered/requested skills and the profile
+    loader = get_user_loader().load([user.id])
     
-    return jsonify(user_data)
+    return json_response(UserDTO.from_loader(user, loader).to_dict(fields, defaults=TEXT_DEFAULTS))
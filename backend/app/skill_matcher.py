@@ -1,31 +1,32 @@
-import mysql.connector
+import numpy as np
 import pandas as pd
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sqlalchemy import text
 import string
-from flask import current_app
+from app.utils.db_pool import pooled_connection
 from functools import lru_cache
+import threading
 
-# Connect to MySQL using Flask config
+_PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
+# Check a connection out of the app's shared, configurable engine pool
+# (see Config.SQLALCHEMY_ENGINE_OPTIONS); needs an app context
 def connect_db():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="Pranavrh123$",
-        database="skill_exchange"
-    )
+    return pooled_connection()
+
 
+SKILL_COLUMNS = ['user_id', 'username', 'skill_type', 'skill_name', 'description']
+FETCH_CHUNK_SIZE = 10000
 
-# Fetch skills data from MySQL
-@lru_cache(maxsize=32)
-def fetch_skills():
-    conn = connect_db()
-    query = """
+SKILLS_QUERY = """
     SELECT u.id as user_id, u.name as username, 'offered' as skill_type, 
            s.name as skill_name, '' as description
     FROM users u
     JOIN user_offered_skills us ON u.id = us.user_id
     JOIN skills s ON us.skill_id = s.id
+    {where}
     
     UNION ALL
     
@@ -34,32 +35,86 @@ def fetch_skills():
     FROM users u
     JOIN user_required_skills us ON u.id = us.user_id
     JOIN skills s ON us.skill_id = s.id
+    {where}
     """
-    df = pd.read_sql(query, conn)
-    conn.close()
-    return df
+
+# Data version of the skill join tables: the DataVersion.SKILLS counter,
+# which is committed in order (see app.models.data_version)
+def get_data_version(conn):
+    df = pd.read_sql(text("SELECT version FROM data_versions WHERE name = 'skills'"), conn)
+    return int(df['version'].iloc[0]) if len(df) else 0
+
+# Fetch skills data from MySQL, optionally only for users whose skills
+# changed in the version range (since, until]. Rows are read in chunks of
+# `chunksize`.
+def fetch_skills(conn, since=None, until=None, chunksize=FETCH_CHUNK_SIZE):
+    if since is None:
+        query, params = text(SKILLS_QUERY.format(where='')), None
+    else:
+        query = text(SKILLS_QUERY.format(
+            where='WHERE u.skills_version > :since AND u.skills_version <= :until'
+        ))
+        params = {'since': since, 'until': until}
+    chunks = list(pd.read_sql(query, conn, params=params, chunksize=chunksize))
+    if not chunks:
+        return pd.DataFrame(columns=SKILL_COLUMNS)
+    return pd.concat(chunks, ignore_index=True)
+
+# Ids of users whose skills changed in the version range (since, until],
+# including users who no longer have any skill rows and deleted users
+def fetch_changed_user_ids(conn, since, until):
+    params = {'since': since, 'until': until}
+    changed = pd.read_sql(
+        text("SELECT id FROM users WHERE skills_version > :since AND skills_version <= :until"),
+        conn, params=params
+    )
+    deleted = pd.read_sql(
+        text("SELECT user_id FROM skill_tombstones WHERE version > :since AND version <= :until"),
+        conn, params=params
+    )
+    return set(changed['id']) | set(deleted['user_id'])
+
+# Stop words are loaded from the NLTK corpus once per process
+@lru_cache(maxsize=1)
+def get_stop_words():
+    return frozenset(stopwords.words('english'))
+
+# Tokenize an already lowercased, punctuation-free string and drop stop
+# words; memoized because the same skill names repeat across thousands of
+# users. The single tokenizer behind preprocess_text and normalize_texts.
+@lru_cache(maxsize=65536)
+def _normalize_tokens(text):
+    stop_words = get_stop_words()
+    return ' '.join(word for word in word_tokenize(text) if word not in stop_words)
 
 # Preprocess text: Clean skill name + description
 def preprocess_text(text):
     if pd.isnull(text):
         return ""
     text = text.lower()  # Lowercase
-    text = text.translate(str.maketrans('', '', string.punctuation))  # Remove punctuation
-    tokens = word_tokenize(text)  # Tokenize
-    stop_words = set(stopwords.words('english'))
-    tokens = [word for word in tokens if word not in stop_words]  # Remove stop words
-    return ' '.join(tokens)
+    text = text.translate(_PUNCTUATION_TABLE)  # Remove punctuation
+    return _normalize_tokens(text)  # Tokenize, remove stop words
 
-# Load and preprocess data
-@lru_cache(maxsize=32)
-def load_data():
-    df_skills = fetch_skills()
-    # Combine skill_name and description, then preprocess
-    df_skills['processed_text'] = (df_skills['skill_name'] + ' ' + df_skills['description'].fillna('')).apply(preprocess_text)
-    
+# Vectorized preprocess_text for a whole Series: lowercasing and punctuation
+# removal run as pandas string ops, and tokenizing and stop-word filtering
+# run once per distinct value instead of once per row
+def normalize_texts(texts):
+    cleaned = texts.fillna('').str.lower().str.translate(_PUNCTUATION_TABLE)
+    uniques = cleaned.unique()
+    mapping = dict(zip(uniques, map(_normalize_tokens, uniques)))
+    return cleaned.map(mapping)
+
+# Add the preprocessed text column without touching the input frame
+def preprocess_skills(df_skills):
+    return df_skills.assign(
+        processed_text=normalize_texts(df_skills['skill_name'] + ' ' + df_skills['description'].fillna(''))
+    )
+
+# Build one row per user with their offered and requested text
+def build_users_frame(df_skills):
     # Separate offered and requested skills
-    offered = df_skills[df_skills['skill_type'] == 'offered'].groupby('user_id')['processed_text'].apply(' '.join).reset_index()
-    requested = df_skills[df_skills['skill_type'] == 'requested'].groupby('user_id')['processed_text'].apply(' '.join).reset_index()
+    offered = df_skills[df_skills['skill_type'] == 'offered'].groupby('user_id')['processed_text'].agg(' '.join).reset_index()
+    requested = df_skills[df_skills['skill_type'] == 'requested'].groupby('user_id')['processed_text'].agg(' '.join).reset_index()
     
     # Merge into one DataFrame
     users_df = pd.merge(offered, requested, on='user_id', how='outer', suffixes=('_offered', '_requested'))
@@ -70,7 +125,154 @@ def load_data():
     users_df['processed_text_requested'] = users_df['processed_text_requested'].fillna('')
     
     return users_df
+
+
+class SkillDataCache:
+    """
+    Preprocessed skill data keyed on the data version of the join tables.
+
+    Every read checks the version with one primary key lookup. When it
+    moved, just the users changed (or deleted) since the cached version are
+    re-read and patched into the cached frames; a full reload only happens
+    on the first read. Versions are committed in order, so no change
+    committed late with an older number can fall behind the cached one.
+    """
+
+    def __init__(self, chunksize=FETCH_CHUNK_SIZE):
+        self.chunksize = chunksize
+        self.version = None
+        self.skills = None
+        self.users = None
+        self._lock = threading.Lock()
+
+    def refresh(self, full=False):
+        with self._lock, connect_db() as conn:
+            version = get_data_version(conn)
+            if not full and self.version == version:
+                return
+            if full or self.version is None:
+                self._reload(conn)
+            else:
+                self._patch(conn, since=self.version, until=version)
+            self.version = version
+
+    def _reload(self, conn):
+        self.skills = preprocess_skills(fetch_skills(conn, chunksize=self.chunksize))
+        self.users = build_users_frame(self.skills)
+
+    def _patch(self, conn, since, until):
+        # Both reads are bounded by `until`, so changes committed meanwhile
+        # are left whole for the next refresh
+        changed_ids = fetch_changed_user_ids(conn, since, until)
+        if not changed_ids:
+            return
+        delta = preprocess_skills(fetch_skills(conn, since=since, until=until, chunksize=self.chunksize))
+        self.skills = pd.concat(
+            [self.skills[~self.skills['user_id'].isin(changed_ids)], delta], ignore_index=True
+        )
+        self.users = pd.concat(
+            [self.users[~self.users['user_id'].isin(changed_ids)], build_users_frame(delta)],
+            ignore_index=True
+        )
+
+    def get_users(self):
+        self.refresh()
+        # Callers get their own copy so the cached frame is never mutated
+        return self.users.copy()
+
+
+_data_cache = SkillDataCache()
+
+# Load and preprocess data
+def load_data():
+    return _data_cache.get_users()
+
+
+class SimilarityEngine:
+    """
+    TF-IDF similarity between what users offer and what they request.
+
+    One vocabulary is fitted over both text columns of `load_data()` output, so
+    the offered matrix O and requested matrix R (one L2-normalized sparse row
+    per user) share columns, and R @ O.T is the cosine similarity of every
+    user's requested skills against every user's offered skills. The products
+    are computed in row batches to keep memory bounded.
+    """
+
+    def __init__(self, users_df, batch_size=1024):
+        self.batch_size = batch_size
+        self.user_ids = users_df['user_id'].to_numpy()
+        self.usernames = users_df['username'].to_numpy()
+        self._positions = {user_id: pos for pos, user_id in enumerate(self.user_ids)}
+
+        offered = users_df['processed_text_offered']
+        requested = users_df['processed_text_requested']
+        self.vectorizer = TfidfVectorizer(token_pattern=r'(?u)\b\w+\b', sublinear_tf=True)
+        self.vectorizer.fit(pd.concat([offered, requested], ignore_index=True))
+        self.offered_matrix = self.vectorizer.transform(offered).tocsr()
+        self.requested_matrix = self.vectorizer.transform(requested).tocsr()
+
+    def _scores(self, start, stop, mutual):
+        # Rows: users start..stop as requesters; columns: every user as offerer
+        scores = self.requested_matrix[start:stop] @ self.offered_matrix.T
+        if mutual:
+            # Average with how well each candidate's requests fit our offers
+            scores = (scores + self.offered_matrix[start:stop] @ self.requested_matrix.T) * 0.5
+        return scores.tocsr()
+
+    @staticmethod
+    def _row_top_k(scores, row, k, exclude):
+        begin, end = scores.indptr[row], scores.indptr[row + 1]
+        data = scores.data[begin:end]
+        columns = scores.indices[begin:end]
+        # A user is never their own match
+        keep = (columns != exclude) & (data > 0)
+        data, columns = data[keep], columns[keep]
+        if len(data) > k:
+            keep = np.argpartition(-data, k - 1)[:k]
+            data, columns = data[keep], columns[keep]
+        order = np.lexsort((columns, -data))
+        return columns[order], data[order]
+
+    def top_k_for_user(self, user_id, k=10, mutual=False):
+        """
+        Get the k users whose offered skills best fit `user_id`'s requests
+
+        Returns:
+            list: (user_id, username, score) tuples, best first
+        """
+        pos = self._positions.get(user_id)
+        if pos is None:
+            return []
+        scores = self._scores(pos, pos + 1, mutual)
+        columns, values = self._row_top_k(scores, 0, k, pos)
+        return [(int(self.user_ids[c]), self.usernames[c], float(v)) for c, v in zip(columns, values)]
+
+    def top_k_all(self, k=10, mutual=False):
+        """
+        Score the whole user base in batches
+
+        Yields:
+            tuple: (user_id, [(similar user_id, score), ...] best first)
+        """
+        n_users = len(self.user_ids)
+        for start in range(0, n_users, self.batch_size):
+            stop = min(start + self.batch_size, n_users)
+            scores = self._scores(start, stop, mutual)
+            for row in range(stop - start):
+                columns, values = self._row_top_k(scores, row, k, start + row)
+                yield int(self.user_ids[start + row]), [
+                    (int(self.user_ids[c]), float(v)) for c, v in zip(columns, values)
+                ]
+
+
+def build_similarity_engine(batch_size=1024):
+    return SimilarityEngine(load_data(), batch_size=batch_size)
+
+
 if __name__ == "__main__":
-    users_df = load_data()
-    print(users_df.head())
-    print(users_df.columns)
+    from app import create_app
+    with create_app().app_context():
+        users_df = load_data()
+        print(users_df.head())
+        print(users_df.columns)
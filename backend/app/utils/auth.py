@@ -1,7 +1,5 @@
 import jwt
 import datetime
-from functools import wraps
-from flask import request, jsonify
 from flask import current_app
 
 def generate_token(user_id):
@@ -29,37 +27,3 @@ def decode_token(token):
         return 'Invalid token. Please log in again.'
     except Exception as e:
         return f'Token validation error: {str(e)}'
-
-def token_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = None
-        
-        # Check if the token is in the headers
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            if auth_header.startswith('Bearer '):
-                token = auth_header.split(' ')[1]
-        
-        if not token:
-            return jsonify({'message': 'Token is missing!'}), 401
-        
-        try:
-            # Decode the token
-            data = jwt.decode(
-                token,
-                current_app.config.get('JWT_SECRET_KEY'),
-                algorithms=['HS256']
-            )
-            current_user = data['sub']
-        except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token has expired!'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'message': 'Invalid token!'}), 401
-        except Exception as e:
-            return jsonify({'message': f'Token validation error: {str(e)}'}), 401
-        
-        # Add the current user to the function's arguments
-        return f(current_user, *args, **kwargs)
-    
-    return decorated
\ No newline at end of file
@@ -0,0 +1,271 @@
+"""
+Offline discovery of multi-party barter rings.
+
+The graph has an edge A -> B when A offers a skill B requires. A cycle
+A -> B -> C -> A lets three users trade even though no two of them are a
+reciprocal match. The search converts the skill index user sets to bitmaps
+once per run: a user's out-neighbours are the OR of the requirer bitmaps of
+their offered skills, and the users able to close a ring back to them are
+found with one AND per skill, memoized per searched user.
+
+The search is bounded so it finishes in minutes on 100k users:
+
+- at most `max_branching` neighbours are expanded per hop,
+- a user's search stops once they are in `max_per_user` cycles, and users
+  who reached that many are no longer used as members by other searches,
+  which also spreads cycles beyond the most popular users,
+- users with the fewest neighbours are searched first, before the users
+  they depend on fill up.
+
+Run with ``flask find-barter-cycles``; results are stored as a new
+generation of barter_cycles rows, published atomically.
+"""
+import time
+from collections import Counter
+
+import click
+from sqlalchemy import delete, insert, select
+
+from app import db
+from app.utils.skill_index import skill_index
+from app.utils.user_set import iter_bits
+
+# Cycles (with their members) written per transaction
+WRITE_BATCH_SIZE = 1000
+# Largest set of possible last members for which predecessors are precomputed
+FEEDER_LIMIT = 512
+
+
+def _lowest_bits(bitmap, limit):
+    """Yield up to `limit` set-bit positions, lowest first, without scanning the rest"""
+    while bitmap and limit > 0:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+        limit -= 1
+
+
+def _canonical(cycle):
+    """Rotation of `cycle` starting at its smallest id, so each ring is stored once"""
+    start = cycle.index(min(cycle))
+    return cycle[start:] + cycle[:start]
+
+
+class CycleFinder:
+    """Bounded search for cycles of length 3 to `max_length` through each user"""
+
+    def __init__(self, offerers, requirers, user_offered, user_required,
+                 max_length=4, max_per_user=5, max_branching=16):
+        self.offerers = {skill_id: users.to_bitmap() for skill_id, users in offerers.items()}
+        self.requirers = {skill_id: users.to_bitmap() for skill_id, users in requirers.items()}
+        self.user_offered = user_offered
+        self.user_required = user_required
+        self.max_length = max_length
+        self.max_per_user = max_per_user
+        self.max_branching = max_branching
+        self.cycles = []
+        self.counts = Counter()
+        # Users already in max_per_user cycles
+        self.saturated = 0
+        self._seen = set()
+
+    def _union(self, bitmaps, skill_ids):
+        result = 0
+        for skill_id in skill_ids:
+            result |= bitmaps.get(skill_id, 0)
+        return result
+
+    def learners(self, user_id):
+        """Users `user_id` can teach"""
+        return self._union(self.requirers, self.user_offered.get(user_id, ())) & ~(1 << user_id)
+
+    def teachers(self, user_id):
+        """Users who can teach `user_id`"""
+        return self._union(self.offerers, self.user_required.get(user_id, ())) & ~(1 << user_id)
+
+    def search_order(self):
+        """Users with both offered and required skills, fewest neighbours first"""
+        users = set(self.user_offered) & set(self.user_required)
+        degree = {
+            user_id: self.learners(user_id).bit_count() * self.teachers(user_id).bit_count()
+            for user_id in users
+        }
+        return sorted((user_id for user_id in users if degree[user_id]), key=lambda u: (degree[u], u))
+
+    def search(self, user_id):
+        """
+        Record new cycles through `user_id`, shortest first
+
+        Returns:
+            int: number of cycles added
+        """
+        if self.counts[user_id] >= self.max_per_user:
+            return 0
+        added = 0
+        bit = 1 << user_id
+        # The second member is taught by user_id; the last member teaches user_id
+        firsts = self.learners(user_id) & ~self.saturated
+        lasts = self.teachers(user_id) & ~self.saturated
+        if not firsts or not lasts:
+            return 0
+
+        closing = {}
+
+        def closers(member):
+            """Members of `lasts` that `member` can teach"""
+            result = 0
+            for skill_id in self.user_offered.get(member, ()):
+                reach = closing.get(skill_id)
+                if reach is None:
+                    reach = closing[skill_id] = self.requirers.get(skill_id, 0) & lasts
+                result |= reach
+            return result
+
+        # Users who can teach some member of `lasts`: the only possible
+        # predecessors of the last member. Skipped when `lasts` is large,
+        # where rings are found within the first few neighbours anyway.
+        feeders = -1
+        if lasts.bit_count() <= FEEDER_LIMIT:
+            needed = set()
+            for last in iter_bits(lasts):
+                needed.update(self.user_required.get(last, ()))
+            feeders = self._union(self.offerers, needed)
+        firsts_with_closer = firsts & feeders
+
+        for second in _lowest_bits(firsts_with_closer, self.max_branching):
+            if self.saturated >> second & 1:
+                continue
+            for third in _lowest_bits(closers(second) & ~(1 << second) & ~self.saturated, self.max_branching):
+                added += self._add((user_id, second, third))
+                if self.counts[user_id] >= self.max_per_user:
+                    return added
+
+        if self.max_length < 4:
+            return added
+        for second in _lowest_bits(firsts, self.max_branching):
+            if self.saturated >> second & 1:
+                continue
+            thirds = self.learners(second) & feeders & ~bit & ~self.saturated
+            for third in _lowest_bits(thirds, self.max_branching):
+                fourths = closers(third) & ~(1 << second) & ~(1 << third) & ~self.saturated
+                for fourth in _lowest_bits(fourths, self.max_branching):
+                    added += self._add((user_id, second, third, fourth))
+                    if self.counts[user_id] >= self.max_per_user:
+                        return added
+        return added
+
+    def _add(self, cycle):
+        key = _canonical(cycle)
+        if key in self._seen:
+            return 0
+        self._seen.add(key)
+        self.cycles.append(key)
+        for member in key:
+            self.counts[member] += 1
+            if self.counts[member] >= self.max_per_user:
+                self.saturated |= 1 << member
+        return 1
+
+    def edge_skill(self, teacher_id, learner_id):
+        """A skill `teacher_id` offers and `learner_id` requires (the lowest id)"""
+        return min(self.user_offered[teacher_id] & self.user_required[learner_id])
+
+
+def find_cycles(progress=None, progress_every=1000, **limits):
+    """
+    Search every user for cycles on a fresh snapshot of the skill index
+
+    Args:
+        progress (callable): called as progress(done, total, cycles) every
+            `progress_every` users and at the end
+        limits: max_length, max_per_user and max_branching for CycleFinder
+
+    Returns:
+        CycleFinder: with the found cycles in `cycles`
+    """
+    skill_index.load()
+    finder = CycleFinder(*skill_index.snapshot(), **limits)
+    users = finder.search_order()
+    for done, user_id in enumerate(users, 1):
+        finder.search(user_id)
+        if progress and (done % progress_every == 0 or done == len(users)):
+            progress(done, len(users), len(finder.cycles))
+    return finder
+
+
+def store_cycles(finder, progress=None):
+    """
+    Write `finder`'s cycles as a new generation and drop the older ones
+
+    Everything is one transaction (inserted WRITE_BATCH_SIZE cycles per
+    statement), so readers see the previous generation until the whole new
+    one commits, never part of it. The generation number comes from the
+    barter_cycles DataVersion counter, whose row stays locked until the
+    commit: an overlapping run waits for this one, so the new cycle ids
+    (after the current largest) cannot collide.
+
+    Returns:
+        int: the new generation number
+    """
+    from app.models import BarterCycle, BarterCycleMember, DataVersion
+
+    cycles_table = BarterCycle.__table__
+    members_table = BarterCycleMember.__table__
+    generation = DataVersion.bump(db.session.connection(), DataVersion.BARTER_CYCLES)
+    next_id = (db.session.execute(select(db.func.max(cycles_table.c.id))).scalar() or 0) + 1
+
+    for start in range(0, len(finder.cycles), WRITE_BATCH_SIZE):
+        cycle_rows, member_rows = [], []
+        for cycle_id, cycle in enumerate(finder.cycles[start:start + WRITE_BATCH_SIZE], next_id + start):
+            cycle_rows.append({'id': cycle_id, 'generation': generation, 'length': len(cycle)})
+            for position, user_id in enumerate(cycle):
+                learner_id = cycle[(position + 1) % len(cycle)]
+                member_rows.append({
+                    'cycle_id': cycle_id,
+                    'position': position,
+                    'user_id': user_id,
+                    'skill_id': finder.edge_skill(user_id, learner_id)
+                })
+        db.session.execute(insert(cycles_table), cycle_rows)
+        db.session.execute(insert(members_table), member_rows)
+        if progress:
+            progress(start + len(cycle_rows), len(finder.cycles))
+
+    old_cycles = select(cycles_table.c.id).where(cycles_table.c.generation < generation)
+    db.session.execute(delete(members_table).where(members_table.c.cycle_id.in_(old_cycles)))
+    db.session.execute(delete(cycles_table).where(cycles_table.c.generation < generation))
+    db.session.commit()
+    return generation
+
+
+def init_app(app):
+    @app.cli.command('find-barter-cycles')
+    @click.option('--max-length', type=click.IntRange(3, 4), default=4, help='Longest cycle to look for')
+    @click.option('--max-per-user', type=click.IntRange(1), default=5, help='Cycles kept per user')
+    @click.option('--max-branching', type=click.IntRange(1), default=16, help='Neighbours expanded per hop')
+    def find_barter_cycles(max_length, max_per_user, max_branching):
+        """Find barter cycles of length 3-4 and store them as a new generation"""
+        started = time.monotonic()
+
+        def search_progress(done, total, cycles):
+            elapsed = time.monotonic() - started
+            rate = done / elapsed if elapsed else 0.0
+            eta = (total - done) / rate if rate else 0.0
+            click.echo(f'{done}/{total} users, {cycles} cycles, {rate:.0f} users/s, ETA {eta:.0f}s')
+
+        finder = find_cycles(
+            search_progress,
+            max_length=max_length, max_per_user=max_per_user, max_branching=max_branching
+        )
+        searched = time.monotonic()
+        lengths = Counter(len(cycle) for cycle in finder.cycles)
+        members = sum(1 for count in finder.counts.values() if count)
+        click.echo(f'Search: {searched - started:.1f}s, {len(finder.cycles)} cycles '
+                   f'({", ".join(f"{n}: {lengths[n]}" for n in sorted(lengths))}), {members} users covered')
+
+        def write_progress(done, total):
+            click.echo(f'Written {done}/{total} cycles (committed at the end)')
+
+        generation = store_cycles(finder, write_progress)
+        click.echo(f'Generation {generation} written in {time.monotonic() - searched:.1f}s '
+                   f'(total {time.monotonic() - started:.1f}s)')
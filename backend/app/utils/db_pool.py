@@ -0,0 +1,132 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app import db
+
+
+class PoolStats:
+    """Counters for connections handed out by the SQLAlchemy engine pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.invalidations = 0
+            self.waits = 0
+            self.wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+            self.peak_checked_out = 0
+            self.peak_overflow = 0
+            self._checked_out = 0
+
+    def on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self._checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self._checked_out)
+        pool = connection_proxy._pool
+        if hasattr(pool, 'overflow'):
+            overflow = pool.overflow()
+            if overflow > self.peak_overflow:
+                self.peak_overflow = overflow
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+            self._checked_out = max(self._checked_out - 1, 0)
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+
+pool_stats = PoolStats()
+
+
+_timed_classes = {}
+
+
+def _timed_pool_class(pool_class):
+    """Subclass of `pool_class` recording how long every checkout waited"""
+    if pool_class not in _timed_classes:
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                return pool_class.connect(self)
+            finally:
+                pool_stats.record_wait(time.perf_counter() - start)
+
+        # Same name, so the pool reports its real class; dispose() recreates
+        # the pool from __class__, so the timing survives it
+        _timed_classes[pool_class] = type(pool_class.__name__, (pool_class,), {'connect': connect})
+    return _timed_classes[pool_class]
+
+
+def init_app(app):
+    """
+    Attach the stats listeners to the app's engine pool. The pool has no
+    event before a checkout, so its class is swapped for one that times
+    connect(): every checkout (db.session, engine.connect()) records its wait.
+    """
+    with app.app_context():
+        pool = db.engine.pool
+    if type(pool) not in _timed_classes.values():
+        pool.__class__ = _timed_pool_class(type(pool))
+    if not event.contains(pool, 'checkout', pool_stats.on_checkout):
+        event.listen(pool, 'connect', pool_stats.on_connect)
+        event.listen(pool, 'checkout', pool_stats.on_checkout)
+        event.listen(pool, 'checkin', pool_stats.on_checkin)
+        event.listen(pool, 'invalidate', pool_stats.on_invalidate)
+
+
+@contextmanager
+def pooled_connection():
+    """
+    Check a connection out of the shared engine pool (its wait is recorded
+    like any other checkout). Must be used inside an app context.
+    """
+    conn = db.engine.connect()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def get_pool_status():
+    """Snapshot of the pool's current state and the cumulative counters"""
+    pool = db.engine.pool
+    status = {
+        'pool_class': type(pool).__name__,
+        'connects': pool_stats.connects,
+        'checkouts': pool_stats.checkouts,
+        'checkins': pool_stats.checkins,
+        'invalidations': pool_stats.invalidations,
+        'peak_checked_out': pool_stats.peak_checked_out,
+        'peak_overflow': pool_stats.peak_overflow,
+        'waits': pool_stats.waits,
+        'avg_wait_ms': (pool_stats.wait_seconds / pool_stats.waits * 1000) if pool_stats.waits else 0.0,
+        'max_wait_ms': pool_stats.max_wait_seconds * 1000,
+    }
+    # Only queue-style pools report size/overflow
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        if hasattr(pool, name):
+            status[name] = getattr(pool, name)()
+    return status
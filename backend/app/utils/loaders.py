@@ -0,0 +1,94 @@
+from flask import g
+from sqlalchemy import select
+
+from app import db
+from app.models import (Portfolio, Profile, Skill, User, UserReputation, user_offered_skills,
+                        user_required_skills)
+
+# Keeps IN lists well under driver/database limits
+BATCH_SIZE = 1000
+
+
+def without_skill_collections(query):
+    """Stop a User query from eagerly loading both skill collections ('subquery' by default)"""
+    return query.options(db.lazyload(User.offered_skills), db.lazyload(User.required_skills))
+
+
+class UserBatchLoader:
+    """
+    Request-scoped, DataLoader-style loader for users' related rows.
+
+    Call ``load(user_ids)`` with every id a response needs; the skills,
+    profiles, reputations and portfolios of all ids not seen yet are then fetched with one
+    IN query per relationship, and the accessors read from memory. A page of
+    N users costs a constant number of queries instead of 2N+1.
+    """
+
+    def __init__(self):
+        self._offered = {}
+        self._required = {}
+        self._profiles = {}
+        self._reputations = {}
+        self._portfolios = {}
+
+    def load(self, user_ids, portfolios=False):
+        new_ids = [uid for uid in dict.fromkeys(user_ids) if uid not in self._offered]
+        if portfolios:
+            portfolio_ids = [uid for uid in dict.fromkeys(user_ids) if uid not in self._portfolios]
+        else:
+            portfolio_ids = []
+
+        for start in range(0, len(new_ids), BATCH_SIZE):
+            batch = new_ids[start:start + BATCH_SIZE]
+            for uid in batch:
+                self._offered[uid] = []
+                self._required[uid] = []
+                self._profiles[uid] = None
+            self._load_skills(user_offered_skills, self._offered, batch)
+            self._load_skills(user_required_skills, self._required, batch)
+            for profile in Profile.query.filter(Profile.user_id.in_(batch)):
+                self._profiles[profile.user_id] = profile
+            for reputation in UserReputation.query.filter(UserReputation.user_id.in_(batch)):
+                self._reputations[reputation.user_id] = reputation
+
+        for start in range(0, len(portfolio_ids), BATCH_SIZE):
+            batch = portfolio_ids[start:start + BATCH_SIZE]
+            for uid in batch:
+                self._portfolios[uid] = []
+            for portfolio in Portfolio.query.filter(Portfolio.user_id.in_(batch)).order_by(Portfolio.id):
+                self._portfolios[portfolio.user_id].append(portfolio)
+        return self
+
+    @staticmethod
+    def _load_skills(table, target, batch):
+        rows = db.session.execute(
+            select(table.c.user_id, Skill)
+            .join(Skill, Skill.id == table.c.skill_id)
+            .where(table.c.user_id.in_(batch))
+            .order_by(Skill.name)
+        ).all()
+        for user_id, skill in rows:
+            target[user_id].append(skill)
+
+    def offered_skills(self, user_id):
+        return self._offered[user_id]
+
+    def required_skills(self, user_id):
+        return self._required[user_id]
+
+    def profile(self, user_id):
+        return self._profiles[user_id]
+
+    def reputation(self, user_id):
+        """The user's UserReputation.summary() dict"""
+        return UserReputation.summary(self._reputations.get(user_id))
+
+    def portfolios(self, user_id):
+        return self._portfolios[user_id]
+
+
+def get_user_loader():
+    """The batch loader for the current request"""
+    if 'user_loader' not in g:
+        g.user_loader = UserBatchLoader()
+    return g.user_loader
@@ -0,0 +1,322 @@
+"""
+Maintenance of the match_candidates materialization.
+
+Every commit that changes users' skills reports those users through the
+skill index; a background worker then recomputes just their pairs (in both
+directions) from the join tables and rewrites the affected rows. The
+process-local skill index is not used there: it can lag other processes'
+commits by up to SKILL_INDEX_MAX_AGE seconds and would overwrite correct
+rows with stale ones. The rows can be rebuilt from scratch and checked
+against the live computation:
+
+    flask rebuild-matches
+    flask check-matches [--sample N]
+"""
+import atexit
+import os
+import random
+import threading
+import time
+
+import click
+from sqlalchemy import delete, insert, or_, select
+
+from app import db
+from app.utils.skill_index import skill_index
+
+# Keeps IN lists and multi-row inserts well under driver/database limits
+BATCH_SIZE = 1000
+
+
+def _chunks(items, size=BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def compute_rows(user_ids, mirror=True):
+    """
+    match_candidates rows for `user_ids` from the skill index
+
+    With `mirror`, the reverse row of every pair is included too, since a
+    user's skill change also changes how their partners see them.
+
+    Returns:
+        dict: (user_id, candidate_id) -> row values
+    """
+    from app.models import MatchCandidate
+
+    rows = {}
+    for user_id in user_ids:
+        for candidate_id, they_offer, they_need in skill_index.reciprocal_matches(user_id):
+            rows[user_id, candidate_id] = MatchCandidate.row(user_id, candidate_id, they_offer, they_need)
+            if mirror:
+                rows[candidate_id, user_id] = MatchCandidate.row(candidate_id, user_id, they_need, they_offer)
+    return rows
+
+
+def _pair_skills(mine, theirs, user_ids):
+    """
+    (user_id, other_id) -> skill ids in `theirs` matching `user_id`'s skills in `mine`
+
+    One join of the two skill tables per batch of users, served by the
+    (skill_id, user_id) indexes.
+    """
+    mine, theirs = mine.alias('mine'), theirs.alias('theirs')
+    pairs = {}
+    for batch in _chunks(user_ids):
+        rows = db.session.execute(
+            select(mine.c.user_id, theirs.c.user_id, theirs.c.skill_id)
+            .join(theirs, theirs.c.skill_id == mine.c.skill_id)
+            .where(mine.c.user_id.in_(batch), theirs.c.user_id != mine.c.user_id)
+        )
+        for user_id, other_id, skill_id in rows:
+            pairs.setdefault((user_id, other_id), set()).add(skill_id)
+    return pairs
+
+
+def compute_rows_from_db(user_ids):
+    """
+    match_candidates rows for `user_ids` and their candidates, in both
+    directions, from the skill tables as of the current transaction
+
+    Returns:
+        dict: (user_id, candidate_id) -> row values
+    """
+    from app.models import MatchCandidate, user_offered_skills, user_required_skills
+
+    # Skills the other user offers that I require / requires that I offer
+    they_offer = _pair_skills(user_required_skills, user_offered_skills, user_ids)
+    they_need = _pair_skills(user_offered_skills, user_required_skills, user_ids)
+    rows = {}
+    for (user_id, candidate_id), offered_ids in they_offer.items():
+        needed_ids = they_need.get((user_id, candidate_id))
+        if needed_ids:
+            rows[user_id, candidate_id] = MatchCandidate.row(user_id, candidate_id, offered_ids, needed_ids)
+            rows[candidate_id, user_id] = MatchCandidate.row(candidate_id, user_id, needed_ids, offered_ids)
+    return rows
+
+
+def refresh_users(user_ids):
+    """Rewrite every row involving `user_ids` from the skill tables and commit"""
+    from app.models import MatchCandidate
+
+    table = MatchCandidate.__table__
+    rows = compute_rows_from_db(user_ids)
+    for batch in _chunks(user_ids):
+        db.session.execute(delete(table).where(
+            or_(table.c.user_id.in_(batch), table.c.candidate_id.in_(batch))
+        ))
+    for batch in _chunks(rows.values()):
+        db.session.execute(insert(table), batch)
+    db.session.commit()
+    return len(rows)
+
+
+def rebuild_all(progress=None):
+    """
+    Recompute the whole table, one chunk of users per transaction
+
+    Each chunk's old rows are replaced in the same transaction as the new
+    ones are written, so readers never see a user without matches mid-run.
+
+    Returns:
+        int: number of rows written
+    """
+    from app.models import MatchCandidate
+
+    table = MatchCandidate.__table__
+    skill_index.load()
+    active = sorted(set(skill_index.user_offered) & set(skill_index.user_required))
+    stale = set(db.session.execute(select(table.c.user_id).distinct()).scalars()) - set(active)
+
+    written = 0
+    done = 0
+    for batch in _chunks(active):
+        rows = compute_rows(batch, mirror=False)
+        db.session.execute(delete(table).where(table.c.user_id.in_(batch)))
+        for rows_batch in _chunks(rows.values()):
+            db.session.execute(insert(table), rows_batch)
+        db.session.commit()
+        written += len(rows)
+        done += len(batch)
+        if progress:
+            progress(done, len(active), written)
+    for batch in _chunks(stale):
+        db.session.execute(delete(table).where(table.c.user_id.in_(batch)))
+        db.session.commit()
+    return written
+
+
+def check_consistency(user_ids=None):
+    """
+    Compare stored rows with the live computation from a fresh skill index
+
+    Returns:
+        list: (user_id, missing candidate ids, extra candidate ids,
+               candidate ids whose skills differ) for each inconsistent user
+    """
+    from app.models import MatchCandidate
+
+    table = MatchCandidate.__table__
+    skill_index.load()
+    if user_ids is None:
+        user_ids = sorted(set(skill_index.user_offered) | set(skill_index.user_required))
+
+    problems = []
+    for batch in _chunks(user_ids):
+        expected = compute_rows(batch, mirror=False)
+        stored = {
+            (row.user_id, row.candidate_id): row
+            for row in db.session.execute(select(table).where(table.c.user_id.in_(batch)))
+        }
+        for user_id in batch:
+            want = {cid: row for (uid, cid), row in expected.items() if uid == user_id}
+            have = {cid: row for (uid, cid), row in stored.items() if uid == user_id}
+            changed = sorted(
+                cid for cid in set(want) & set(have)
+                if (want[cid]['offered_skill_ids'], want[cid]['required_skill_ids'])
+                != (have[cid].offered_skill_ids, have[cid].required_skill_ids)
+            )
+            missing = sorted(set(want) - set(have))
+            extra = sorted(set(have) - set(want))
+            if missing or extra or changed:
+                problems.append((user_id, missing, extra, changed))
+    return problems
+
+
+class MatchCandidateWorker:
+    """
+    Background thread applying skill changes to match_candidates
+
+    Changed users are collected in a set and processed after a short
+    MATCH_CANDIDATES_DEBOUNCE delay, so a burst of commits touching the same
+    users is one refresh. Pending users are flushed on interpreter exit.
+    MATCH_CANDIDATES_WORKER = False refreshes inline after each commit, and
+    users whose refresh failed are retried at the start of the next request.
+    """
+
+    def __init__(self):
+        self._app = None
+        self._dirty = set()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+        self.enabled = False
+        self.debounce = 0.05
+
+    def init_app(self, app):
+        self._app = app
+        self.enabled = app.config.get('MATCH_CANDIDATES_WORKER', True)
+        self.debounce = app.config.get('MATCH_CANDIDATES_DEBOUNCE', 0.05)
+        skill_index.add_user_listener(self.enqueue)
+        app.before_request(self._retry_failed)
+        atexit.unregister(self.shutdown)
+        atexit.register(self.shutdown)
+
+        @app.cli.command('rebuild-matches')
+        def rebuild_matches():
+            """Recompute the match_candidates table from the join tables"""
+            started = time.monotonic()
+
+            def progress(done, total, written):
+                click.echo(f'{done}/{total} users, {written} rows, {time.monotonic() - started:.1f}s')
+
+            written = rebuild_all(progress)
+            click.echo(f'Rebuilt match_candidates: {written} rows in {time.monotonic() - started:.1f}s')
+
+        @app.cli.command('check-matches')
+        @click.option('--sample', type=int, default=None, help='Check this many random users only')
+        def check_matches(sample):
+            """Compare match_candidates with the live reciprocal-match computation"""
+            user_ids = None
+            if sample:
+                skill_index.ensure_loaded()
+                everyone = sorted(set(skill_index.user_offered) | set(skill_index.user_required))
+                user_ids = sorted(random.sample(everyone, min(sample, len(everyone))))
+            problems = check_consistency(user_ids)
+            for user_id, missing, extra, changed in problems[:50]:
+                click.echo(f'user {user_id}: missing {missing} extra {extra} changed {changed}')
+            if problems:
+                raise click.ClickException(f'{len(problems)} user(s) inconsistent')
+            click.echo('match_candidates is consistent')
+
+    def enqueue(self, user_ids):
+        if not self.enabled:
+            # Called from after_commit, where the caller's session cannot run SQL
+            with self._cond:
+                user_ids, self._dirty = sorted(self._dirty.union(user_ids)), set()
+            self.flush(user_ids)
+            return
+        with self._cond:
+            self._dirty.update(user_ids)
+            self._cond.notify()
+        self._ensure_started()
+
+    def _retry_failed(self):
+        # The worker thread retries by itself; inline, nothing else would
+        if not self.enabled and self._dirty:
+            self.flush()
+
+    def _ensure_started(self):
+        # Started lazily, and again in a forked worker, where threads do not survive
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='match-candidates', daemon=True)
+                self._thread.start()
+
+    def _take(self):
+        with self._cond:
+            while not self._dirty and not self._stopping:
+                self._cond.wait()
+        if not self._stopping:
+            # Let a burst of commits settle into one refresh
+            time.sleep(self.debounce)
+        with self._cond:
+            user_ids, self._dirty = self._dirty, set()
+            return sorted(user_ids)
+
+    def _run(self):
+        while True:
+            user_ids = self._take()
+            if user_ids:
+                self.flush(user_ids)
+            elif self._stopping:
+                return
+
+    def flush(self, user_ids=None):
+        """Refresh `user_ids` (default: all pending) in this thread"""
+        if user_ids is None:
+            with self._cond:
+                user_ids, self._dirty = sorted(self._dirty), set()
+        if not user_ids:
+            return
+        with self._app.app_context():
+            try:
+                refresh_users(user_ids)
+            except Exception:
+                db.session.rollback()
+                self._app.logger.exception('Could not refresh match candidates')
+                # Retried by the worker thread, or inline by the next change or request
+                with self._cond:
+                    self._dirty.update(user_ids)
+            finally:
+                db.session.remove()
+
+    def shutdown(self, timeout=10.0):
+        thread = self._thread
+        if thread is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        thread.join(timeout)
+        self._thread = None
+
+
+match_worker = MatchCandidateWorker()
@@ -1,14 +1,22 @@
-from sqlalchemy import and_, or_
+import heapq
+from collections import Counter
+from sqlalchemy import or_, select
 from app import db
-from app.models import User, Profile, Skill
+from app.models import User, Profile, Skill, UserReputation
+from app.utils.loaders import BATCH_SIZE, get_user_loader, without_skill_collections
+from app.utils.pagination import decode_numeric_cursor, encode_cursor
+from app.utils.serializers import SkillDTO, UserDTO
+from app.utils.skill_index import skill_index
+from app.utils.user_set import EMPTY
 
-def find_matches(user_id, filters=None):
+def find_matches(user_id, filters=None, fields=None):
     """
     Find potential matches for a user with optional filters
     
     Args:
         user_id (int): ID of the current user
         filters (dict): Dictionary of filters to apply (e.g., {'skill_id': 1, 'location': 'New York'})
+        fields (iterable): Sparse fieldset of UserDTO fields; None for the default list fields
         
     Returns:
         list: List of matched users with their profiles and skills
@@ -26,12 +34,8 @@ def find_matches(user_id, filters=None):
     if not current_user:
         return []
 
-    # Start building the query
-    query = User.query.join(Profile).options(
-        db.joinedload(User.profile),
-        db.joinedload(User.offered_skills),
-        db.joinedload(User.required_skills)
-    ).filter(User.id != user_id)
+    # Start building the query; related rows are batch-loaded afterwards
+    query = without_skill_collections(User.query.join(Profile)).filter(User.id != user_id)
     
     # Apply filters
     if 'location' in filters:
@@ -61,28 +65,144 @@ def find_matches(user_id, filters=None):
     
     # Execute query and format results
     matches = query.all()
+    loader = get_user_loader().load([user.id for user in matches])
     
-    def format_user(user):
-        return {
-            'id': user.id,
-            'name': user.name,
-            'email': user.email,
-            'profile': {
-                'bio': user.profile.bio if user.profile else None,
-                'location': user.profile.location if user.profile else None,
-                'photo_url': user.profile.photo_url if user.profile else None
-            },
-            'offered_skills': [{
-                'id': skill.id,
-                'name': skill.name
-            } for skill in user.offered_skills],
-            'required_skills': [{
-                'id': skill.id,
-                'name': skill.name
-            } for skill in user.required_skills]
-        }
+    fields = UserDTO.LIST_FIELDS if fields is None else fields
+    return [
+        UserDTO.from_loader(user, loader).to_dict(fields, nest_profile=True)
+        for user in matches
+    ]
+
+RANKED_SORTS = ('score', 'reputation')
+
+def find_ranked_matches(user_id, filters=None, limit=20, cursor=None, fields=None, sort='score'):
+    """
+    Find the top `limit` matches for a user, ranked by reciprocal overlap
+
+    A candidate's score is the number of skills they offer that the user
+    requires plus the number of skills they require that the user offers.
+    Results are ordered by score (highest first), then user id, and paged
+    with an opaque keyset cursor over (score, id). With sort='reputation'
+    they are ordered by average rating first (unrated users last), then
+    score and id; ratings come with the profile query, so this costs no
+    extra query. Only the scored candidates' profiles are read (by id, in
+    batches), so the cost follows the number of candidates rather than
+    the number of users.
     
-    return [format_user(user) for user in matches]
+    Args:
+        user_id (int): ID of the current user
+        filters (dict): Same filters as find_matches
+        limit (int): Maximum number of matches to return
+        cursor (str): `next_cursor` from the previous page, if any
+        fields (iterable): Same as find_matches
+        sort (str): One of RANKED_SORTS
+        
+    Returns:
+        dict: {'matches': [...], 'total': int, 'next_cursor': str or None}
+
+    Raises:
+        ValueError: if the cursor or sort is invalid
+    """
+    if filters is None:
+        filters = {}
+    if sort not in RANKED_SORTS:
+        raise ValueError(f"sort must be one of: {', '.join(RANKED_SORTS)}")
+
+    # Ascending sort keys; the cursor holds the last key of the page
+    if sort == 'reputation':
+        def sort_key(candidate):
+            score, candidate_id, average = candidate
+            return (-average, -score, candidate_id)
+        key_length = 3
+    else:
+        def sort_key(candidate):
+            score, candidate_id, _ = candidate
+            return (-score, candidate_id)
+        key_length = 2
+    after = tuple(decode_numeric_cursor(cursor, key_length)) if cursor else None
+
+    # Score every candidate straight from the skill index user sets
+    scores = Counter()
+    for skill_id in skill_index.required_by(user_id):
+        scores.update(skill_index.offerers.get(skill_id, EMPTY))
+    for skill_id in skill_index.offered_by(user_id):
+        scores.update(skill_index.requirers.get(skill_id, EMPTY))
+    scores.pop(user_id, None)
+
+    if 'skill_id' in filters:
+        skill_id = filters['skill_id']
+        with_skill = set(
+            skill_index.offerers.get(skill_id, EMPTY) | skill_index.requirers.get(skill_id, EMPTY)
+        )
+    else:
+        with_skill = None
+
+    candidate_ids = [
+        candidate_id for candidate_id in scores
+        if with_skill is None or candidate_id in with_skill
+    ]
+
+    # Like find_matches, only users with a profile are candidates; their
+    # average rating comes along for sorting
+    averages = {}
+    for start in range(0, len(candidate_ids), BATCH_SIZE):
+        profile_query = select(
+            Profile.user_id, UserReputation.rating_sum, UserReputation.rating_count
+        ).outerjoin(
+            UserReputation, UserReputation.user_id == Profile.user_id
+        ).where(Profile.user_id.in_(candidate_ids[start:start + BATCH_SIZE]))
+        if 'location' in filters:
+            profile_query = profile_query.filter(Profile.location.ilike(f"%{filters['location']}%"))
+        for candidate_id, rating_sum, rating_count in db.session.execute(profile_query):
+            averages[candidate_id] = rating_sum / rating_count if rating_count else 0.0
+
+    candidates = [
+        (scores[candidate_id], candidate_id, averages[candidate_id])
+        for candidate_id in candidate_ids if candidate_id in averages
+    ]
+    total = len(candidates)
+
+    if after is not None:
+        candidates = [candidate for candidate in candidates if sort_key(candidate) > after]
+
+    # Bounded heap: O(n log k) instead of sorting every candidate
+    page = heapq.nsmallest(limit, candidates, key=sort_key)
+    next_cursor = None
+    if len(candidates) > len(page) and page:
+        next_cursor = encode_cursor(*sort_key(page[-1]))
+
+    users = User.query.options(
+        db.joinedload(User.profile),
+        db.joinedload(User.reputation),
+        db.lazyload(User.offered_skills),
+        db.lazyload(User.required_skills)
+    ).filter(User.id.in_([candidate_id for _, candidate_id, _ in page])).all()
+    users_by_id = {user.id: user for user in users}
+
+    fields = UserDTO.LIST_FIELDS if fields is None else fields
+    skill_names = skill_index.skill_names
+    matches = []
+    for score, candidate_id, _ in page:
+        user = users_by_id.get(candidate_id)
+        if user is None:
+            continue
+        profile = user.profile
+        dto = UserDTO(
+            user.id,
+            user.name,
+            email=user.email,
+            bio=profile.bio if profile else None,
+            location=profile.location if profile else None,
+            photo_url=profile.photo_url if profile else None,
+            offered_skills=[SkillDTO(s, skill_names.get(s)) for s in sorted(skill_index.offered_by(user.id))],
+            required_skills=[SkillDTO(s, skill_names.get(s)) for s in sorted(skill_index.required_by(user.id))],
+            reputation=UserReputation.summary(user.reputation)
+        )
+        match = dto.to_dict(fields, nest_profile=True)
+        match['score'] = score
+        matches.append(match)
+
+    return {'matches': matches, 'total': total, 'next_cursor': next_cursor}
 
 def get_available_skills():
     """Get all available skills for filtering"""
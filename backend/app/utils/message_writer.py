@@ -0,0 +1,247 @@
+import atexit
+import datetime
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+
+
+class MessageQueueFull(Exception):
+    """Raised when the write-behind buffer stays full for the enqueue timeout"""
+
+
+_STOP = object()
+
+
+class MessageWriter:
+    """
+    Write-behind buffer for chat messages.
+
+    ``submit`` appends to a bounded FIFO queue and returns a Future. A single
+    writer thread takes whatever has queued up, up to CHAT_WRITE_BATCH_SIZE
+    rows or CHAT_WRITE_FLUSH_INTERVAL seconds after the first one, and
+    inserts the batch in one transaction, with one commit (and fsync) per
+    batch instead of per message: a multi-row INSERT ... RETURNING where the
+    database has it, one INSERT per row otherwise (MySQL), whose ids are
+    then exact. With one writer and a FIFO queue, rows are inserted in
+    submission order, so conversations keep their order.
+
+    Futures resolve to the committed Message's dict once its batch commits,
+    which is when listeners (the chat stream) hear about it too. A message
+    whose (sender_id, client_id) is already stored resolves to the stored
+    one instead, so a client retrying after a timeout sends it once. When the
+    queue is full, ``submit`` waits up to CHAT_WRITE_ENQUEUE_TIMEOUT seconds
+    and then raises MessageQueueFull. The queue is drained on interpreter
+    exit, but it lives in memory, so a message is only safe once its Future
+    resolves. CHAT_WRITE_BEHIND = False writes each message inline instead.
+    """
+
+    def __init__(self):
+        self._app = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._listeners = []
+        self.configure()
+
+    def configure(self, enabled=False, batch_size=500, flush_interval=0.005,
+                  max_pending=10000, enqueue_timeout=0.5):
+        self.shutdown()
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = queue.Queue(maxsize=max_pending)
+
+    def init_app(self, app):
+        self._app = app
+        self.configure(
+            enabled=app.config.get('CHAT_WRITE_BEHIND', True),
+            batch_size=app.config.get('CHAT_WRITE_BATCH_SIZE', 500),
+            flush_interval=app.config.get('CHAT_WRITE_FLUSH_INTERVAL', 0.005),
+            max_pending=app.config.get('CHAT_WRITE_MAX_PENDING', 10000),
+            enqueue_timeout=app.config.get('CHAT_WRITE_ENQUEUE_TIMEOUT', 0.5),
+        )
+        atexit.unregister(self.shutdown)
+        atexit.register(self.shutdown)
+
+    def add_listener(self, callback):
+        """Call `callback(payloads)` with the dicts of every committed batch"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def _ensure_started(self):
+        # Started lazily, and again in a forked worker, where threads do not survive
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='message-writer', daemon=True)
+                self._thread.start()
+
+    def shutdown(self, timeout=10.0):
+        """Flush everything queued so far and stop the writer thread"""
+        thread = self._thread
+        if thread is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        self._thread = None
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def submit(self, sender_id, receiver_id, content, client_id=None):
+        """
+        Queue a message for insertion
+
+        Returns:
+            Future: resolves to the message dict once it is committed
+
+        Raises:
+            MessageQueueFull: if the buffer stayed full for the enqueue timeout
+        """
+        message = {
+            'sender_id': sender_id,
+            'receiver_id': receiver_id,
+            'content': content,
+            'client_id': client_id,
+            # Stamped at submission, so the timestamp order is the send order,
+            # in whole seconds as the TIMESTAMP column stores it: the published
+            # message then matches what a later read returns
+            'timestamp': datetime.datetime.utcnow().replace(microsecond=0),
+        }
+        future = Future()
+        if not self.enabled:
+            self._write([(message, future)])
+            return future
+
+        self._ensure_started()
+        try:
+            self._queue.put((message, future), timeout=self.enqueue_timeout)
+        except queue.Full:
+            raise MessageQueueFull('Message queue is full')
+        return future
+
+    # ------------------ Writer thread ------------------
+
+    def _next_batch(self):
+        """Block for one item, then take more until the batch is full or the interval ends"""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                self._write_logged(batch)
+        # Drain whatever was queued behind the stop marker
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        for start in range(0, len(leftover), self.batch_size):
+            self._write_logged(leftover[start:start + self.batch_size])
+
+    def _write_logged(self, batch):
+        # The thread must outlive any one failed batch
+        try:
+            self._write(batch)
+        except Exception as e:
+            self._app.logger.exception('Message writer failed')
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def _write(self, batch):
+        with self._app.app_context():
+            try:
+                payloads = self._insert([message for message, _ in batch])
+                futures = [future for _, future in batch]
+            except Exception:
+                db.session.rollback()
+                # One bad row (e.g. a deleted receiver) must not sink the others
+                payloads, futures = [], []
+                for message, future in batch:
+                    try:
+                        payloads.extend(self._insert([message]))
+                        futures.append(future)
+                    except Exception as e:
+                        db.session.rollback()
+                        stored = self._stored_duplicate(message) if isinstance(e, IntegrityError) else None
+                        if stored is not None:
+                            # A retry of a message that is already stored (and published)
+                            future.set_result(stored)
+                            continue
+                        self._app.logger.exception('Could not store message')
+                        future.set_exception(e)
+            finally:
+                db.session.remove()
+
+        for future, payload in zip(futures, payloads):
+            future.set_result(payload)
+        if payloads:
+            for callback in self._listeners:
+                callback(payloads)
+
+    @staticmethod
+    def _insert(messages):
+        """Insert and commit `messages` (column dicts) in one transaction and return their dicts"""
+        from app.models import Message
+
+        table = Message.__table__
+        conn = db.session.connection()
+        if conn.dialect.insert_executemany_returning_sort_by_parameter_order:
+            # Multi-row INSERT ... RETURNING, ids in parameter order
+            ids = conn.execute(
+                insert(table).returning(table.c.id, sort_by_parameter_order=True), messages
+            ).scalars().all()
+        else:
+            # MySQL has no RETURNING, and a multi-row INSERT's ids need not be
+            # consecutive (innodb_autoinc_lock_mode=2 interleaves concurrent
+            # inserts): one INSERT per row, each reporting its own id. Still
+            # one commit for the batch.
+            statement = insert(table)
+            ids = [conn.execute(statement, message).lastrowid for message in messages]
+        db.session.commit()
+        return [Message(id=message_id, **message).to_dict() for message_id, message in zip(ids, messages)]
+
+    @staticmethod
+    def _stored_duplicate(message):
+        """The stored message with the same sender and client_id, as a dict, if any"""
+        from app.models import Message
+
+        if message['client_id'] is None:
+            return None
+        stored = db.session.scalar(select(Message).where(
+            Message.sender_id == message['sender_id'], Message.client_id == message['client_id']
+        ))
+        return stored.to_dict() if stored is not None else None
+
+
+message_writer = MessageWriter()
@@ -0,0 +1,218 @@
+"""
+Per-request SQL/latency instrumentation and a Prometheus endpoint.
+
+Engine hooks time every statement; inside a request, the count and time
+are added to the request's totals, sent back in a ``Server-Timing`` header
+and aggregated per route. Statements slower than SLOW_QUERY_SECONDS are
+logged with the route that sent them. GET /metrics (only served with the
+METRICS_TOKEN bearer token) exports the per-route latency histograms and
+SQL totals, pool stats and cache hit rates in the Prometheus text format.
+
+The hooks only do a perf_counter() call, a few additions and one bisect
+per request under a lock, so they are meant to stay on in production.
+"""
+import bisect
+import threading
+import time
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+
+from app import db
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Longest statement text written to the slow-query log
+SLOW_QUERY_MAX_CHARS = 500
+
+
+def _route():
+    """Route label of the current request: the URL rule, not the concrete path"""
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class RouteStats:
+    __slots__ = ('buckets', 'count', 'seconds', 'statements', 'db_seconds', 'slow_queries', 'statuses')
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.slow_queries = 0
+        self.statuses = {}
+
+
+class Metrics:
+    """Request and SQL metrics for one process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self._caches = {}
+        self.slow_query_seconds = 0.5
+        self.token = None
+        self._app = None
+
+    def init_app(self, app):
+        self._app = app
+        self.slow_query_seconds = app.config.get('SLOW_QUERY_SECONDS', 0.5)
+        self.token = app.config.get('METRICS_TOKEN')
+        with app.app_context():
+            engine = db.engine
+        if not event.contains(engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.listen(engine, 'handle_error', self._handle_error)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        # Like the user export, never public: off unless a token is configured
+        if app.config.get('METRICS_ENDPOINT', True) and self.token:
+            app.add_url_rule('/metrics', 'metrics', self.endpoint, methods=['GET'])
+
+        from app.auth import claims_cache
+        from app.utils.skill_catalog import skill_catalog
+        from app.utils.user_count import user_count
+        self.register_cache('auth_claims', claims_cache)
+        self.register_cache('skill_catalog', skill_catalog)
+        self.register_cache('user_count', user_count)
+
+    def register_cache(self, name, cache):
+        """Export `cache.hits` and `cache.misses` under `name`"""
+        self._caches[name] = cache
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
+
+    # ------------------ Hooks ------------------
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        if not has_request_context():
+            return
+        totals = g.get('_sql_totals')
+        if totals is not None:
+            totals[0] += 1
+            totals[1] += elapsed
+        if elapsed >= self.slow_query_seconds:
+            route = _route()
+            with self._lock:
+                self._stats(route, request.method).slow_queries += 1
+            self._app.logger.warning(
+                'Slow query (%.1f ms) in %s %s: %s',
+                elapsed * 1000, request.method, route, ' '.join(statement.split())[:SLOW_QUERY_MAX_CHARS]
+            )
+
+    def _handle_error(self, exception_context):
+        # A failed statement never reaches after_cursor_execute
+        conn = exception_context.connection
+        if conn is not None and conn.info.get('query_started'):
+            conn.info['query_started'].pop()
+
+    def _before_request(self):
+        g._request_started = time.perf_counter()
+        g._sql_totals = [0, 0.0]
+
+    def _after_request(self, response):
+        started = g.get('_request_started')
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        statements, db_seconds = g._sql_totals
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={db_seconds * 1000:.2f};desc="{statements} queries", app;dur={elapsed * 1000:.2f}'
+        )
+        route = _route()
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, elapsed)
+        with self._lock:
+            stats = self._stats(route, request.method)
+            stats.buckets[bucket] += 1
+            stats.count += 1
+            stats.seconds += elapsed
+            stats.statements += statements
+            stats.db_seconds += db_seconds
+            stats.statuses[response.status_code] = stats.statuses.get(response.status_code, 0) + 1
+        return response
+
+    def _stats(self, route, method):
+        key = (route, method)
+        stats = self._routes.get(key)
+        if stats is None:
+            stats = self._routes[key] = RouteStats()
+        return stats
+
+    # ------------------ Export ------------------
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        from app.utils.db_pool import get_pool_status
+
+        with self._lock:
+            routes = [
+                (route, method, stats.buckets[:], stats.count, stats.seconds, stats.statements,
+                 stats.db_seconds, stats.slow_queries, dict(stats.statuses))
+                for (route, method), stats in sorted(self._routes.items())
+            ]
+
+        lines = [
+            '# HELP http_request_duration_seconds Request latency by route',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for route, method, buckets, count, seconds, *_ in routes:
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS + ('+Inf',), buckets):
+                cumulative += bucket_count
+                lines.append(f'http_request_duration_seconds_bucket'
+                             f'{_labels(route=route, method=method, le=bound)} {cumulative}')
+            lines.append(f'http_request_duration_seconds_sum{_labels(route=route, method=method)} {seconds:.6f}')
+            lines.append(f'http_request_duration_seconds_count{_labels(route=route, method=method)} {count}')
+
+        lines += ['# HELP http_responses_total Responses by route and status', '# TYPE http_responses_total counter']
+        for route, method, *_, statuses in routes:
+            for status, count in sorted(statuses.items()):
+                lines.append(f'http_responses_total{_labels(route=route, method=method, status=status)} {count}')
+
+        for name, kind, help_text, index, fmt in (
+            ('db_statements_total', 'counter', 'SQL statements sent by requests', 5, '{}'),
+            ('db_duration_seconds_total', 'counter', 'Time spent in SQL statements by requests', 6, '{:.6f}'),
+            ('db_slow_queries_total', 'counter', 'Statements slower than SLOW_QUERY_SECONDS', 7, '{}'),
+        ):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+            for route in routes:
+                lines.append(f'{name}{_labels(route=route[0], method=route[1])} {fmt.format(route[index])}')
+
+        with self._app.app_context():
+            pool = get_pool_status()
+        lines += ['# HELP db_pool Connection pool state and counters', '# TYPE db_pool gauge']
+        for key, value in sorted(pool.items()):
+            if isinstance(value, (int, float)):
+                lines.append(f'db_pool{_labels(stat=key)} {value}')
+
+        lines += ['# HELP cache_requests_total Cache lookups by result', '# TYPE cache_requests_total counter']
+        for name, cache in sorted(self._caches.items()):
+            lines.append(f'cache_requests_total{_labels(cache=name, result="hit")} {cache.hits}')
+            lines.append(f'cache_requests_total{_labels(cache=name, result="miss")} {cache.misses}')
+        return '\n'.join(lines) + '\n'
+
+    def endpoint(self):
+        if request.headers.get('Authorization') != f'Bearer {self.token}':
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+
+metrics = Metrics()
@@ -0,0 +1,58 @@
+import base64
+import json
+
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(*values):
+    """Encode keyset values into an opaque, URL-safe cursor string"""
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, length):
+    """
+    Decode a cursor produced by encode_cursor
+
+    Raises:
+        ValueError: if the cursor is malformed or does not hold `length` values
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def decode_numeric_cursor(cursor, length):
+    """
+    Decode a cursor whose values are all numbers (ids, scores)
+
+    Raises:
+        ValueError: like decode_cursor, or if a value is not a number
+    """
+    values = decode_cursor(cursor, length)
+    if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def parse_limit(value, default=20, maximum=MAX_PAGE_SIZE):
+    """
+    Parse a page size query parameter, capped at `maximum`
+
+    Raises:
+        ValueError: if the value is not a positive integer
+    """
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except (ValueError, TypeError):
+        raise ValueError('limit must be a positive integer')
+    if limit < 1:
+        raise ValueError('limit must be a positive integer')
+    return min(limit, maximum)
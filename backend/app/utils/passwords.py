@@ -0,0 +1,141 @@
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+import bcrypt
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool is saturated or a job timed out"""
+
+
+# ------------------ Worker functions (run in the pool processes) ------------------
+
+def _prepare(password, handle_long_passwords):
+    password = password.encode('utf-8') if isinstance(password, str) else password
+    if handle_long_passwords:
+        password = hashlib.sha256(password).hexdigest().encode('utf-8')
+    return password
+
+
+def _hash_password(password, rounds, prefix, handle_long_passwords):
+    salt = bcrypt.gensalt(rounds=rounds, prefix=prefix.encode('utf-8'))
+    return bcrypt.hashpw(_prepare(password, handle_long_passwords), salt).decode('utf-8')
+
+
+def _check_password(pw_hash, password, handle_long_passwords):
+    pw_hash = pw_hash.encode('utf-8')
+    try:
+        return hmac.compare_digest(bcrypt.hashpw(_prepare(password, handle_long_passwords), pw_hash), pw_hash)
+    except ValueError:
+        # Malformed hash or over-long password
+        return False
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification on a bounded process pool so a
+    burst of logins cannot pin the request threads.
+
+    At most PASSWORD_HASH_MAX_PENDING jobs may be queued or running; beyond
+    that, and when a job exceeds PASSWORD_HASH_TIMEOUT seconds, callers get
+    PasswordHasherBusy immediately. PASSWORD_HASH_WORKERS = 0 hashes inline.
+    The cost and prefix come from Flask-Bcrypt's BCRYPT_* settings.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self.configure()
+
+    def configure(self, workers=0, max_pending=0, timeout=10.0, rounds=12, prefix='2b',
+                  handle_long_passwords=False):
+        self.shutdown()
+        self.workers = workers
+        self.max_pending = max_pending or workers * 4
+        self.timeout = timeout
+        self.rounds = rounds
+        self.prefix = prefix
+        self.handle_long_passwords = handle_long_passwords
+        self._slots = threading.BoundedSemaphore(max(self.max_pending, 1))
+
+    def init_app(self, app):
+        self.configure(
+            workers=app.config.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1),
+            max_pending=app.config.get('PASSWORD_HASH_MAX_PENDING', 0),
+            timeout=app.config.get('PASSWORD_HASH_TIMEOUT', 10.0),
+            rounds=app.config.get('BCRYPT_LOG_ROUNDS', 12),
+            prefix=app.config.get('BCRYPT_HASH_PREFIX', '2b'),
+            handle_long_passwords=app.config.get('BCRYPT_HANDLE_LONG_PASSWORDS', False),
+        )
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy('Password hashing queue is full')
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot is held until the job really finishes, even after a timeout
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise PasswordHasherBusy('Password hashing timed out')
+
+    def hash(self, password):
+        if not password:
+            raise ValueError('Password must be non-empty.')
+        return self._run(_hash_password, password, self.rounds, self.prefix, self.handle_long_passwords)
+
+    def hash_many(self, passwords):
+        """
+        Hash a batch of passwords spread over all pool processes, for bulk
+        jobs. Blocks until done and bypasses the pending-job limit.
+        """
+        if not passwords:
+            return []
+        if any(not password for password in passwords):
+            raise ValueError('Password must be non-empty.')
+        count = len(passwords)
+        args = (passwords, [self.rounds] * count, [self.prefix] * count, [self.handle_long_passwords] * count)
+        if not self.workers:
+            return list(map(_hash_password, *args))
+        return list(self._get_executor().map(_hash_password, *args, chunksize=max(1, count // (self.workers * 4))))
+
+    def check(self, pw_hash, password):
+        if not pw_hash or not password:
+            return False
+        return self._run(_check_password, pw_hash, password, self.handle_long_passwords)
+
+    def needs_rehash(self, pw_hash):
+        """True when the hash was made with a different cost or prefix than configured"""
+        # bcrypt hashes look like $2b$12$<salt+hash>
+        parts = pw_hash.split('$') if pw_hash else []
+        if len(parts) != 4:
+            return True
+        return parts[1] != self.prefix or parts[2] != f'{self.rounds:02d}'
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,230 @@
+import collections
+import json
+import logging
+import os
+import threading
+import time
+
+from app.utils.serializers import dumps
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    One subscriber's bounded inbox
+
+    A subscriber that falls more than `maxsize` messages behind loses the
+    oldest ones and has `overflowed` set, so it can resynchronize instead of
+    holding memory for a client that stopped reading.
+    """
+
+    def __init__(self, hub, topics, maxsize):
+        self.hub = hub
+        self.topics = topics
+        self.overflowed = False
+        self.closed = False
+        self._messages = collections.deque(maxlen=maxsize)
+        self._ready = threading.Condition(threading.Lock())
+
+    def put(self, message):
+        with self._ready:
+            if len(self._messages) == self._messages.maxlen:
+                self.overflowed = True
+            self._messages.append(message)
+            self._ready.notify()
+
+    def get(self, timeout=None):
+        """
+        Wait for the next message
+
+        Returns:
+            The message, or None after `timeout` seconds or once closed
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._ready:
+            while not self._messages and not self.closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._ready.wait(remaining)
+            return self._messages.popleft() if self._messages else None
+
+    def mark_overflowed(self):
+        """Tell the reader messages may have been lost, so it resynchronizes"""
+        with self._ready:
+            self.overflowed = True
+            self._ready.notify()
+
+    def close(self):
+        self.hub.unsubscribe(self)
+        with self._ready:
+            self.closed = True
+            self._ready.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RedisBroker:
+    """
+    Relays a PubSub's messages between processes through Redis pub/sub
+
+    Every process runs one listener thread on a pattern subscription to all
+    topics and hands what it receives to its own hub, so a message published
+    by any worker reaches the streams of every worker. Redis pub/sub does not
+    keep messages for a disconnected listener: after reconnecting, every
+    local subscription is marked overflowed, so its client replays what it
+    missed from the database.
+    """
+
+    RECONNECT_DELAY = 1.0
+
+    def __init__(self, client, hub, prefix='pubsub:', ready_timeout=5.0):
+        self.client = client
+        self.hub = hub
+        self.prefix = prefix
+        self.ready_timeout = ready_timeout
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def publish(self, topic, message):
+        """
+        Returns:
+            int: number of processes listening, 0 if Redis could not be reached
+        """
+        try:
+            return self.client.publish(self.prefix + topic, dumps(message))
+        except Exception:
+            # The message is stored; the listeners' reconnect makes streams replay it
+            logger.exception('Could not publish to %s', topic)
+            return 0
+
+    def ensure_started(self):
+        """Start the listener if needed and wait (briefly) until it is subscribed"""
+        # Started lazily, and again in a forked worker, where threads do not survive
+        if self._thread is None or self._pid != os.getpid():
+            with self._start_lock:
+                if self._thread is None or self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    self._ready.clear()
+                    self._thread = threading.Thread(target=self._run, name='pubsub-redis', daemon=True)
+                    self._thread.start()
+        # If Redis is down, go on: the reconnect resynchronizes this subscriber
+        self._ready.wait(self.ready_timeout)
+
+    def _run(self):
+        reconnecting = False
+        while True:
+            listener = self.client.pubsub()
+            try:
+                listener.psubscribe(self.prefix + '*')
+                for item in listener.listen():
+                    if item['type'] == 'psubscribe':
+                        self._ready.set()
+                        if reconnecting:
+                            # Anything published while disconnected was lost
+                            self.hub.mark_all_overflowed()
+                    elif item['type'] == 'pmessage':
+                        topic = item['channel'][len(self.prefix):]
+                        if isinstance(topic, bytes):
+                            topic = topic.decode('utf-8')
+                        self.hub.deliver(topic, json.loads(item['data']))
+            except Exception:
+                logger.exception('Lost the Redis pub/sub connection')
+            finally:
+                self._ready.clear()
+                listener.close()
+            reconnecting = True
+            time.sleep(self.RECONNECT_DELAY)
+
+
+class PubSub:
+    """
+    Topic fan-out to in-process subscribers
+
+    Publishing only appends to each subscriber's inbox and never blocks on a
+    slow reader. Without a broker, messages reach subscribers of the
+    publishing process only, so a deployment with several worker processes
+    sets PUBSUB_REDIS_URL: messages then go through Redis (see RedisBroker)
+    and reach the subscribers of every process.
+    """
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self.broker = None
+        self._lock = threading.Lock()
+        self._topics = {}
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('PUBSUB_SUBSCRIBER_BUFFER', 1000)
+        url = app.config.get('PUBSUB_REDIS_URL')
+        if url:
+            # Only needed with a broker
+            import redis
+
+            # Health checks notice a silently dropped listener connection
+            client = redis.Redis.from_url(url, health_check_interval=30)
+            self.broker = RedisBroker(client, self,
+                                      prefix=app.config.get('PUBSUB_REDIS_PREFIX', 'pubsub:'))
+        else:
+            self.broker = None
+
+    def subscribe(self, *topics):
+        if self.broker is not None:
+            self.broker.ensure_started()
+        subscription = Subscription(self, topics, self.maxsize)
+        with self._lock:
+            for topic in topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[topic]
+
+    def publish(self, topic, message):
+        """
+        Send `message` to the subscribers of `topic`, in every process if
+        there is a broker
+
+        Returns:
+            int: number of subscribers (without a broker) or processes (with
+            one) the message was sent to
+        """
+        if self.broker is not None:
+            return self.broker.publish(topic, message)
+        return self.deliver(topic, message)
+
+    def deliver(self, topic, message):
+        """Hand `message` to this process's subscribers of `topic`"""
+        with self._lock:
+            subscribers = tuple(self._topics.get(topic, ()))
+        for subscription in subscribers:
+            subscription.put(message)
+        return len(subscribers)
+
+    def mark_all_overflowed(self):
+        with self._lock:
+            subscriptions = {s for subscribers in self._topics.values() for s in subscribers}
+        for subscription in subscriptions:
+            subscription.mark_overflowed()
+
+    def subscriber_count(self, topic=None):
+        with self._lock:
+            if topic is not None:
+                return len(self._topics.get(topic, ()))
+            return len({s for subscribers in self._topics.values() for s in subscribers})
+
+
+pubsub = PubSub()
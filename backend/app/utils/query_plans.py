@@ -0,0 +1,186 @@
+"""
+Query plan regression checks for the hot paths.
+
+Each hot route is requested once to warm the in-process indexes and caches,
+then again while every SELECT it sends is recorded. Those statements, plus a
+few hot write-path queries without a GET route, are EXPLAINed and any
+full table scan of a table not allowed for that check is reported:
+
+    flask check-query-plans [--user-id N] [--verbose]
+
+The command exits with status 1 when a check fails. SQLite plans do not
+depend on table sizes, but MySQL picks a full scan over an index for tiny
+tables, so run it on MySQL against a realistically sized database.
+"""
+import re
+import secrets
+from contextlib import contextmanager
+
+import click
+from sqlalchemy import event, select
+
+from app import db
+
+# (method, path template, tables a full scan is expected on)
+HOT_ROUTES = [
+    ('GET', '/api/profile/', ()),
+    ('GET', '/api/users', ()),
+    ('GET', '/api/users?cursor={users_cursor}', ()),
+    ('GET', '/api/users?search={search}', ()),
+    ('GET', '/api/users/{other_id}', ()),
+    ('GET', '/api/users/export', ('users',)),  # streams every user
+    ('GET', '/api/skills/{skill_id}/users', ()),
+    ('GET', '/api/matches', ()),
+    ('GET', '/api/barter-cycles', ()),
+    ('GET', '/api/matching/?limit=20', ()),
+    ('GET', '/api/sessions/', ()),
+]
+
+SQLITE_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+ALIAS_SUFFIX_RE = re.compile(r'_\d+$')
+
+
+def hot_queries(ctx):
+    """(name, Query) for hot reads that no GET route sends"""
+    from app.models import BarterSession, Message
+
+    return [
+        ('barter session duplicate check', BarterSession.open_duplicate_query(
+            ctx['user_id'], ctx['other_id'], ctx['skill_id'], ctx['skill_id'])),
+        ('conversation history', Message.conversation_query(
+            ctx['user_id'], ctx['other_id']).limit(50)),
+    ]
+
+
+@contextmanager
+def recording(engine):
+    """Collect (statement, parameters) of the SELECTs sent through `engine`"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def explain(conn, statement, parameters=None):
+    """
+    EXPLAIN a DBAPI-level statement
+
+    Returns:
+        tuple: (plan lines, names of fully scanned tables)
+    """
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters or ()).all()
+        plan = [row[-1] for row in rows]
+        scans = []
+        for detail in plan:
+            match = SQLITE_SCAN_RE.match(detail)
+            if match and 'INDEX' not in detail:
+                scans.append(match.group(1))
+    elif dialect in ('mysql', 'mariadb'):
+        rows = conn.exec_driver_sql('EXPLAIN ' + statement, parameters or ()).mappings().all()
+        plan = [f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']}" for row in rows]
+        scans = [row['table'] for row in rows if row['type'] == 'ALL']
+    else:
+        raise RuntimeError(f'EXPLAIN is not supported for {dialect}')
+    # Strip SQLAlchemy's alias suffixes (skills_1 -> skills)
+    return plan, [ALIAS_SUFFIX_RE.sub('', table) for table in scans]
+
+
+def _sample_context(user_id=None):
+    """Ids and a search term to fill the route templates with"""
+    from app.models import User, user_offered_skills
+    from app.utils.pagination import encode_cursor
+
+    if user_id is None:
+        user_id = db.session.scalar(select(User.id).order_by(User.id).limit(1))
+    other_id = db.session.scalar(select(User.id).where(User.id != user_id).order_by(User.id).limit(1))
+    skill_id = db.session.scalar(select(user_offered_skills.c.skill_id).limit(1))
+    other = db.session.get(User, other_id) if other_id else None
+    if user_id is None or other is None or skill_id is None:
+        raise click.ClickException('Needs at least two users and one offered skill')
+    return {
+        'user_id': user_id,
+        'other_id': other_id,
+        'skill_id': skill_id,
+        'search': other.name.split()[0] if other.name.split() else 'a',
+        'users_cursor': encode_cursor(other_id),
+    }
+
+
+def check_plans(app, user_id=None, verbose=False):
+    """
+    Run every check, printing one line per statement
+
+    Returns:
+        int: number of statements with unexpected full scans
+    """
+    from app.utils.auth import generate_token
+
+    ctx = _sample_context(user_id)
+    headers = {'Authorization': f"Bearer {generate_token(ctx['user_id'])}"}
+    # The export route is off without a token; this process is the only client
+    app.config['EXPORT_TOKEN'] = app.config.get('EXPORT_TOKEN') or secrets.token_hex(16)
+    export_headers = {'Authorization': f"Bearer {app.config['EXPORT_TOKEN']}"}
+    client = app.test_client()
+    failures = 0
+
+    def report(label, statements, allowed):
+        nonlocal failures
+        with db.engine.connect() as conn:
+            for statement, parameters in statements:
+                plan, scans = explain(conn, statement, parameters)
+                unexpected = sorted(set(scans) - set(allowed))
+                failures += bool(unexpected)
+                status = f"FULL SCAN of {', '.join(unexpected)}" if unexpected else 'ok'
+                click.echo(f'{label:<45} {status}')
+                if verbose or unexpected:
+                    click.echo(f'    {" ".join(statement.split())}')
+                    for line in plan:
+                        click.echo(f'    -> {line}')
+
+    for method, template, allowed in HOT_ROUTES:
+        path = template.format(**ctx)
+        route_headers = export_headers if path.startswith('/api/users/export') else headers
+        # Requests reuse an already pushed app context (and with it `g` and the
+        # session), so give each one its own
+        with app.app_context():
+            # Warm-up: first requests also build the in-process indexes
+            client.open(path, method=method, headers=route_headers).close()
+        with app.app_context(), recording(db.engine) as statements:
+            response = client.open(path, method=method, headers=route_headers)
+            response.close()
+        if response.status_code >= 400:
+            failures += 1
+            click.echo(f'{method} {template:<41} HTTP {response.status_code}')
+            continue
+        if not statements:
+            click.echo(f'{method} {template:<41} no SQL')
+        report(f'{method} {template}', statements, allowed)
+
+    for name, query in hot_queries(ctx):
+        # Run them for real: that is the simplest way to get driver-level SQL
+        with recording(db.engine) as statements:
+            query.all()
+        report(name, statements, ())
+
+    return failures
+
+
+def init_app(app):
+    @app.cli.command('check-query-plans')
+    @click.option('--user-id', type=int, default=None, help='User to authenticate as')
+    @click.option('--verbose', is_flag=True, help='Print every statement and plan')
+    def check_query_plans(user_id, verbose):
+        """EXPLAIN the hot queries and fail on unexpected full table scans"""
+        failures = check_plans(app, user_id=user_id, verbose=verbose)
+        if failures:
+            raise click.ClickException(f'{failures} check(s) failed')
+        click.echo('All query plans use indexes')
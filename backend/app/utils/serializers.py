@@ -0,0 +1,172 @@
+import datetime
+import json
+
+from flask import Response, jsonify, request
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# Lists longer than this are encoded and sent in chunks instead of one body
+STREAM_THRESHOLD = 500
+STREAM_CHUNK_SIZE = 200
+
+
+def _default(obj):
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def dumps(obj):
+    """Encode to compact UTF-8 JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def init_app(app):
+    @app.errorhandler(FieldsError)
+    def fields_error(e):
+        return jsonify({'error': str(e)}), 400
+
+
+def parse_fields(value, allowed):
+    """
+    Parse a ?fields=a,b,c sparse fieldset
+
+    Returns:
+        frozenset or None: the requested fields, or None for all fields
+
+    Raises:
+        FieldsError: if a field is not in `allowed`
+    """
+    if not value:
+        return None
+    fields = frozenset(f.strip() for f in value.split(',') if f.strip())
+    unknown = fields - frozenset(allowed)
+    if unknown:
+        raise FieldsError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    return fields
+
+
+def requested_fields(allowed, default=None):
+    """The ?fields= of the current request, or `default` when absent"""
+    fields = parse_fields(request.args.get('fields'), allowed)
+    return default if fields is None else fields
+
+
+class SkillDTO:
+    __slots__ = ('id', 'name')
+
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+
+    @classmethod
+    def from_model(cls, skill):
+        return cls(skill.id, skill.name)
+
+    def to_dict(self):
+        return {'id': self.id, 'name': self.name}
+
+
+class UserDTO:
+    """Plain snapshot of a user's public data, detached from the session"""
+
+    FIELDS = ('id', 'name', 'email', 'bio', 'photo_url', 'location', 'availability',
+              'offered_skills', 'required_skills', 'reputation')
+    # Fields of list payloads (availability is only on the single-user payload)
+    LIST_FIELDS = frozenset(FIELDS) - {'availability'}
+    PROFILE_FIELDS = ('bio', 'location', 'photo_url', 'availability')
+    __slots__ = FIELDS
+
+    def __init__(self, id, name, email=None, bio=None, photo_url=None, location=None,
+                 availability=None, offered_skills=(), required_skills=(), reputation=None):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.bio = bio
+        self.photo_url = photo_url
+        self.location = location
+        self.availability = availability
+        self.offered_skills = offered_skills
+        self.required_skills = required_skills
+        self.reputation = reputation  # UserReputation.summary() dict
+
+    @classmethod
+    def from_loader(cls, user, loader):
+        """Build from a User and a UserBatchLoader that has loaded its id"""
+        profile = loader.profile(user.id)
+        return cls(
+            user.id,
+            user.name,
+            email=user.email,
+            bio=profile.bio if profile else None,
+            photo_url=profile.photo_url if profile else None,
+            location=profile.location if profile else None,
+            availability=profile.availability if profile else None,
+            offered_skills=[SkillDTO.from_model(s) for s in loader.offered_skills(user.id)],
+            required_skills=[SkillDTO.from_model(s) for s in loader.required_skills(user.id)],
+            reputation=loader.reputation(user.id),
+        )
+
+    def to_dict(self, fields=None, defaults=None, renames=None, nest_profile=False):
+        """
+        Args:
+            fields (iterable): Fields to include (id is always included); None for all
+            defaults (dict): Values to use instead of None for some fields
+            renames (dict): Output key for some fields, e.g. {'required_skills': 'requested_skills'}
+            nest_profile (bool): Put the profile fields under a 'profile' key
+        """
+        data = {}
+        profile = {}
+        for name in self.FIELDS:
+            if fields is not None and name != 'id' and name not in fields:
+                continue
+            value = getattr(self, name)
+            if value is None and defaults and name in defaults:
+                value = defaults[name]
+            elif name in ('offered_skills', 'required_skills'):
+                value = [skill.to_dict() for skill in value]
+            key = renames.get(name, name) if renames else name
+            if nest_profile and name in self.PROFILE_FIELDS:
+                profile[key] = value
+            else:
+                data[key] = value
+        if nest_profile and (profile or fields is None):
+            data['profile'] = profile
+        return data
+
+
+def json_response(payload, status=200, headers=None):
+    return Response(dumps(payload), status=status, headers=headers, mimetype='application/json')
+
+
+def json_list_response(items, prefix=b'', suffix=b'', status=200, headers=None):
+    """
+    Respond with a JSON array of already-serialized dicts
+
+    Small lists are encoded in one go; long lists are streamed in chunks so
+    the first bytes go out before the whole array is encoded. `prefix` and
+    `suffix` wrap the array, e.g. b'{"data":' and b'}'.
+    """
+    if len(items) <= STREAM_THRESHOLD:
+        return Response(prefix + dumps(items) + suffix, status=status, headers=headers,
+                        mimetype='application/json')
+
+    def generate():
+        yield prefix + b'['
+        for start in range(0, len(items), STREAM_CHUNK_SIZE):
+            chunk = dumps(items[start:start + STREAM_CHUNK_SIZE])
+            yield (b',' if start else b'') + chunk[1:-1]
+        yield b']' + suffix
+
+    return Response(generate(), status=status, headers=headers, mimetype='application/json')
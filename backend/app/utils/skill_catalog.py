@@ -0,0 +1,112 @@
+import hashlib
+import threading
+import time
+
+from flask import request
+from sqlalchemy import select
+from werkzeug.http import http_date
+
+from app import db
+from app.utils.serializers import dumps
+from app.utils.skill_index import skill_index
+
+
+class SkillCatalog:
+    """
+    Process-local cache of the skill catalog with a content-derived ETag.
+
+    The cache is dropped by ``invalidate()``, which the skill index calls
+    after every commit touching skills or the user/skill join tables (and
+    after it rebuilds). Every read first lets the index rebuild when it is
+    older than SKILL_INDEX_MAX_AGE, so a worker serving only this catalog
+    still picks up other processes' changes. The ETag is a hash of the
+    catalog, so every worker (and a restarted one) gives the same ETag for
+    the same skills. Once the catalog is built, validators are known
+    without a query, so a matching If-None-Match is answered with a 304
+    straight away.
+    User counts come from the skill index user sets instead of a GROUP BY.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = 0
+        self.last_modified = time.time()
+        self.hits = 0
+        self.misses = 0
+        self._catalog = None
+        self._bodies = {}
+
+    def init_app(self, app):
+        self.invalidate()
+        skill_index.add_listener(self.invalidate)
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self.last_modified = time.time()
+            self._catalog = None
+            self._bodies = {}
+
+    @property
+    def etag(self):
+        skill_index.ensure_loaded()
+        return self._current()[1]
+
+    def skills(self):
+        """[{'id', 'name', 'user_count'}] ordered by name"""
+        # A rebuild invalidates the catalog before we look at it
+        skill_index.ensure_loaded()
+        if self._catalog is not None:
+            self.hits += 1
+        return self._current()[0]
+
+    def _current(self):
+        """(skills, etag) of the current version, built on first use"""
+        catalog = self._catalog
+        if catalog is not None:
+            return catalog
+        self.misses += 1
+        from app.models import Skill
+
+        version = self.version
+        rows = db.session.execute(select(Skill.id, Skill.name).order_by(Skill.name)).all()
+        skills = [
+            {'id': skill_id, 'name': name, 'user_count': skill_index.offerer_count(skill_id)}
+            for skill_id, name in rows
+        ]
+        catalog = (skills, 'skills-' + hashlib.sha1(dumps(skills)).hexdigest()[:20])
+        with self._lock:
+            if self.version == version:
+                self._catalog = catalog
+        return catalog
+
+    def body(self, key, build):
+        """Encoded response body for `key`, built from the catalog once per version"""
+        skill_index.ensure_loaded()
+        body = self._bodies.get(key)
+        if body is None:
+            version = self.version
+            body = dumps(build(self.skills()))
+            with self._lock:
+                if self.version == version:
+                    self._bodies[key] = body
+        return body
+
+    def not_modified(self):
+        """True when the request's validators match the current catalog"""
+        skill_index.ensure_loaded()
+        if request.if_none_match:
+            return request.if_none_match.contains_weak(self.etag)
+        if request.if_modified_since:
+            return int(self.last_modified) <= request.if_modified_since.timestamp()
+        return False
+
+    def add_validators(self, response):
+        response.set_etag(self.etag, weak=True)
+        response.headers['Last-Modified'] = http_date(self.last_modified)
+        # Clients may keep the catalog but must revalidate before reuse
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+
+skill_catalog = SkillCatalog()
@@ -0,0 +1,280 @@
+import threading
+import time
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.utils.user_set import EMPTY, UserSet
+
+
+def _build_user_sets(rows):
+    """Build skill_id -> UserSet of user ids from (user_id, skill_id) rows"""
+    users = {}
+    for user_id, skill_id in rows:
+        users.setdefault(skill_id, []).append(user_id)
+    return {skill_id: UserSet(ids) for skill_id, ids in users.items()}
+
+
+class SkillIndex:
+    """
+    Process-local inverted index of the user_offered_skills and
+    user_required_skills join tables.
+
+    For every skill it keeps a UserSet of the users offering it and of the
+    users requiring it (a sorted id array while few users hold the skill, a
+    bitmap once it is dense), plus each user's skill id sets. Reciprocal
+    candidates are then a handful of unions and one intersection.
+
+    The index is loaded lazily on first use and kept current by SQLAlchemy
+    session hooks: skill collection changes on ``User`` objects are applied
+    once their transaction commits. Code writing the join tables with Core
+    statements must call ``set_user_skills`` itself after committing.
+    Changes committed by other processes are picked up when the index is
+    older than ``SKILL_INDEX_MAX_AGE`` seconds.
+    """
+
+    PENDING_KEY = 'skill_index_pending'
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._user_listeners = []
+        self.max_age = None
+        self.reset()
+
+    def add_listener(self, callback):
+        """Call `callback()` whenever the indexed skills or memberships change"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def add_user_listener(self, callback):
+        """Call `callback(user_ids)` with the users whose committed skills changed"""
+        if callback not in self._user_listeners:
+            self._user_listeners.append(callback)
+
+    def notify(self, user_ids=()):
+        for callback in self._listeners:
+            callback()
+        if user_ids:
+            for callback in self._user_listeners:
+                callback(user_ids)
+
+    def init_app(self, app):
+        self.max_age = app.config.get('SKILL_INDEX_MAX_AGE', 300)
+        self.reset()
+        if not event.contains(Session, 'after_flush', _record_changes):
+            event.listen(Session, 'after_flush', _record_changes)
+            event.listen(Session, 'after_commit', _apply_changes)
+            event.listen(Session, 'after_rollback', _discard_changes)
+
+    def reset(self):
+        with self._lock:
+            self.loaded_at = None
+            self.offerers = {}
+            self.requirers = {}
+            self.user_offered = {}
+            self.user_required = {}
+            self.skill_names = {}
+
+    def ensure_loaded(self):
+        loaded_at = self.loaded_at
+        if loaded_at is not None and (not self.max_age or time.monotonic() - loaded_at < self.max_age):
+            return
+        with self._lock:
+            if self.loaded_at is loaded_at:
+                self.load()
+
+    def load(self):
+        """(Re)build the whole index from the join tables"""
+        from app.models import Skill, user_offered_skills, user_required_skills
+
+        offered_rows = db.session.execute(
+            select(user_offered_skills.c.user_id, user_offered_skills.c.skill_id)
+        ).all()
+        required_rows = db.session.execute(
+            select(user_required_skills.c.user_id, user_required_skills.c.skill_id)
+        ).all()
+        skill_names = dict(db.session.execute(select(Skill.id, Skill.name)).all())
+
+        user_offered = {}
+        for user_id, skill_id in offered_rows:
+            user_offered.setdefault(user_id, set()).add(skill_id)
+        user_required = {}
+        for user_id, skill_id in required_rows:
+            user_required.setdefault(user_id, set()).add(skill_id)
+
+        with self._lock:
+            reloaded = self.loaded_at is not None
+            self.offerers = _build_user_sets(offered_rows)
+            self.requirers = _build_user_sets(required_rows)
+            self.user_offered = {uid: frozenset(ids) for uid, ids in user_offered.items()}
+            self.user_required = {uid: frozenset(ids) for uid, ids in user_required.items()}
+            self.skill_names = skill_names
+            self.loaded_at = time.monotonic()
+        # A rebuild may pick up changes made by other processes
+        if reloaded:
+            self.notify()
+
+    def snapshot(self):
+        """
+        Copies of (offerers, requirers, user_offered, user_required), taken
+        together under the lock, for long computations that must not see
+        incremental updates halfway through
+        """
+        self.ensure_loaded()
+        with self._lock:
+            return (dict(self.offerers), dict(self.requirers),
+                    dict(self.user_offered), dict(self.user_required))
+
+    # ------------------ Incremental updates ------------------
+
+    def set_user_skills(self, user_id, offered=None, required=None):
+        """Replace a user's offered and/or required skill ids (None leaves a side unchanged)"""
+        if self.loaded_at is None:
+            return
+        with self._lock:
+            if offered is not None:
+                self._update_side(self.offerers, self.user_offered, user_id, frozenset(offered))
+            if required is not None:
+                self._update_side(self.requirers, self.user_required, user_id, frozenset(required))
+
+    @classmethod
+    def pending(cls, session):
+        """Changes queued on `session`, applied to the index when it commits"""
+        return session.info.setdefault(cls.PENDING_KEY, {'users': {}, 'skills': {}})
+
+    @classmethod
+    def defer_user_skills(cls, session, user_id, offered=None, required=None):
+        """Queue a set_user_skills call until `session` commits"""
+        users = cls.pending(session)['users']
+        old_offered, old_required = users.get(user_id, (None, None))
+        users[user_id] = (
+            old_offered if offered is None else offered,
+            old_required if required is None else required,
+        )
+
+    @classmethod
+    def defer_skill(cls, session, skill_id, name):
+        cls.pending(session)['skills'][skill_id] = name
+
+    def remove_user(self, user_id):
+        self.set_user_skills(user_id, offered=(), required=())
+
+    def add_skill(self, skill_id, name):
+        if self.loaded_at is None:
+            return
+        with self._lock:
+            self.skill_names[skill_id] = name
+
+    @staticmethod
+    def _update_side(skill_users, user_sets, user_id, new_ids):
+        old_ids = user_sets.get(user_id, frozenset())
+        for skill_id in old_ids - new_ids:
+            users = skill_users.get(skill_id, EMPTY).without_user(user_id)
+            if users:
+                skill_users[skill_id] = users
+            else:
+                skill_users.pop(skill_id, None)
+        for skill_id in new_ids - old_ids:
+            skill_users[skill_id] = skill_users.get(skill_id, EMPTY).with_user(user_id)
+        if new_ids:
+            user_sets[user_id] = new_ids
+        else:
+            user_sets.pop(user_id, None)
+
+    # ------------------ Queries ------------------
+
+    def offered_by(self, user_id):
+        self.ensure_loaded()
+        return self.user_offered.get(user_id, frozenset())
+
+    def required_by(self, user_id):
+        self.ensure_loaded()
+        return self.user_required.get(user_id, frozenset())
+
+    def offerer_count(self, skill_id):
+        self.ensure_loaded()
+        return len(self.offerers.get(skill_id, EMPTY))
+
+    def requirer_count(self, skill_id):
+        self.ensure_loaded()
+        return len(self.requirers.get(skill_id, EMPTY))
+
+    @staticmethod
+    def union(skill_users, skill_ids):
+        return UserSet.union(skill_users[skill_id] for skill_id in skill_ids if skill_id in skill_users)
+
+    def reciprocal_matches(self, user_id):
+        """
+        Find users who offer at least one skill ``user_id`` requires and
+        require at least one skill ``user_id`` offers.
+
+        Returns:
+            list: (candidate_id, skill ids they offer that I need,
+                   skill ids they need that I offer) tuples, ordered by id
+        """
+        self.ensure_loaded()
+        offered = self.user_offered.get(user_id, frozenset())
+        required = self.user_required.get(user_id, frozenset())
+        if not offered or not required:
+            return []
+
+        can_teach_me = self.union(self.offerers, required)
+        can_learn_from_me = self.union(self.requirers, offered)
+        candidates = (can_teach_me & can_learn_from_me).without_user(user_id)
+
+        matches = []
+        for candidate_id in candidates:
+            matches.append((
+                candidate_id,
+                self.user_offered.get(candidate_id, frozenset()) & required,
+                self.user_required.get(candidate_id, frozenset()) & offered,
+            ))
+        return matches
+
+    def skills_payload(self, skill_ids):
+        names = self.skill_names
+        return [{'id': skill_id, 'name': names.get(skill_id)} for skill_id in sorted(skill_ids)]
+
+
+skill_index = SkillIndex()
+
+
+# ------------------ Session hooks ------------------
+
+def _record_changes(session, flush_context):
+    from app.models import User, Skill
+
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Skill):
+            SkillIndex.defer_skill(session, obj.id, obj.name)
+        elif isinstance(obj, User):
+            state = inspect(obj)
+            offered_changed = state.attrs.offered_skills.history.has_changes()
+            required_changed = state.attrs.required_skills.history.has_changes()
+            if not (offered_changed or required_changed):
+                continue
+            SkillIndex.defer_user_skills(
+                session, obj.id,
+                offered=[skill.id for skill in obj.offered_skills] if offered_changed else None,
+                required=[skill.id for skill in obj.required_skills] if required_changed else None,
+            )
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            SkillIndex.defer_user_skills(session, obj.id, offered=(), required=())
+
+
+def _apply_changes(session):
+    pending = session.info.pop(SkillIndex.PENDING_KEY, None)
+    if not pending:
+        return
+    for skill_id, name in pending['skills'].items():
+        skill_index.add_skill(skill_id, name)
+    for user_id, (offered, required) in pending['users'].items():
+        skill_index.set_user_skills(user_id, offered=offered, required=required)
+    skill_index.notify(set(pending['users']))
+
+
+def _discard_changes(session):
+    session.info.pop(SkillIndex.PENDING_KEY, None)
@@ -0,0 +1,171 @@
+from sqlalchemy import bindparam, insert, select, update
+
+from app import db
+from app.models import DataVersion, Skill, User, user_offered_skills, user_required_skills
+from app.utils.skill_index import SkillIndex
+
+# Keeps IN lists and multi-row VALUES well under driver/database limits
+BATCH_SIZE = 1000
+# Longer names would be cut by INSERT IGNORE on MySQL and then never found
+MAX_SKILL_NAME_LENGTH = Skill.name.type.length
+
+SIDES = {
+    'offered': user_offered_skills,
+    'required': user_required_skills,
+}
+
+
+def _chunks(items, size=BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _insert_ignore(table):
+    """INSERT that skips rows violating a unique key (another writer got there first)"""
+    stmt = insert(table)
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'mysql':
+        return stmt.prefix_with('IGNORE')
+    if dialect == 'sqlite':
+        return stmt.prefix_with('OR IGNORE')
+    return stmt
+
+
+def clean_skill_names(names):
+    """
+    Strip blanks and drop case-insensitive duplicates, keeping the first spelling
+
+    Raises:
+        ValueError: if a name is longer than the skills.name column allows
+    """
+    seen = set()
+    cleaned = []
+    for name in names or []:
+        name = (name or '').strip()
+        if len(name) > MAX_SKILL_NAME_LENGTH:
+            raise ValueError(f'Skill names must be at most {MAX_SKILL_NAME_LENGTH} characters')
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            cleaned.append(name)
+    return cleaned
+
+
+def resolve_skill_ids(names, create=True):
+    """
+    Map skill names to Skill ids with one SELECT per batch of names
+
+    Args:
+        names (iterable): Skill names; matched by the column's collation
+            (case-insensitive on MySQL), so the unique index on name is used
+        create (bool): Insert missing skills with a multi-row INSERT
+
+    Returns:
+        dict: lowercased name -> skill id (missing names are absent if create=False)
+    """
+    names = clean_skill_names(names)
+    if not names:
+        return {}
+
+    def lookup(batch):
+        rows = db.session.execute(
+            select(Skill.id, Skill.name).where(Skill.name.in_(batch))
+        ).all()
+        return {name.lower(): skill_id for skill_id, name in rows}
+
+    ids = {}
+    for batch in _chunks(names):
+        ids.update(lookup(batch))
+
+    missing = [name for name in names if name.lower() not in ids]
+    if missing and create:
+        for batch in _chunks(missing):
+            db.session.execute(_insert_ignore(Skill.__table__), [{'name': name} for name in batch])
+            created = lookup(batch)
+            ids.update(created)
+            for name in batch:
+                if name.lower() in created:
+                    SkillIndex.defer_skill(db.session, created[name.lower()], name)
+    return ids
+
+
+def sync_user_skills(assignments, commit=True):
+    """
+    Set the offered/required skills of many users, writing only the difference
+
+    Skill names are resolved in bulk (missing skills are created), the
+    current join rows of all the users are read with one IN query per side,
+    and the added/removed pairs are written with batched INSERT/DELETE in
+    the caller's transaction. The users' skills_updated_at and
+    skills_version are bumped and the in-memory skill index is updated once
+    the transaction commits.
+
+    Args:
+        assignments (dict): {user_id: {'offered': [names], 'required': [names]}};
+            a missing or None side is left unchanged
+        commit (bool): Commit the session when done
+
+    Returns:
+        set: ids of the users whose skills changed
+    """
+    all_names = []
+    for sides in assignments.values():
+        for side in SIDES:
+            all_names.extend(sides.get(side) or [])
+    skill_ids = resolve_skill_ids(all_names)
+
+    changed_users = set()
+    for side, table in SIDES.items():
+        wanted = {
+            user_id: {skill_ids[name.lower()] for name in clean_skill_names(sides[side])}
+            for user_id, sides in assignments.items()
+            if sides.get(side) is not None
+        }
+        if not wanted:
+            continue
+
+        current = {user_id: set() for user_id in wanted}
+        for batch in _chunks(wanted):
+            rows = db.session.execute(
+                select(table.c.user_id, table.c.skill_id).where(table.c.user_id.in_(batch))
+            ).all()
+            for user_id, skill_id in rows:
+                current[user_id].add(skill_id)
+
+        to_insert = []
+        to_delete = []
+        for user_id, skill_set in wanted.items():
+            to_insert.extend({'user_id': user_id, 'skill_id': s} for s in skill_set - current[user_id])
+            to_delete.extend({'b_user_id': user_id, 'b_skill_id': s} for s in current[user_id] - skill_set)
+            if skill_set != current[user_id]:
+                changed_users.add(user_id)
+                if side == 'offered':
+                    SkillIndex.defer_user_skills(db.session, user_id, offered=skill_set)
+                else:
+                    SkillIndex.defer_user_skills(db.session, user_id, required=skill_set)
+
+        delete_stmt = table.delete().where(
+            table.c.user_id == bindparam('b_user_id'),
+            table.c.skill_id == bindparam('b_skill_id')
+        )
+        for batch in _chunks(to_delete):
+            db.session.execute(delete_stmt, batch)
+        for batch in _chunks(to_insert):
+            db.session.execute(insert(table), batch)
+
+    if changed_users:
+        version = DataVersion.bump(db.session.connection(), DataVersion.SKILLS)
+    for batch in _chunks(changed_users):
+        db.session.execute(
+            update(User.__table__).where(User.__table__.c.id.in_(batch))
+            .values(skills_updated_at=db.func.now(), skills_version=version)
+        )
+
+    # Core writes bypass the ORM, so make loaded users re-read their collections
+    for obj in list(db.session.identity_map.values()):
+        if isinstance(obj, User) and obj.id in changed_users:
+            db.session.expire(obj, ['offered_skills', 'required_skills', 'skills_updated_at', 'skills_version'])
+
+    if commit:
+        db.session.commit()
+    return changed_users
@@ -0,0 +1,252 @@
+import heapq
+import re
+import threading
+import time
+
+from app.utils.skill_index import skill_index
+from app.utils.user_set import EMPTY
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def normalize(text):
+    """Lowercase and collapse whitespace, as keys and queries are compared"""
+    return ' '.join(text.lower().split()) if text else ''
+
+
+def _common_prefix_len(label, key, start):
+    limit = min(len(label), len(key) - start)
+    i = 0
+    while i < limit and label[i] == key[start + i]:
+        i += 1
+    return i
+
+
+class _Node:
+    __slots__ = ('label', 'children', 'terminals', 'top')
+
+    def __init__(self, label='', children=None, terminals=None, top=None):
+        self.label = label                  # edge label from the parent
+        self.children = children or {}      # first char of label -> node
+        self.terminals = terminals or []    # skill ids whose key ends here
+        self.top = top or []                # best skill ids in this subtree
+
+
+class SkillTypeahead:
+    """
+    Compressed prefix trie (radix tree) over skill names for autocomplete.
+
+    Every skill is keyed by its normalized name from the start of each word,
+    so 'dev' finds 'Web Development'. Each node keeps the ``top_k`` most
+    popular skill ids of its subtree, ranked by offerer + requirer count from
+    the skill index, so a lookup is one walk down the prefix and no scan.
+
+    Skills come from the skill index, which is the only thing loaded from the
+    database. With SKILL_TYPEAHEAD_PRELOAD the trie is built in a background
+    thread once the app serves: when a gunicorn worker starts (see
+    gunicorn.conf.py), or else on the first request, so the first lookup
+    does not pay for it and CLI commands never build it. New skills are
+    inserted when the skill index reports a change;
+    popularity drifts with every skill assignment, so the per-node rankings
+    are recomputed at most every SKILL_TYPEAHEAD_RESCORE_INTERVAL seconds.
+    """
+
+    def __init__(self, top_k=10, rescore_interval=60):
+        self._lock = threading.RLock()
+        self.top_k = top_k
+        self.rescore_interval = rescore_interval
+        self._preload_thread = None
+        self._preload_lock = threading.Lock()
+        self.reset()
+
+    def init_app(self, app):
+        self.top_k = app.config.get('SKILL_TYPEAHEAD_TOP_K', 10)
+        self.rescore_interval = app.config.get('SKILL_TYPEAHEAD_RESCORE_INTERVAL', 60)
+        self.reset()
+        self._preload_thread = None
+        skill_index.add_listener(self._skills_changed)
+        if app.config.get('SKILL_TYPEAHEAD_PRELOAD', True):
+            # Not at creation: `flask db upgrade` and other commands create the app too
+            app.before_request(lambda: self.start_preload(app))
+
+    def start_preload(self, app):
+        """Build the trie in a background thread, once per process"""
+        if self._preload_thread is not None or self.loaded:
+            return
+        with self._preload_lock:
+            if self._preload_thread is None:
+                self._preload_thread = threading.Thread(target=self._preload, args=(app,),
+                                                        name='skill-typeahead-preload', daemon=True)
+                self._preload_thread.start()
+
+    def _preload(self, app):
+        try:
+            with app.app_context():
+                self.ensure_loaded()
+        except Exception:
+            # E.g. tables not migrated yet: the first lookup loads it instead
+            app.logger.warning('Could not preload the skill typeahead', exc_info=True)
+
+    def reset(self):
+        with self._lock:
+            self.root = _Node()
+            self.names = {}        # skill_id -> display name
+            self._sort_names = {}  # skill_id -> normalized name, the tie-breaker
+            self._rank = {}        # skill_id -> sort key, best first
+            self.loaded = False
+            self.scored_at = None
+            self.stale = False
+            self._rescoring = False
+
+    def _rank_key(self, skill_id):
+        # Straight from the user sets: this also runs outside any app context
+        popularity = (len(skill_index.offerers.get(skill_id, EMPTY))
+                      + len(skill_index.requirers.get(skill_id, EMPTY)))
+        return (-popularity, self._sort_names[skill_id], skill_id)
+
+    @staticmethod
+    def _keys(name):
+        key = normalize(name)
+        return {key[match.start():] for match in WORD_RE.finditer(key)}
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    self.load()
+        elif (self.stale and not self._rescoring
+                and time.monotonic() - self.scored_at >= self.rescore_interval):
+            # Re-ranking a large catalog takes a while; keep serving the old ranking
+            self._rescoring = True
+            threading.Thread(target=self._rescore_in_background, daemon=True).start()
+
+    def _rescore_in_background(self):
+        try:
+            self.rescore()
+        finally:
+            self._rescoring = False
+
+    def load(self):
+        """Build the trie from the skill index"""
+        skill_index.ensure_loaded()
+        with self._lock:
+            self.reset()
+            for skill_id, name in list(skill_index.skill_names.items()):
+                self.names[skill_id] = name
+                self._sort_names[skill_id] = normalize(name)
+                for key in self._keys(name):
+                    self._insert(key, skill_id)
+            self.rescore()
+            self.loaded = True
+
+    def rescore(self):
+        """Recompute every node's top skills from the current popularity counts"""
+        with self._lock:
+            self._rank = {skill_id: self._rank_key(skill_id) for skill_id in self.names}
+            self._compute_top(self.root)
+            self.scored_at = time.monotonic()
+            self.stale = False
+
+    def _compute_top(self, node):
+        candidates = set(node.terminals)
+        for child in node.children.values():
+            candidates.update(self._compute_top(child))
+        node.top = heapq.nsmallest(self.top_k, candidates, key=self._rank.__getitem__)
+        return node.top
+
+    # ------------------ Updates ------------------
+
+    def _insert(self, key, skill_id):
+        """Insert `key` and return the nodes along its path, root first"""
+        node = self.root
+        path = [node]
+        i = 0
+        while i < len(key):
+            child = node.children.get(key[i])
+            if child is None:
+                child = _Node(key[i:])
+                node.children[key[i]] = child
+                path.append(child)
+                node = child
+                break
+            common = _common_prefix_len(child.label, key, i)
+            if common < len(child.label):
+                # Split the edge; the old node is replaced, not modified, so
+                # concurrent lookups still see a consistent trie
+                tail = _Node(child.label[common:], child.children, child.terminals, child.top)
+                child = _Node(child.label[:common], {tail.label[0]: tail}, None, list(child.top))
+                node.children[key[i]] = child
+            path.append(child)
+            node = child
+            i += common
+        if skill_id not in node.terminals:
+            node.terminals = node.terminals + [skill_id]
+        return path
+
+    def add_skill(self, skill_id, name):
+        with self._lock:
+            self.names[skill_id] = name
+            self._sort_names[skill_id] = normalize(name)
+            self._rank[skill_id] = rank = self._rank_key(skill_id)
+            for key in self._keys(name):
+                for node in self._insert(key, skill_id):
+                    if skill_id in node.top:
+                        continue
+                    if len(node.top) < self.top_k or rank < self._rank[node.top[-1]]:
+                        top = node.top + [skill_id]
+                        top.sort(key=self._rank.__getitem__)
+                        node.top = top[:self.top_k]
+
+    def _skills_changed(self):
+        if not self.loaded:
+            return
+        with self._lock:
+            # Skills are only ever added, so a size check spots new ones
+            if len(skill_index.skill_names) != len(self.names):
+                for skill_id, name in list(skill_index.skill_names.items()):
+                    if skill_id not in self.names:
+                        self.add_skill(skill_id, name)
+            self.stale = True
+
+    # ------------------ Queries ------------------
+
+    def _find(self, prefix):
+        node = self.root
+        i = 0
+        while i < len(prefix):
+            child = node.children.get(prefix[i])
+            if child is None:
+                return None
+            label = child.label
+            if not label.startswith(prefix[i:i + len(label)]):
+                return None
+            i += len(label)
+            node = child
+        return node
+
+    def complete(self, query, limit=None):
+        """
+        Most popular skills with a word starting with `query`
+
+        Returns:
+            list: skill ids, best first (at most top_k)
+        """
+        self.ensure_loaded()
+        node = self._find(normalize(query))
+        if node is None:
+            return []
+        return node.top[:limit or self.top_k]
+
+    def payload(self, skill_ids):
+        return [
+            {
+                'id': skill_id,
+                'name': self.names[skill_id],
+                'offered_count': skill_index.offerer_count(skill_id),
+                'required_count': skill_index.requirer_count(skill_id),
+            }
+            for skill_id in skill_ids
+        ]
+
+
+skill_typeahead = SkillTypeahead()
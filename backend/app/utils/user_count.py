@@ -0,0 +1,61 @@
+import threading
+import time
+
+from sqlalchemy import func, select
+
+from app import db
+
+
+class UserCount:
+    """
+    Process-local, approximate number of users for X-Total-Count headers.
+
+    The COUNT(*) runs at most once every USER_COUNT_TTL seconds per process
+    (one thread refreshes while the others keep returning the previous
+    value), so paging through users does not count the table on every
+    request. Signups and deletions show up once the value expires.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ttl = 60
+        self.hits = 0
+        self.misses = 0
+        self.reset()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('USER_COUNT_TTL', 60)
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.counted_at = None
+
+    def get(self):
+        counted_at = self.counted_at
+        if counted_at is not None and time.monotonic() - counted_at < self.ttl:
+            self.hits += 1
+            return self.value
+        # Someone else is counting: a slightly stale value will do
+        if self.value is not None and not self._lock.acquire(blocking=False):
+            self.hits += 1
+            return self.value
+        if self.value is None:
+            self._lock.acquire()
+        try:
+            if self.counted_at is counted_at:
+                self.misses += 1
+                self.value = self._count()
+                self.counted_at = time.monotonic()
+            return self.value
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _count():
+        from app.models import User
+
+        return db.session.scalar(select(func.count()).select_from(User))
+
+
+user_count = UserCount()
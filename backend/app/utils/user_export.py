@@ -0,0 +1,139 @@
+"""
+Streaming NDJSON export of every user with their profile and skills.
+
+    flask export-users [PATH] [--batch-size 1000] [--after-id N]
+    GET /api/users/export[?after_id=N]
+
+Users are read in id order through a server-side cursor (``stream_results``
+with ``yield_per``), so neither the database driver nor the app holds more
+than one batch at a time and the first line goes out as soon as the first
+batch is read. The skills of a batch are fetched with one query per skill
+table over the batch's id range, on a second connection: an unbuffered MySQL
+cursor does not allow other statements on its connection until exhausted.
+
+Each line is one user; `after_id` resumes an interrupted export after the
+last id received. The HTTP endpoint is for operators only: it needs the
+EXPORT_TOKEN bearer token (and is off without one), and at most
+EXPORT_MAX_CONCURRENT exports run at once per process, since each holds two
+pooled connections for as long as its client reads.
+"""
+import sys
+import threading
+import time
+
+import click
+from sqlalchemy import select
+
+from app import db
+from app.utils.serializers import dumps
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class ExportSlots:
+    """Non-blocking cap on concurrent HTTP exports"""
+
+    def __init__(self, limit=2):
+        self.configure(limit)
+
+    def configure(self, limit):
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit)
+
+    def acquire(self):
+        """Take a slot if one is free (False otherwise)"""
+        return self._semaphore.acquire(blocking=False)
+
+    def release(self):
+        self._semaphore.release()
+
+
+export_slots = ExportSlots()
+
+
+def _skills_by_user(conn, table, first_id, last_id):
+    from app.models import Skill
+
+    rows = conn.execute(
+        select(table.c.user_id, Skill.id, Skill.name)
+        .join(Skill, Skill.id == table.c.skill_id)
+        .where(table.c.user_id.between(first_id, last_id))
+        .order_by(table.c.user_id, Skill.name)
+    )
+    skills = {}
+    for user_id, skill_id, name in rows:
+        skills.setdefault(user_id, []).append({'id': skill_id, 'name': name})
+    return skills
+
+
+def iter_batches(engine, batch_size=DEFAULT_BATCH_SIZE, after_id=0):
+    """
+    Yield lists of up to `batch_size` user dicts, in id order
+
+    Uses two connections of `engine` for as long as the generator runs.
+    """
+    from app.models import Profile, User, user_offered_skills, user_required_skills
+
+    query = (
+        select(User.id, User.name, User.email, User.created_at, Profile.bio, Profile.location,
+               Profile.availability, Profile.photo_url)
+        .outerjoin(Profile, Profile.user_id == User.id)
+        .where(User.id > after_id)
+        .order_by(User.id)
+    )
+    with engine.connect() as stream_conn, engine.connect() as conn:
+        result = stream_conn.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+        for rows in result.partitions():
+            # Ids are streamed in order, so the batch is exactly the users of this range
+            first_id, last_id = rows[0].id, rows[-1].id
+            offered = _skills_by_user(conn, user_offered_skills, first_id, last_id)
+            required = _skills_by_user(conn, user_required_skills, first_id, last_id)
+            yield [
+                {
+                    'id': row.id,
+                    'name': row.name,
+                    'email': row.email,
+                    'created_at': row.created_at,
+                    'bio': row.bio,
+                    'location': row.location,
+                    'availability': row.availability,
+                    'photo_url': row.photo_url,
+                    'offered_skills': offered.get(row.id, []),
+                    'required_skills': required.get(row.id, []),
+                }
+                for row in rows
+            ]
+
+
+def to_ndjson(users):
+    """One batch as NDJSON bytes"""
+    return b''.join(dumps(user) + b'\n' for user in users)
+
+
+def iter_ndjson(engine, batch_size=DEFAULT_BATCH_SIZE, after_id=0):
+    """NDJSON chunks of the whole export, one per batch"""
+    for users in iter_batches(engine, batch_size, after_id):
+        yield to_ndjson(users)
+
+
+def init_app(app):
+    export_slots.configure(app.config.get('EXPORT_MAX_CONCURRENT', 2))
+
+    @app.cli.command('export-users')
+    @click.argument('path', type=click.Path(dir_okay=False, allow_dash=True), default='-')
+    @click.option('--batch-size', type=click.IntRange(1), default=DEFAULT_BATCH_SIZE,
+                  help='Users read and written per batch')
+    @click.option('--after-id', type=click.IntRange(0), default=0, help='Resume after this user id')
+    def export_users(path, batch_size, after_id):
+        """Write every user with profile and skills as NDJSON ('-' for stdout)"""
+        started = time.monotonic()
+        count = 0
+        last_id = after_id
+        with click.open_file(path, 'wb') as out:
+            for users in iter_batches(db.engine, batch_size, after_id):
+                out.write(to_ndjson(users))
+                count += len(users)
+                last_id = users[-1]['id']
+        # Keep stdout clean for piping
+        click.echo(f'Exported {count} users (last id {last_id}) in {time.monotonic() - started:.1f}s',
+                   file=sys.stderr)
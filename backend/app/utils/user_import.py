@@ -0,0 +1,279 @@
+"""
+Bulk import of users, profiles and skills from CSV or NDJSON.
+
+    flask import-users partners.csv [--batch-size 1000] [--restart]
+
+Rows are streamed, so memory stays bounded by the batch size plus the set of
+known emails. Each batch is one transaction: users go in with one multi-row
+INSERT, their ids are read back with one SELECT, then profiles and skill
+links are inserted the same way. After every commit the number of consumed
+rows is written to ``<input>.checkpoint``; a rerun resumes after it (and
+emails already in the database are skipped anyway, so replaying a batch is
+harmless). The checkpoint is removed once the import completes.
+
+Columns / keys: email and name (required), password, bio, location,
+availability, photo_url, offered_skills, required_skills. In CSV, skill
+cells are separated by ';'; in NDJSON they may also be lists. Users without
+a password get an unusable hash and cannot log in until one is set.
+"""
+import csv
+import datetime
+import io
+import json
+import os
+import sys
+import time
+
+import click
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+
+DEFAULT_BATCH_SIZE = 1000
+# Never matches a bcrypt hash, so check_password always fails
+UNUSABLE_PASSWORD = '!'
+PROFILE_FIELDS = ('bio', 'location', 'availability', 'photo_url')
+# Column limits of users/profiles; longer values reject the row
+MAX_LENGTHS = {'email': 120, 'name': 100, 'location': 100, 'availability': 255}
+
+
+class ImportStats:
+    def __init__(self, rows=0):
+        self.started = time.monotonic()
+        self.resumed_at = rows
+        self.rows = rows
+        self.imported = 0
+        self.duplicates = 0
+        self.invalid = 0
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return (self.rows - self.resumed_at) / elapsed if elapsed else 0.0
+
+    def __str__(self):
+        return (f'{self.rows} rows, {self.imported} imported, {self.duplicates} duplicate, '
+                f'{self.invalid} invalid, {self.rate:.0f} rows/s')
+
+
+def read_records(stream, fmt):
+    """Yield one dict per input row"""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Counted as an invalid row
+                yield {}
+
+
+def _skill_names(value):
+    from app.utils.skill_sync import clean_skill_names
+
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(';')
+    return clean_skill_names(value)
+
+
+def clean_record(record):
+    """Normalized record, or None when it lacks required fields or values are too long"""
+    if not isinstance(record, dict):
+        return None
+    cleaned = {}
+    for field in ('email', 'name', 'password') + PROFILE_FIELDS:
+        value = record.get(field)
+        cleaned[field] = value.strip() if isinstance(value, str) and value.strip() else None
+    if not cleaned['email'] or '@' not in cleaned['email'] or not cleaned['name']:
+        return None
+    for field, limit in MAX_LENGTHS.items():
+        if cleaned[field] is not None and len(cleaned[field]) > limit:
+            return None
+    try:
+        cleaned['offered_skills'] = _skill_names(record.get('offered_skills'))
+        cleaned['required_skills'] = _skill_names(record.get('required_skills'))
+    except ValueError:
+        # A skill name longer than the skills.name column
+        return None
+    return cleaned
+
+
+def known_emails():
+    """Lowercased emails of every existing user, streamed from the database"""
+    from app.models import User
+
+    result = db.session.execute(select(User.email).execution_options(yield_per=10000))
+    return {email.lower() for email in result.scalars()}
+
+
+def import_batch(records):
+    """
+    Insert one batch of clean, deduplicated records and commit
+
+    Returns:
+        int: number of users inserted
+    """
+    from app.models import Profile, User
+    from app.utils.passwords import password_hasher
+    from app.utils.skill_sync import sync_user_skills
+    from app.utils.user_search import UserSearchIndex
+
+    # In record order, consumed by the comprehension below
+    hashes = iter(password_hasher.hash_many([record['password'] for record in records if record['password']]))
+    now = datetime.datetime.utcnow()
+    db.session.execute(insert(User.__table__), [
+        {
+            'email': record['email'],
+            'name': record['name'],
+            'password_hash': next(hashes) if record['password'] else UNUSABLE_PASSWORD,
+            'skills_updated_at': now,
+        }
+        for record in records
+    ])
+    ids = {
+        email.lower(): user_id for user_id, email in db.session.execute(
+            select(User.id, User.email).where(User.email.in_([record['email'] for record in records]))
+        )
+    }
+
+    db.session.execute(insert(Profile.__table__), [
+        {
+            'user_id': ids[record['email'].lower()],
+            **{field: record[field] for field in PROFILE_FIELDS},
+            'offered_skills': ','.join(record['offered_skills']),
+            'required_skills': ','.join(record['required_skills']),
+        }
+        for record in records
+    ])
+    assignments = {
+        ids[record['email'].lower()]: {'offered': record['offered_skills'], 'required': record['required_skills']}
+        for record in records
+        if record['offered_skills'] or record['required_skills']
+    }
+    if assignments:
+        sync_user_skills(assignments, commit=False)
+    # Core inserts bypass the search index's session hooks
+    db.session.info.setdefault(UserSearchIndex.PENDING_KEY, set()).update(ids.values())
+    db.session.commit()
+    return len(records)
+
+
+def _write_checkpoint(path, source, stats):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'source': source, 'rows': stats.rows, 'imported': stats.imported}, f)
+    os.replace(tmp_path, path)
+
+
+def _read_checkpoint(path, source):
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('source') != source:
+        raise click.ClickException(f'{path} belongs to {checkpoint.get("source")}; use --restart')
+    return checkpoint['rows']
+
+
+def run_import(stream, fmt, batch_size=DEFAULT_BATCH_SIZE, checkpoint_path=None, source=None,
+               skip_rows=0, progress=None):
+    """
+    Import every record of `stream`
+
+    Args:
+        stream: text file object
+        fmt (str): 'csv' or 'ndjson'
+        checkpoint_path (str): file to record progress in after each commit
+        skip_rows (int): rows consumed by a previous run
+        progress (callable): called with the ImportStats after each batch
+
+    Returns:
+        ImportStats
+    """
+    from app.models import User
+
+    stats = ImportStats(skip_rows)
+    emails = known_emails()
+    batch = []
+
+    def flush():
+        nonlocal batch
+        if batch:
+            try:
+                stats.imported += import_batch(batch)
+            except IntegrityError:
+                # Someone signed up with one of these emails meanwhile: drop those and retry
+                db.session.rollback()
+                taken = {email.lower() for email in db.session.execute(
+                    select(User.email).where(User.email.in_([record['email'] for record in batch]))
+                ).scalars()}
+                retry = [record for record in batch if record['email'].lower() not in taken]
+                stats.duplicates += len(batch) - len(retry)
+                if retry:
+                    stats.imported += import_batch(retry)
+            batch = []
+        if checkpoint_path:
+            _write_checkpoint(checkpoint_path, source, stats)
+        if progress:
+            progress(stats)
+
+    for index, record in enumerate(read_records(stream, fmt)):
+        if index < skip_rows:
+            continue
+        stats.rows += 1
+        record = clean_record(record)
+        if record is None:
+            stats.invalid += 1
+        elif record['email'].lower() in emails:
+            stats.duplicates += 1
+        else:
+            emails.add(record['email'].lower())
+            batch.append(record)
+        if stats.rows % batch_size == 0:
+            flush()
+    flush()
+    return stats
+
+
+def init_app(app):
+    @app.cli.command('import-users')
+    @click.argument('path', type=click.Path(dir_okay=False, allow_dash=True))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default=None,
+                  help='Input format (default: from the file extension)')
+    @click.option('--batch-size', type=click.IntRange(1), default=DEFAULT_BATCH_SIZE,
+                  help='Rows per transaction')
+    @click.option('--restart', is_flag=True, help='Ignore an existing checkpoint')
+    def import_users(path, fmt, batch_size, restart):
+        """Import users, profiles and skills from a CSV or NDJSON file ('-' for stdin)"""
+        if fmt is None:
+            if path.endswith('.csv'):
+                fmt = 'csv'
+            elif path.endswith(('.ndjson', '.jsonl')):
+                fmt = 'ndjson'
+            else:
+                raise click.UsageError('Cannot tell the format from the file name; pass --format')
+
+        if path == '-':
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+            checkpoint_path = source = None
+            skip_rows = 0
+        else:
+            stream = open(path, encoding='utf-8', newline='')
+            source = os.path.abspath(path)
+            checkpoint_path = path + '.checkpoint'
+            skip_rows = 0 if restart else _read_checkpoint(checkpoint_path, source)
+            if skip_rows:
+                click.echo(f'Resuming after row {skip_rows}')
+
+        with stream:
+            stats = run_import(stream, fmt, batch_size, checkpoint_path, source, skip_rows,
+                               progress=lambda stats: click.echo(str(stats)))
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        click.echo(f'Done in {time.monotonic() - stats.started:.1f}s: {stats}')
@@ -0,0 +1,320 @@
+import heapq
+import re
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.utils.skill_index import skill_index
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Score contributed by a query term found in each field
+FIELD_WEIGHTS = {'name': 3.0, 'skills': 2.0, 'location': 1.5, 'bio': 1.0}
+# Terms that only occur inside a longer word score less than whole-word hits
+PARTIAL_FACTOR = 0.5
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def expand(term, tokens, vocabulary):
+    """
+    Tokens matching a term: exact first, then tokens containing it
+
+    `tokens` is the indexed vocabulary (any container) and `vocabulary` maps
+    trigrams to the tokens containing them.
+    """
+    exact = [term] if term in tokens else []
+    if len(term) < 3:
+        return exact, []
+    grams = sorted(trigrams(term), key=lambda g: len(vocabulary.get(g, ())))
+    candidates = set(vocabulary.get(grams[0], ()))
+    for gram in grams[1:]:
+        candidates &= vocabulary.get(gram, set())
+        if not candidates:
+            break
+    partial = [token for token in candidates if token != term and term in token]
+    return exact, partial
+
+
+class UserSearchIndex:
+    """
+    Process-local full-text index over users' name, bio, location and skills.
+
+    Name, bio and location tokens go into an inverted index (token ->
+    {user_id: weight}); a trigram index over the token vocabulary resolves
+    partial terms ('dev' -> 'development') without scanning. Skills are not
+    copied: skill names are tokenized the same way (with their own trigram
+    index) and their users come from the skill index user sets, which are
+    already kept current.
+
+    A query matches users having every term in some field; results are ranked
+    by the summed field weights. The index is built on first use from one
+    users/profiles query, kept current by session hooks on User and Profile
+    writes, and rebuilt after SEARCH_INDEX_MAX_AGE seconds to pick up other
+    processes' changes. A rebuild fills fresh dicts and swaps them in;
+    incremental updates and the text lookups of a search hold the lock, so
+    a search never iterates a posting while it is being changed. Users
+    re-indexed while a rebuild reads its rows are re-read after the swap,
+    so the rebuild cannot bring back their older data.
+    """
+
+    PENDING_KEY = 'user_search_pending'
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Serializes rebuilds without blocking searches and updates
+        self._load_lock = threading.Lock()
+        # Ids re-indexed during a rebuild, None when no rebuild is running
+        self._rebuild_pending = None
+        self.max_age = None
+        self.reset()
+
+    def init_app(self, app):
+        self.max_age = app.config.get('SEARCH_INDEX_MAX_AGE', 300)
+        self.reset()
+        skill_index.add_listener(self._skills_changed)
+        if not event.contains(Session, 'after_flush', _record_changes):
+            event.listen(Session, 'after_flush', _record_changes)
+            event.listen(Session, 'after_commit', _apply_changes)
+            event.listen(Session, 'after_rollback', _discard_changes)
+
+    def reset(self):
+        with self._lock:
+            self.loaded_at = None
+            self.postings = defaultdict(dict)    # token -> {user_id: weight}
+            self.vocabulary = defaultdict(set)   # trigram -> tokens
+            self.user_tokens = {}                # user_id -> {token: weight}
+            self._skill_tokens = None            # (token -> skill ids, trigram -> tokens)
+
+    def ensure_loaded(self):
+        loaded_at = self.loaded_at
+        if loaded_at is not None and (not self.max_age or time.monotonic() - loaded_at < self.max_age):
+            return
+        with self._load_lock:
+            if self.loaded_at is loaded_at:
+                self.load()
+
+    def load(self):
+        from app.models import Profile, User
+
+        with self._lock:
+            self._rebuild_pending = set()
+        try:
+            # A connection of its own, so the rows are not read from an
+            # older snapshot held by the request's session
+            with db.engine.connect() as conn:
+                rows = conn.execute(
+                    select(User.id, User.name, Profile.bio, Profile.location)
+                    .outerjoin(Profile, Profile.user_id == User.id)
+                    .execution_options(yield_per=5000)
+                )
+                postings, vocabulary, user_tokens = defaultdict(dict), defaultdict(set), {}
+                for user_id, name, bio, location in rows:
+                    self._index_user(postings, vocabulary, user_tokens, user_id, name, bio, location)
+            with self._lock:
+                self.postings, self.vocabulary, self.user_tokens = postings, vocabulary, user_tokens
+                self.loaded_at = time.monotonic()
+        finally:
+            with self._lock:
+                pending, self._rebuild_pending = self._rebuild_pending, None
+        # Their changes may have committed after the rows above were read
+        self.reindex_users(pending)
+
+    # ------------------ Incremental updates ------------------
+
+    @classmethod
+    def _index_user(cls, postings, vocabulary, user_tokens, user_id, name, bio, location):
+        weights = {}
+        for field, text in (('name', name), ('bio', bio), ('location', location)):
+            for token in set(tokenize(text)):
+                weights[token] = weights.get(token, 0.0) + FIELD_WEIGHTS[field]
+        cls._remove_user(postings, vocabulary, user_tokens, user_id)
+        for token, weight in weights.items():
+            if token not in postings:
+                for gram in trigrams(token):
+                    vocabulary[gram].add(token)
+            postings[token][user_id] = weight
+        user_tokens[user_id] = weights
+
+    @staticmethod
+    def _remove_user(postings, vocabulary, user_tokens, user_id):
+        for token in user_tokens.pop(user_id, ()):
+            posting = postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(user_id, None)
+            if not posting:
+                del postings[token]
+                for gram in trigrams(token):
+                    vocabulary[gram].discard(token)
+
+    def reindex_users(self, user_ids):
+        """Re-read and re-index the given users (one query)"""
+        if not user_ids:
+            return
+        with self._lock:
+            if self._rebuild_pending is not None:
+                self._rebuild_pending.update(user_ids)
+            if self.loaded_at is None:
+                return
+        from app.models import Profile, User
+
+        # Runs from after_commit, where the session cannot emit SQL
+        with db.engine.connect() as conn:
+            rows = conn.execute(
+                select(User.id, User.name, Profile.bio, Profile.location)
+                .outerjoin(Profile, Profile.user_id == User.id)
+                .where(User.id.in_(list(user_ids)))
+            ).all()
+        with self._lock:
+            found = set()
+            for user_id, name, bio, location in rows:
+                self._index_user(self.postings, self.vocabulary, self.user_tokens,
+                                 user_id, name, bio, location)
+                found.add(user_id)
+            for user_id in set(user_ids) - found:
+                self._remove_user(self.postings, self.vocabulary, self.user_tokens, user_id)
+
+    def _skills_changed(self):
+        self._skill_tokens = None
+
+    # ------------------ Queries ------------------
+
+    def _skill_token_index(self):
+        index = self._skill_tokens
+        if index is None:
+            skill_tokens, skill_grams = {}, defaultdict(set)
+            for skill_id, name in list(skill_index.skill_names.items()):
+                for token in set(tokenize(name)):
+                    if token not in skill_tokens:
+                        skill_tokens[token] = set()
+                        for gram in trigrams(token):
+                            skill_grams[gram].add(token)
+                    skill_tokens[token].add(skill_id)
+            index = self._skill_tokens = (skill_tokens, skill_grams)
+        return index
+
+    def _skill_matches(self, term):
+        skill_tokens, skill_grams = self._skill_token_index()
+        exact, partial = expand(term, skill_tokens, skill_grams)
+        scores = {}
+        for tokens, weight in ((exact, FIELD_WEIGHTS['skills']),
+                               (partial, FIELD_WEIGHTS['skills'] * PARTIAL_FACTOR)):
+            for token in tokens:
+                skill_ids = skill_tokens[token]
+                users = skill_index.union(skill_index.offerers, skill_ids) | \
+                    skill_index.union(skill_index.requirers, skill_ids)
+                for user_id in users:
+                    if weight > scores.get(user_id, 0.0):
+                        scores[user_id] = weight
+        return scores
+
+    def _text_matches(self, term):
+        """Best name/bio/location weight per user for one term"""
+        scores = {}
+        with self._lock:
+            exact, partial = expand(term, self.postings, self.vocabulary)
+            for tokens, factor in ((exact, 1.0), (partial, PARTIAL_FACTOR)):
+                for token in tokens:
+                    for user_id, weight in self.postings.get(token, {}).items():
+                        if weight * factor > scores.get(user_id, 0.0):
+                            scores[user_id] = weight * factor
+        return scores
+
+    def search(self, query, exclude=None):
+        """
+        Rank users matching every term of `query`
+
+        Returns:
+            list: (score, user_id) tuples, best first, ties by id
+        """
+        return sorted(self._scores(query, exclude), key=_rank_key)
+
+    def search_page(self, query, limit, after=None, exclude=None):
+        """
+        One page of `search(query, exclude)`, after the (score, user_id) `after`
+
+        Only the page is sorted (a bounded heap), so each page of a broad
+        query costs O(n log limit) instead of a sort of every match.
+
+        Returns:
+            tuple: (total matches, page of (score, user_id) tuples, more pages)
+        """
+        ranked = self._scores(query, exclude)
+        total = len(ranked)
+        if after is not None:
+            after_key = _rank_key(after)
+            ranked = [item for item in ranked if _rank_key(item) > after_key]
+        page = heapq.nsmallest(limit, ranked, key=_rank_key)
+        return total, page, len(ranked) > len(page)
+
+    def _scores(self, query, exclude=None):
+        """Unordered (score, user_id) tuples of users matching every term of `query`"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        self.ensure_loaded()
+        skill_index.ensure_loaded()
+
+        totals = None
+        for term in terms:
+            # A term scores its best text hit plus its best skill hit
+            term_scores = self._skill_matches(term)
+            for user_id, score in self._text_matches(term).items():
+                term_scores[user_id] = term_scores.get(user_id, 0.0) + score
+
+            if totals is None:
+                totals = term_scores
+            else:
+                totals = {uid: totals[uid] + s for uid, s in term_scores.items() if uid in totals}
+            if not totals:
+                return []
+
+        totals.pop(exclude, None)
+        return [(round(score, 3), uid) for uid, score in totals.items()]
+
+
+def _rank_key(item):
+    score, user_id = item
+    return (-score, user_id)
+
+
+user_search = UserSearchIndex()
+
+
+# ------------------ Session hooks ------------------
+
+def _record_changes(session, flush_context):
+    from app.models import Profile, User
+
+    pending = session.info.setdefault(UserSearchIndex.PENDING_KEY, set())
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, User):
+            if obj in session.new or obj in session.deleted or inspect(obj).attrs.name.history.has_changes():
+                pending.add(obj.id)
+        elif isinstance(obj, Profile):
+            state = inspect(obj)
+            if (obj in session.new or obj in session.deleted
+                    or state.attrs.bio.history.has_changes()
+                    or state.attrs.location.history.has_changes()):
+                pending.add(obj.user_id)
+
+
+def _apply_changes(session):
+    pending = session.info.pop(UserSearchIndex.PENDING_KEY, None)
+    if pending:
+        user_search.reindex_users(pending)
+
+
+def _discard_changes(session):
+    session.info.pop(UserSearchIndex.PENDING_KEY, None)
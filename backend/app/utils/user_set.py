@@ -0,0 +1,219 @@
+from array import array
+from bisect import bisect_left
+
+# A set becomes a bitmap once it holds at least one id in DENSE_RATIO below its
+# highest id: from there one bit per id is no larger than a 4-byte array entry
+# per member.
+DENSE_RATIO = 32
+
+
+def iter_bits(bitmap):
+    """Yield the positions of the set bits of a bitmap, lowest first"""
+    digits = bin(bitmap)[:1:-1]  # little-endian, without the '0b' prefix
+    pos = digits.find('1')
+    while pos != -1:
+        yield pos
+        pos = digits.find('1', pos + 1)
+
+
+def _to_bytes(bitmap):
+    return bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+
+
+def _has_bit(data, position):
+    index = position >> 3
+    return index < len(data) and data[index] >> (position & 7) & 1
+
+
+def _set_bits(bitmap, ids, value=True):
+    """`bitmap` with the bits of `ids` set (or cleared), in O(width + len(ids))"""
+    ids = list(ids)
+    width = max(bitmap.bit_length(), max(ids, default=-1) + 1 if value else 0)
+    data = bytearray(bitmap.to_bytes((width + 7) // 8, 'little'))
+    for position in ids:
+        if value:
+            data[position >> 3] |= 1 << (position & 7)
+        elif position >> 3 < len(data):
+            data[position >> 3] &= ~(1 << (position & 7)) & 0xFF
+    return int.from_bytes(data, 'little')
+
+
+def _contains_sorted(ids, user_id):
+    pos = bisect_left(ids, user_id)
+    return pos < len(ids) and ids[pos] == user_id
+
+
+class UserSet:
+    """
+    Immutable set of user ids, sized by how many ids it holds.
+
+    Sparse sets are a sorted ``array('I')`` (4 bytes per member); dense ones
+    are a bitmap (a Python int, one bit per id up to the highest). A skill
+    held by a handful of users with high ids then costs a few bytes rather
+    than a bitmap as wide as the largest id, while a skill held by half the
+    users still costs one bit each and combines with others by plain integer
+    ORs and ANDs.
+
+    Updates return a new set, so a reader holding one never sees it change.
+    Membership tests on a bitmap cost O(width); callers testing many ids
+    should iterate or intersect instead.
+    """
+
+    __slots__ = ('_ids', '_bits', '_len')
+
+    def __init__(self, ids=()):
+        self._init_ids(array('I', sorted(set(ids))))
+
+    @classmethod
+    def _from_ids(cls, ids):
+        result = cls.__new__(cls)
+        result._init_ids(ids)
+        return result
+
+    @classmethod
+    def _from_bits(cls, bits, count=None):
+        result = cls.__new__(cls)
+        result._init_bits(bits, bits.bit_count() if count is None else count)
+        return result
+
+    def _init_ids(self, ids):
+        """Take a sorted, duplicate-free array, switching to a bitmap if dense"""
+        if ids and (ids[-1] + 1) <= len(ids) * DENSE_RATIO:
+            self._ids = None
+            self._bits = _set_bits(0, ids)
+        else:
+            self._ids = ids
+            self._bits = 0
+        self._len = len(ids)
+
+    def _init_bits(self, bits, count):
+        if not count or bits.bit_length() > count * DENSE_RATIO:
+            self._ids = array('I', iter_bits(bits))
+            self._bits = 0
+        else:
+            self._ids = None
+            self._bits = bits
+        self._len = count
+
+    # ------------------ Set protocol ------------------
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        """Member ids, lowest first"""
+        if self._ids is not None:
+            return iter(self._ids)
+        return iter_bits(self._bits)
+
+    def __contains__(self, user_id):
+        if self._ids is not None:
+            return _contains_sorted(self._ids, user_id)
+        return user_id >= 0 and bool(self._bits >> user_id & 1)
+
+    def __eq__(self, other):
+        if not isinstance(other, UserSet):
+            return NotImplemented
+        # Both forms are canonical for a given set of ids
+        return self._len == other._len and self._bits == other._bits and self._ids == other._ids
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'UserSet({list(self)!r})'
+
+    @property
+    def nbytes(self):
+        """Approximate size of the member storage"""
+        if self._ids is not None:
+            return self._ids.itemsize * len(self._ids)
+        return (self._bits.bit_length() + 7) // 8
+
+    def to_bitmap(self):
+        """The members as a bitmap, whichever form the set is stored in"""
+        if self._ids is None:
+            return self._bits
+        return _set_bits(0, self._ids)
+
+    # ------------------ Updates ------------------
+
+    def with_user(self, user_id):
+        if user_id in self:
+            return self
+        if self._ids is None:
+            return UserSet._from_bits(self._bits | 1 << user_id, self._len + 1)
+        ids = array('I', self._ids)
+        ids.insert(bisect_left(ids, user_id), user_id)
+        return UserSet._from_ids(ids)
+
+    def without_user(self, user_id):
+        if user_id not in self:
+            return self
+        if self._ids is None:
+            return UserSet._from_bits(self._bits & ~(1 << user_id), self._len - 1)
+        ids = array('I', self._ids)
+        del ids[bisect_left(ids, user_id)]
+        return UserSet._from_ids(ids)
+
+    # ------------------ Set algebra ------------------
+
+    @classmethod
+    def union(cls, sets):
+        """Union of any number of sets: bitmaps are ORed, arrays merged once"""
+        bits = 0
+        ids = set()
+        only = None
+        count = 0
+        for user_set in sets:
+            if not user_set:
+                continue
+            only = user_set if count == 0 else None
+            count += 1
+            if user_set._ids is None:
+                bits |= user_set._bits
+            else:
+                ids.update(user_set._ids)
+        if count == 1:
+            return only
+        if not ids:
+            return cls._from_bits(bits)
+        if not bits:
+            return cls._from_ids(array('I', sorted(ids)))
+        return cls._from_bits(_set_bits(bits, ids))
+
+    def __or__(self, other):
+        if not isinstance(other, UserSet):
+            return NotImplemented
+        return UserSet.union((self, other))
+
+    def __and__(self, other):
+        if not isinstance(other, UserSet):
+            return NotImplemented
+        if self._ids is None and other._ids is None:
+            return UserSet._from_bits(self._bits & other._bits)
+        if not self or not other:
+            return EMPTY
+        sparse, dense = (self, other) if self._ids is not None else (other, self)
+        if dense._ids is None:
+            data = _to_bytes(dense._bits)
+            return UserSet._from_ids(array('I', (i for i in sparse._ids if _has_bit(data, i))))
+        # Both sparse: look the smaller one up in the larger
+        small, large = sorted((self._ids, other._ids), key=len)
+        return UserSet._from_ids(array('I', (i for i in small if _contains_sorted(large, i))))
+
+    def __sub__(self, other):
+        if not isinstance(other, UserSet):
+            return NotImplemented
+        if not self or not other:
+            return self
+        if self._ids is None:
+            if other._ids is None:
+                return UserSet._from_bits(self._bits & ~other._bits)
+            return UserSet._from_bits(_set_bits(self._bits, other._ids, value=False))
+        if other._ids is None:
+            data = _to_bytes(other._bits)
+            return UserSet._from_ids(array('I', (i for i in self._ids if not _has_bit(data, i))))
+        return UserSet._from_ids(array('I', (i for i in self._ids if not _contains_sorted(other._ids, i))))
+
+
+EMPTY = UserSet()
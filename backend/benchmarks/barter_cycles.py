@@ -0,0 +1,63 @@
+"""
+Benchmark of the barter cycle search.
+
+Runs CycleFinder over a synthetic population (100k users by default) whose
+skills follow a Zipf-like popularity curve; a lower exponent spreads users
+over more skills and makes rings rarer. Needs no database:
+
+    python benchmarks/barter_cycles.py [users] [skills] [exponent]
+"""
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.barter_cycles import CycleFinder  # noqa: E402
+from app.utils.skill_index import _build_bitmaps  # noqa: E402
+
+
+def main(users=100000, skills=2000, exponent=1.0):
+    rnd = random.Random(42)
+    weights = [1 / (rank + 1) ** exponent for rank in range(skills)]
+    skill_ids = range(1, skills + 1)
+    offered_rows, required_rows = [], []
+    for user_id in range(1, users + 1):
+        for skill_id in set(rnd.choices(skill_ids, weights, k=rnd.randint(1, 3))):
+            offered_rows.append((user_id, skill_id))
+        for skill_id in set(rnd.choices(skill_ids, weights, k=rnd.randint(1, 3))):
+            required_rows.append((user_id, skill_id))
+
+    user_offered, user_required = {}, {}
+    for user_id, skill_id in offered_rows:
+        user_offered.setdefault(user_id, set()).add(skill_id)
+    for user_id, skill_id in required_rows:
+        user_required.setdefault(user_id, set()).add(skill_id)
+    finder = CycleFinder(
+        _build_bitmaps(offered_rows), _build_bitmaps(required_rows),
+        {uid: frozenset(ids) for uid, ids in user_offered.items()},
+        {uid: frozenset(ids) for uid, ids in user_required.items()},
+    )
+
+    start = time.perf_counter()
+    order = finder.search_order()
+    print(f'order {len(order)} users: {time.perf_counter() - start:.1f}s')
+
+    start = time.perf_counter()
+    for done, user_id in enumerate(order, 1):
+        finder.search(user_id)
+        if done % 10000 == 0:
+            print(f'{done} users, {len(finder.cycles)} cycles, {time.perf_counter() - start:.1f}s')
+    elapsed = time.perf_counter() - start
+
+    lengths = Counter(len(cycle) for cycle in finder.cycles)
+    covered = sum(1 for count in finder.counts.values() if count)
+    print(f'search: {elapsed:.1f}s ({len(order) / elapsed:.0f} users/s), '
+          f'{len(finder.cycles)} cycles {dict(sorted(lengths.items()))}, {covered} users covered')
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:4]
+    main(*(int(arg) for arg in args[:2]), *(float(arg) for arg in args[2:]))
@@ -0,0 +1,199 @@
+"""
+Latency, throughput and SQL counts of the hot read endpoints.
+
+For each population size, generates a synthetic population (see
+population.py), then requests every endpoint below as rotating users
+through the Flask test client, one request at a time. Reports p50/p99
+latency, requests per second and SQL statements per request, and compares
+them with the saved baseline:
+
+    python benchmarks/endpoints.py [--users 1000,10000,100000] [--requests 200]
+                                   [--database-uri URI] [--save-baseline]
+
+The run exits with status 1 when an endpoint's p50 latency got more than
+--tolerance slower than the baseline, or it sends more than
+--sql-tolerance more SQL statements per request (the default flags an
+extra statement on every request, not a cache miss or two in the run).
+Baselines are keyed by database dialect and population size. Latencies
+depend on the machine, so save the baseline on the machine you compare on.
+
+WARNING: with --database-uri, drops and recreates every table of that
+database.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event  # noqa: E402
+
+from app import db  # noqa: E402
+from app.utils.auth import generate_token  # noqa: E402
+from app.utils.pagination import encode_cursor  # noqa: E402
+from population import generate, make_app, FIRST_NAMES  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# (name, path template); templates are filled per request by `request_args`
+ENDPOINTS = [
+    ('matches', '/api/matches'),
+    ('find_matches', '/api/matching/'),
+    ('ranked_matches', '/api/matching/?limit=20'),
+    ('users', '/api/users'),
+    ('users_next_page', '/api/users?cursor={users_cursor}'),
+    ('users_search', '/api/users?search={name}'),
+    ('user_detail', '/api/users/{other_id}'),
+    ('skills', '/api/skills'),
+    ('skill_users', '/api/skills/{skill_id}/users'),
+    ('skill_autocomplete', '/api/skills/autocomplete?q={prefix}'),
+    ('sessions', '/api/sessions/'),
+    ('chat_history', '/api/chat/{other_id}'),
+]
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def request_args(i, users, skills):
+    """Deterministic template values for the `i`-th request"""
+    user_id = 1 + (i * 7919) % users
+    return user_id, {
+        'other_id': 1 + (user_id * 31) % users,
+        'skill_id': 1 + i % min(skills, 20),
+        'name': FIRST_NAMES[i % len(FIRST_NAMES)],
+        'prefix': FIRST_NAMES[i % len(FIRST_NAMES)][:2].lower(),
+        'users_cursor': encode_cursor((i * 104729) % users),
+    }
+
+
+def run_endpoint(app, template, users, skills, requests, max_seconds, tokens):
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    client = app.test_client()
+
+    def call(i):
+        user_id, values = request_args(i, users, skills)
+        headers = {'Authorization': f'Bearer {tokens[user_id]}'}
+        response = client.get(template.format(**values), headers=headers)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{template}: HTTP {response.status_code}')
+        return response
+
+    # Warm-up, which also builds the in-process indexes and caches
+    for i in range(3):
+        call(i)
+
+    latencies = []
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        started = time.perf_counter()
+        for i in range(requests):
+            before = time.perf_counter()
+            call(i)
+            latencies.append(time.perf_counter() - before)
+            if time.perf_counter() - started > max_seconds and len(latencies) >= 5:
+                break
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'rps': round(len(latencies) / elapsed, 1),
+        'sql_per_request': round(statements / len(latencies), 2),
+    }
+
+
+def compare(results, baseline, tolerance, sql_tolerance=0.5):
+    """Print the change against `baseline` and return the regressed endpoints"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        change = result['p50_ms'] / base['p50_ms'] - 1 if base['p50_ms'] else 0.0
+        # Per-request averages (rounded to 0.01) pick up one-off cache misses
+        sql_change = result['sql_per_request'] - base['sql_per_request']
+        regressed = change > tolerance or sql_change > sql_tolerance
+        print(f'  {name:<20} p50 {change:+7.1%}  SQL/req {sql_change:+6.2f}'
+              f'{"  REGRESSION" if regressed else ""}')
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', default='1000,10000,100000', help='Comma-separated population sizes')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+    parser.add_argument('--max-seconds', type=float, default=10.0,
+                        help='Stop an endpoint early after this long (at least 5 requests)')
+    parser.add_argument('--endpoints', default=None, help='Comma-separated subset of endpoint names')
+    parser.add_argument('--database-uri', default=None,
+                        help='SQLAlchemy URI (default: a SQLite file per size in the temp directory)')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p50 slowdown (0.25 = 25%%)')
+    parser.add_argument('--sql-tolerance', type=float, default=0.5,
+                        help='Allowed increase in SQL statements per request')
+    args = parser.parse_args()
+
+    endpoints = ENDPOINTS
+    if args.endpoints:
+        wanted = set(args.endpoints.split(','))
+        endpoints = [(name, template) for name, template in ENDPOINTS if name in wanted]
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = []
+    for users in (int(size) for size in args.users.split(',')):
+        app = make_app(args.database_uri, users)
+        with app.app_context():
+            counts = generate(users=users, progress=lambda message: print(f'[{users} users] {message}'))
+            tokens = {user_id: generate_token(user_id) for user_id in range(1, users + 1)}
+            key = f'{db.engine.dialect.name}:{users}'
+
+        print(f'\n{key}')
+        print(f'  {"endpoint":<20} {"p50 ms":>9} {"p99 ms":>9} {"req/s":>8} {"SQL/req":>8} {"n":>5}')
+        results = {}
+        for name, template in endpoints:
+            result = results[name] = run_endpoint(
+                app, template, users, counts['skills'], args.requests, args.max_seconds, tokens
+            )
+            print(f'  {name:<20} {result["p50_ms"]:9.2f} {result["p99_ms"]:9.2f} '
+                  f'{result["rps"]:8.1f} {result["sql_per_request"]:8.2f} {result["requests"]:5d}')
+
+        if key in baseline and not args.save_baseline:
+            print('  compared with baseline:')
+            regressions += [f'{key} {name}' for name in compare(results, baseline[key], args.tolerance, args.sql_tolerance)]
+        baseline[key] = results
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'\nBaseline saved to {args.baseline}')
+    if regressions:
+        print(f'\n{len(regressions)} regression(s): {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Deterministic synthetic population for benchmarks.
+
+Generates users with profiles, skills whose popularity follows a Zipf
+distribution, offered/required skill links, barter sessions and chat
+messages, and bulk-inserts them into the database of the current app. The
+same arguments always produce the same rows.
+
+    python benchmarks/population.py --users 10000 [--database-uri URI]
+
+WARNING: drops and recreates every table of the target database.
+"""
+import argparse
+import datetime
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+
+FIRST_NAMES = [
+    'Alice', 'Bruno', 'Chloe', 'Dmitri', 'Elena', 'Farid', 'Grace', 'Hiro', 'Ines', 'Jonas',
+    'Kemi', 'Liam', 'Maya', 'Nikolai', 'Olga', 'Pedro', 'Quinn', 'Rosa', 'Sanjay', 'Tara',
+    'Umar', 'Vera', 'Wei', 'Ximena', 'Yusuf', 'Zoe',
+]
+LAST_NAMES = [
+    'Adams', 'Berg', 'Costa', 'Dubois', 'Evans', 'Fischer', 'Garcia', 'Hansen', 'Ito', 'Jensen',
+    'Kowalski', 'Lopez', 'Moreau', 'Nakamura', 'Okafor', 'Petrov', 'Rossi', 'Schmidt', 'Tanaka',
+    'Usman', 'Varga', 'Weber', 'Yilmaz', 'Zhang',
+]
+CITIES = [
+    'Berlin', 'Paris', 'London', 'Madrid', 'Lagos', 'Tokyo', 'New York', 'Toronto', 'Mumbai',
+    'Sao Paulo', 'Nairobi', 'Sydney', 'Warsaw', 'Istanbul', 'Seoul', 'Mexico City',
+]
+SKILL_TOPICS = [
+    'Python', 'JavaScript', 'Rust', 'SQL', 'Excel', 'Photography', 'Guitar', 'Piano', 'Spanish',
+    'French', 'Japanese', 'Cooking', 'Baking', 'Yoga', 'Drawing', 'Video Editing', 'Marketing',
+    'Public Speaking', 'Accounting', 'Gardening', 'Carpentry', 'Sewing', 'Chess', 'Statistics',
+]
+SKILL_LEVELS = ['Intro to', 'Practical', 'Advanced', 'Applied', 'Creative', 'Professional']
+SKILL_AREAS = ['Basics', 'for Beginners', 'Workshop', 'Techniques', 'Projects', 'Coaching']
+
+BATCH_SIZE = 5000
+EPOCH = datetime.datetime(2024, 1, 1)
+# Every generated user's password is 'password'; hashing once keeps generation fast
+PASSWORD_HASH = '$2b$04$sAA/P3aaS/7YJEoam6BldeqVX7tZ7HfGBKD0zwlu07arcKUc0yEKS'
+
+
+class BenchmarkConfig(Config):
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    TESTING = True
+    # Background writers would add their statements to the measured requests
+    CHAT_WRITE_BEHIND = False
+    MATCH_CANDIDATES_WORKER = False
+
+
+def make_app(database_uri=None, users=1000):
+    """App on `database_uri`, by default a SQLite file per population size"""
+    if database_uri is None:
+        database_uri = 'sqlite:///' + os.path.join(tempfile.gettempdir(), f'skill_exchange_bench_{users}.db')
+    config = type('Config', (BenchmarkConfig,), {'SQLALCHEMY_DATABASE_URI': database_uri})
+    return create_app(config)
+
+
+def skill_names(count):
+    """`count` distinct, deterministic skill names"""
+    names = []
+    for index in range(count):
+        topic = SKILL_TOPICS[index % len(SKILL_TOPICS)]
+        variant = index // len(SKILL_TOPICS)
+        if variant == 0:
+            names.append(topic)
+            continue
+        level = SKILL_LEVELS[variant % len(SKILL_LEVELS)]
+        area = SKILL_AREAS[(variant // len(SKILL_LEVELS)) % len(SKILL_AREAS)]
+        names.append(f'{level} {topic} {area} {variant}')
+    return names
+
+
+def _pick(rnd, population, cum_weights, count):
+    """Up to `count` distinct weighted picks"""
+    picked = set()
+    for _ in range(count * 4):
+        if len(picked) >= count:
+            break
+        picked.add(rnd.choices(population, cum_weights=cum_weights)[0])
+    return picked
+
+
+def _bulk_insert(table, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(insert(table), rows[start:start + BATCH_SIZE])
+
+
+def generate(users=1000, skills=None, zipf=0.7, offered=(1, 4), required=(1, 4),
+             sessions_per_user=2.0, messages_per_user=5.0, seed=42, reset=True, progress=print):
+    """
+    Fill the current app's database with a synthetic population
+
+    Args:
+        users (int): number of users (ids 1..users)
+        skills (int): size of the skill catalog; defaults to max(50, users // 10)
+        zipf (float): skill popularity exponent; higher concentrates users on
+            fewer skills. Reciprocal pairs grow quadratically with it: at 100k
+            users, 1.0 already yields ~10^8 match_candidates rows
+        offered, required (tuple): (min, max) skills offered/required per user
+        sessions_per_user, messages_per_user (float): average counts
+        seed (int): random seed
+        reset (bool): drop and recreate all tables first
+
+    Returns:
+        dict: number of rows per table
+    """
+    from app.models import (BarterSession, Message, Profile, Skill, User,
+                            user_offered_skills, user_required_skills)
+
+    rnd = random.Random(seed)
+    skills = skills or max(50, users // 10)
+    started = time.monotonic()
+    if reset:
+        db.drop_all()
+        db.create_all()
+
+    skill_ids = list(range(1, skills + 1))
+    cum_weights = list(itertools.accumulate(1 / rank ** zipf for rank in skill_ids))
+    city_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(CITIES) + 1)))
+    skill_rows = [{'id': skill_id, 'name': name} for skill_id, name in zip(skill_ids, skill_names(skills))]
+
+    user_rows, profile_rows, offered_rows, required_rows = [], [], [], []
+    offered_by = {}
+    for user_id in range(1, users + 1):
+        first, last = rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES)
+        created_at = EPOCH + datetime.timedelta(minutes=user_id)
+        user_rows.append({
+            'id': user_id,
+            'email': f'user{user_id}@bench.example.com',
+            'password_hash': PASSWORD_HASH,
+            'name': f'{first} {last}',
+            'created_at': created_at,
+            'skills_updated_at': created_at,
+        })
+        profile_rows.append({
+            'user_id': user_id,
+            'bio': f'{first} likes {rnd.choice(SKILL_TOPICS).lower()} and {rnd.choice(SKILL_TOPICS).lower()}.',
+            'location': rnd.choices(CITIES, cum_weights=city_weights)[0],
+        })
+        user_offered = _pick(rnd, skill_ids, cum_weights, rnd.randint(*offered))
+        user_required = _pick(rnd, skill_ids, cum_weights, rnd.randint(*required)) - user_offered
+        offered_by[user_id] = sorted(user_offered)
+        offered_rows.extend({'user_id': user_id, 'skill_id': s} for s in sorted(user_offered))
+        required_rows.extend({'user_id': user_id, 'skill_id': s} for s in sorted(user_required))
+
+    session_rows = []
+    statuses = BarterSession.STATUSES
+    for requester_id in range(1, users + 1):
+        for _ in range(int(rnd.expovariate(1 / sessions_per_user)) if sessions_per_user else 0):
+            provider_id = rnd.randint(1, users)
+            if provider_id == requester_id or not offered_by[provider_id]:
+                continue
+            session_rows.append({
+                'requester_id': requester_id,
+                'provider_id': provider_id,
+                'offered_skill_id': rnd.choice(offered_by[requester_id]),
+                'requested_skill_id': rnd.choice(offered_by[provider_id]),
+                'status': rnd.choice(statuses),
+                'created_at': EPOCH + datetime.timedelta(minutes=len(session_rows)),
+            })
+
+    message_rows = []
+    for sender_id in range(1, users + 1):
+        partners = [rnd.randint(1, users) for _ in range(rnd.randint(1, 3))]
+        for _ in range(int(rnd.expovariate(1 / messages_per_user)) if messages_per_user else 0):
+            receiver_id = rnd.choice(partners)
+            if receiver_id == sender_id:
+                continue
+            message_rows.append({
+                'sender_id': sender_id,
+                'receiver_id': receiver_id,
+                'content': f'Message {len(message_rows)} from {sender_id}',
+                'timestamp': EPOCH + datetime.timedelta(seconds=len(message_rows)),
+            })
+    progress(f'generated in {time.monotonic() - started:.1f}s')
+
+    tables = [
+        (Skill.__table__, skill_rows),
+        (User.__table__, user_rows),
+        (Profile.__table__, profile_rows),
+        (user_offered_skills, offered_rows),
+        (user_required_skills, required_rows),
+        (BarterSession.__table__, session_rows),
+        (Message.__table__, message_rows),
+    ]
+    for table, rows in tables:
+        _bulk_insert(table, rows)
+        db.session.commit()
+    counts = {table.name: len(rows) for table, rows in tables}
+    progress(f'inserted {sum(counts.values())} rows in {time.monotonic() - started:.1f}s: {counts}')
+
+    # Derived tables, as after running the maintenance commands
+    from app.utils.match_store import rebuild_all
+    counts['match_candidates'] = rebuild_all()
+    progress(f'rebuilt match_candidates in {time.monotonic() - started:.1f}s')
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--skills', type=int, default=None)
+    parser.add_argument('--zipf', type=float, default=0.7)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-uri', default=None,
+                        help='SQLAlchemy URI (default: a SQLite file in the temp directory)')
+    args = parser.parse_args()
+
+    app = make_app(args.database_uri, args.users)
+    with app.app_context():
+        generate(users=args.users, skills=args.skills, zipf=args.zipf, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
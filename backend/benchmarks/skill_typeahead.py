@@ -0,0 +1,64 @@
+"""
+Micro-benchmark of skill autocomplete lookups.
+
+Builds the typeahead trie over a synthetic catalog (100k skills by default)
+and times prefix lookups of 1-4 characters, a skill insert and a full
+re-ranking. Needs no database:
+
+    python benchmarks/skill_typeahead.py [skills] [lookups]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.skill_index import skill_index  # noqa: E402
+from app.utils.skill_typeahead import skill_typeahead  # noqa: E402
+from app.utils.user_set import UserSet  # noqa: E402
+
+
+def report(label, seconds, iterations=1):
+    print(f'{label:<40} {seconds / iterations * 1e6:12.1f} us/op')
+
+
+def main(skills=100000, lookups=10000):
+    rnd = random.Random(42)
+    words = [
+        ''.join(rnd.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rnd.randint(3, 10)))
+        for _ in range(skills // 20 or 1)
+    ]
+
+    # Populate the skill index directly; the typeahead only reads from it
+    skill_index.reset()
+    skill_index.skill_names = {
+        skill_id: ' '.join(rnd.choice(words) for _ in range(rnd.randint(1, 3)))
+        for skill_id in range(1, skills + 1)
+    }
+    for skill_id in skill_index.skill_names:
+        users = rnd.sample(range(1, 2000), rnd.randint(0, 5))
+        skill_index.offerers[skill_id] = UserSet(users)
+    skill_index.loaded_at = time.monotonic()
+
+    start = time.perf_counter()
+    skill_typeahead.load()
+    report(f'build trie ({skills} skills)', time.perf_counter() - start)
+
+    queries = [rnd.choice(words)[:rnd.randint(1, 4)] for _ in range(lookups)]
+    start = time.perf_counter()
+    for query in queries:
+        skill_typeahead.complete(query)
+    report('prefix lookup', time.perf_counter() - start, lookups)
+
+    start = time.perf_counter()
+    skill_typeahead.add_skill(skills + 1, 'benchmark skill')
+    report('insert one skill', time.perf_counter() - start)
+
+    start = time.perf_counter()
+    skill_typeahead.rescore()
+    report('re-rank all prefixes', time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,33 @@
+"""
+Gunicorn settings for production:
+
+    gunicorn run:app
+
+Workers are gevent workers: chat streams (GET /api/chat/stream) stay open
+for as long as a client is connected, and a greenlet per connection lets
+one process hold thousands of idle ones. CPU-heavy work is spread over one
+worker per core. Set PUBSUB_REDIS_URL so chat messages reach the streams
+of every worker (see app.utils.pubsub); without it, a stream only sees
+messages sent through its own worker, so a single worker is started.
+"""
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+worker_class = 'gevent'
+workers = int(os.environ.get('WEB_CONCURRENCY',
+                             multiprocessing.cpu_count() if os.environ.get('PUBSUB_REDIS_URL') else 1))
+# Open connections per worker, idle streams included
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 5000))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+
+
+def post_worker_init(worker):
+    # Build the skill typeahead as soon as the worker runs, not in every `flask` command
+    from app.utils.skill_typeahead import skill_typeahead
+
+    skill_typeahead.start_preload(worker.wsgi)
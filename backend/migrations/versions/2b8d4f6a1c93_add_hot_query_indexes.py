@@ -0,0 +1,56 @@
+"""Add indexes for hot queries
+
+Revision ID: 2b8d4f6a1c93
+Revises: 7c3f1e9a2b41
+Create Date: 2026-10-18 15:41:27.553019
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b8d4f6a1c93'
+down_revision = '7c3f1e9a2b41'
+branch_labels = None
+depends_on = None
+
+# (table, index, columns, foreign key column the index also serves)
+INDEXES = [
+    ('barter_sessions', 'ix_barter_sessions_duplicate',
+     ['requester_id', 'provider_id', 'offered_skill_id', 'requested_skill_id', 'status'], 'requester_id'),
+    ('barter_sessions', 'ix_barter_sessions_provider_status', ['provider_id', 'status'], 'provider_id'),
+    ('user_offered_skills', 'ix_user_offered_skills_skill_user', ['skill_id', 'user_id'], 'skill_id'),
+    ('user_required_skills', 'ix_user_required_skills_skill_user', ['skill_id', 'user_id'], 'skill_id'),
+    ('messages', 'ix_messages_sender_receiver_timestamp', ['sender_id', 'receiver_id', 'timestamp'], 'sender_id'),
+]
+
+
+def upgrade():
+    for table, name, columns, _ in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def _restore_foreign_key_index(table, name, fk_column):
+    """
+    Put back the index MySQL made for an unnamed foreign key, if `name` was its only replacement
+
+    Creating an index that can serve a foreign key makes MySQL drop the
+    implicit one (named after the column), and MySQL refuses to drop the
+    new index while nothing else serves the foreign key. Other databases
+    make no implicit indexes, so there is nothing to restore.
+    """
+    bind = op.get_bind()
+    if bind.dialect.name not in ('mysql', 'mariadb'):
+        return
+    inspector = sa.inspect(bind)
+    leading = {index['column_names'][0] for index in inspector.get_indexes(table) if index['name'] != name}
+    leading.update(inspector.get_pk_constraint(table)['constrained_columns'][:1])
+    if fk_column not in leading:
+        op.create_index(fk_column, table, [fk_column], unique=False)
+
+
+def downgrade():
+    for table, name, _, fk_column in reversed(INDEXES):
+        _restore_foreign_key_index(table, name, fk_column)
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,52 @@
+"""Add barter_cycles and barter_cycle_members
+
+Revision ID: 3f7a2c9e1d48
+Revises: 9d4b2e8f6a15
+Create Date: 2026-10-18 19:10:37.551902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f7a2c9e1d48'
+down_revision = '9d4b2e8f6a15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled by `flask find-barter-cycles`
+    op.create_table(
+        'barter_cycles',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('generation', sa.Integer(), nullable=False),
+        sa.Column('length', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_barter_cycles_generation', 'barter_cycles', ['generation'], unique=False)
+    op.create_table(
+        'barter_cycle_members',
+        sa.Column('cycle_id', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('skill_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['cycle_id'], ['barter_cycles.id']),
+        sa.ForeignKeyConstraint(['skill_id'], ['skills.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('cycle_id', 'position')
+    )
+    op.create_index('ix_barter_cycle_members_user_cycle', 'barter_cycle_members', ['user_id', 'cycle_id'], unique=False)
+    # Generation counter; its row lock serializes concurrent runs
+    data_versions = sa.table('data_versions', sa.column('name', sa.String), sa.column('version', sa.BigInteger))
+    op.bulk_insert(data_versions, [{'name': 'barter_cycles', 'version': 0}])
+
+
+def downgrade():
+    op.execute("DELETE FROM data_versions WHERE name = 'barter_cycles'")
+    op.drop_index('ix_barter_cycle_members_user_cycle', table_name='barter_cycle_members')
+    op.drop_table('barter_cycle_members')
+    op.drop_index('ix_barter_cycles_generation', table_name='barter_cycles')
+    op.drop_table('barter_cycles')
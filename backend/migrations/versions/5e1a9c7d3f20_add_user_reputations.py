@@ -0,0 +1,125 @@
+"""Add user_reputations and one feedback per session and reviewer
+
+Revision ID: 5e1a9c7d3f20
+Revises: 2b8d4f6a1c93
+Create Date: 2026-10-18 17:05:49.210377
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1a9c7d3f20'
+down_revision = '2b8d4f6a1c93'
+branch_labels = None
+depends_on = None
+
+# Must match app.models.reputation.RECENT_WINDOW
+RECENT_WINDOW = 10
+# Feedback rows moved aside so uq_feedback_session_reviewer can be created;
+# downgrade() puts them back
+DUPLICATES_TABLE = 'feedback_duplicates'
+FEEDBACK_COLUMNS = ('id', 'session_id', 'reviewer_id', 'reviewee_id', 'rating', 'comment', 'created_at')
+
+
+def _feedback_table(name):
+    return sa.table(
+        name,
+        sa.column('id', sa.Integer),
+        sa.column('session_id', sa.Integer),
+        sa.column('reviewer_id', sa.Integer),
+        sa.column('reviewee_id', sa.Integer),
+        sa.column('rating', sa.Integer),
+        sa.column('comment', sa.Text),
+        sa.column('created_at', sa.TIMESTAMP)
+    )
+
+
+def _move_rows(bind, source, target, ids=None):
+    """Copy rows `ids` (default: all) of `source` into `target`, then delete them from `source`"""
+    columns = [source.c[name] for name in FEEDBACK_COLUMNS]
+    batches = [None] if ids is None else [ids[start:start + 1000] for start in range(0, len(ids), 1000)]
+    for batch in batches:
+        query = sa.select(*columns)
+        delete = sa.delete(source)
+        if batch is not None:
+            query = query.where(source.c.id.in_(batch))
+            delete = delete.where(source.c.id.in_(batch))
+        bind.execute(sa.insert(target).from_select(list(FEEDBACK_COLUMNS), query))
+        bind.execute(delete)
+
+
+def upgrade():
+    reputations = op.create_table(
+        'user_reputations',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('rating_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('rating_sum', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('recent_ratings', sa.String(length=64), nullable=False, server_default=''),
+        sa.Column('updated_at', sa.TIMESTAMP(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+    feedback = _feedback_table('feedback')
+    bind = op.get_bind()
+
+    # Keep the first feedback per session and reviewer and move the others
+    # to feedback_duplicates (nothing is deleted), then enforce it
+    seen = set()
+    duplicates = []
+    for feedback_id, session_id, reviewer_id in bind.execute(
+        sa.select(feedback.c.id, feedback.c.session_id, feedback.c.reviewer_id).order_by(feedback.c.id)
+    ):
+        if (session_id, reviewer_id) in seen:
+            duplicates.append(feedback_id)
+        seen.add((session_id, reviewer_id))
+    if duplicates:
+        op.create_table(
+            DUPLICATES_TABLE,
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+            sa.Column('session_id', sa.Integer(), nullable=False),
+            sa.Column('reviewer_id', sa.Integer(), nullable=False),
+            sa.Column('reviewee_id', sa.Integer(), nullable=False),
+            sa.Column('rating', sa.Integer(), nullable=False),
+            sa.Column('comment', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.TIMESTAMP(), nullable=True)
+        )
+        _move_rows(bind, feedback, _feedback_table(DUPLICATES_TABLE), duplicates)
+        logger.warning('Moved %d duplicate feedback row(s) (same session and reviewer) to %s: ids %s',
+                       len(duplicates), DUPLICATES_TABLE, ', '.join(map(str, duplicates[:100])))
+    op.create_unique_constraint('uq_feedback_session_reviewer', 'feedback', ['session_id', 'reviewer_id'])
+
+    # Backfill from the remaining feedback, newest ratings first per user
+    rows = bind.execute(
+        sa.select(feedback.c.reviewee_id, feedback.c.rating)
+        .order_by(feedback.c.reviewee_id, feedback.c.created_at.desc(), feedback.c.id.desc())
+    )
+    totals = {}
+    for user_id, rating in rows:
+        count, total, recent = totals.get(user_id, (0, 0, []))
+        if len(recent) < RECENT_WINDOW:
+            recent.append(str(rating))
+        totals[user_id] = (count + 1, total + rating, recent)
+    if totals:
+        op.bulk_insert(reputations, [
+            {'user_id': user_id, 'rating_count': count, 'rating_sum': total,
+             'recent_ratings': ','.join(recent)}
+            for user_id, (count, total, recent) in totals.items()
+        ])
+
+
+def downgrade():
+    op.drop_table('user_reputations')
+    # The unique index also serves the session_id foreign key on MySQL
+    op.create_index('ix_feedback_session_id', 'feedback', ['session_id'], unique=False)
+    op.drop_constraint('uq_feedback_session_reviewer', 'feedback', type_='unique')
+    bind = op.get_bind()
+    if sa.inspect(bind).has_table(DUPLICATES_TABLE):
+        _move_rows(bind, _feedback_table(DUPLICATES_TABLE), _feedback_table('feedback'))
+        op.drop_table(DUPLICATES_TABLE)
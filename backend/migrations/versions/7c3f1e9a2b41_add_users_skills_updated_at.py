@@ -0,0 +1,46 @@
+"""Add users.skills_updated_at, users.skills_version and data_versions
+
+Revision ID: 7c3f1e9a2b41
+Revises: 534a8f04f823
+Create Date: 2026-10-18 10:12:04.118532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3f1e9a2b41'
+down_revision = '534a8f04f823'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('skills_updated_at', sa.TIMESTAMP(), nullable=True))
+    op.create_index(op.f('ix_users_skills_updated_at'), 'users', ['skills_updated_at'], unique=False)
+    # Existing users keep a NULL version: incremental readers start with a full load
+    op.add_column('users', sa.Column('skills_version', sa.BigInteger(), nullable=True))
+    op.create_index(op.f('ix_users_skills_version'), 'users', ['skills_version'], unique=False)
+    data_versions = op.create_table(
+        'data_versions',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(data_versions, [{'name': 'skills', 'version': 0}])
+    op.create_table(
+        'skill_tombstones',
+        sa.Column('version', sa.BigInteger(), autoincrement=False, nullable=False),
+        sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.PrimaryKeyConstraint('version', 'user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('skill_tombstones')
+    op.drop_table('data_versions')
+    op.drop_index(op.f('ix_users_skills_version'), table_name='users')
+    op.drop_column('users', 'skills_version')
+    op.drop_index(op.f('ix_users_skills_updated_at'), table_name='users')
+    op.drop_column('users', 'skills_updated_at')
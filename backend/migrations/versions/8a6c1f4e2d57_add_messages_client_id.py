@@ -0,0 +1,27 @@
+"""Add messages.client_id for idempotent sends
+
+Revision ID: 8a6c1f4e2d57
+Revises: 3f7a2c9e1d48
+Create Date: 2026-10-18 21:02:44.180356
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a6c1f4e2d57'
+down_revision = '3f7a2c9e1d48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('messages', sa.Column('client_id', sa.String(length=64), nullable=True))
+    # NULLs do not collide, so existing rows and sends without an id are unaffected
+    op.create_unique_constraint('uq_messages_sender_client_id', 'messages', ['sender_id', 'client_id'])
+
+
+def downgrade():
+    op.drop_constraint('uq_messages_sender_client_id', 'messages', type_='unique')
+    op.drop_column('messages', 'client_id')
@@ -0,0 +1,88 @@
+"""Add match_candidates
+
+Revision ID: 9d4b2e8f6a15
+Revises: 5e1a9c7d3f20
+Create Date: 2026-10-18 18:22:13.804416
+
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4b2e8f6a15'
+down_revision = '5e1a9c7d3f20'
+branch_labels = None
+depends_on = None
+
+
+# Users per backfill transaction, and rows per multi-row INSERT
+BATCH_SIZE = 1000
+
+
+def _join_ids(ids):
+    return ','.join(str(i) for i in sorted(ids))
+
+
+def _pair_skills(bind, mine, theirs, user_ids):
+    """(user_id, other_id) -> skill ids in `theirs` matching user_id's skills in `mine`"""
+    mine, theirs = mine.alias('mine'), theirs.alias('theirs')
+    pairs = {}
+    rows = bind.execute(
+        sa.select(mine.c.user_id, theirs.c.user_id, theirs.c.skill_id)
+        .join(theirs, theirs.c.skill_id == mine.c.skill_id)
+        .where(mine.c.user_id.in_(user_ids), theirs.c.user_id != mine.c.user_id)
+    )
+    for user_id, other_id, skill_id in rows:
+        pairs.setdefault((user_id, other_id), set()).add(skill_id)
+    return pairs
+
+
+def upgrade():
+    match_candidates = op.create_table(
+        'match_candidates',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('candidate_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Integer(), nullable=False),
+        sa.Column('offered_skill_ids', sa.Text(), nullable=False),
+        sa.Column('required_skill_ids', sa.Text(), nullable=False),
+        sa.Column('updated_at', sa.TIMESTAMP(), nullable=True),
+        sa.ForeignKeyConstraint(['candidate_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'candidate_id')
+    )
+    op.create_index('ix_match_candidates_candidate_id', 'match_candidates', ['candidate_id'], unique=False)
+
+    # Backfill every user's reciprocal matches (the work of `flask
+    # rebuild-matches`), so the matches endpoint is never served from an
+    # empty table; a batch of users at a time keeps memory bounded
+    offered = sa.table('user_offered_skills', sa.column('user_id', sa.Integer), sa.column('skill_id', sa.Integer))
+    required = sa.table('user_required_skills', sa.column('user_id', sa.Integer), sa.column('skill_id', sa.Integer))
+    bind = op.get_bind()
+    user_ids = sorted(
+        set(bind.execute(sa.select(offered.c.user_id).distinct()).scalars())
+        & set(bind.execute(sa.select(required.c.user_id).distinct()).scalars())
+    )
+    now = datetime.datetime.utcnow()
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        batch = user_ids[start:start + BATCH_SIZE]
+        they_offer = _pair_skills(bind, required, offered, batch)
+        they_need = _pair_skills(bind, offered, required, batch)
+        rows = [
+            {'user_id': user_id, 'candidate_id': candidate_id,
+             'score': len(offered_ids) + len(they_need[user_id, candidate_id]),
+             'offered_skill_ids': _join_ids(offered_ids),
+             'required_skill_ids': _join_ids(they_need[user_id, candidate_id]),
+             'updated_at': now}
+            for (user_id, candidate_id), offered_ids in they_offer.items()
+            if (user_id, candidate_id) in they_need
+        ]
+        for rows_start in range(0, len(rows), BATCH_SIZE):
+            op.bulk_insert(match_candidates, rows[rows_start:rows_start + BATCH_SIZE])
+
+
+def downgrade():
+    op.drop_index('ix_match_candidates_candidate_id', table_name='match_candidates')
+    op.drop_table('match_candidates')
@@ -0,0 +1,105 @@
+import pytest
+from flask.testing import FlaskClient
+from sqlalchemy import event
+
+from app import create_app, db
+from app.config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SECRET_KEY = JWT_SECRET_KEY = 'test-secret-key-of-at-least-32-bytes'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    BCRYPT_LOG_ROUNDS = 4
+    PASSWORD_HASH_WORKERS = 0
+    # Everything inline, so tests see writes as soon as they commit
+    CHAT_WRITE_BEHIND = False
+    MATCH_CANDIDATES_WORKER = False
+    METRICS_ENDPOINT = False
+    SKILL_TYPEAHEAD_PRELOAD = False
+    PUBSUB_REDIS_URL = None
+
+
+# Offered and required skill names per seeded user (ids 1-5)
+SEED_SKILLS = {
+    1: (['Python', 'Web Development'], ['Graphic Design', 'Marketing']),
+    2: (['Data Analysis', 'Graphic Design'], ['Python', 'Web Development']),
+    3: (['Writing', 'Marketing'], ['Data Analysis']),
+    4: (['Graphic Design'], ['Python']),
+    5: (['Marketing'], ['Writing']),
+}
+SKILL_NAMES = ['Python', 'Web Development', 'Data Analysis', 'Graphic Design', 'Writing', 'Marketing']
+
+
+def seed():
+    from app.models import Profile, Skill, User
+
+    skills = {name: Skill(name=name) for name in SKILL_NAMES}
+    db.session.add_all(skills.values())
+    for user_id, (offered, required) in SEED_SKILLS.items():
+        user = User(id=user_id, email=f'user{user_id}@example.com', name=f'User {user_id}', password_hash='!')
+        user.offered_skills = [skills[name] for name in offered]
+        user.required_skills = [skills[name] for name in required]
+        db.session.add(user)
+        db.session.add(Profile(user_id=user_id, bio=f'Bio of user {user_id}',
+                               location='Paris' if user_id % 2 else 'Berlin'))
+    db.session.commit()
+
+
+@pytest.fixture
+def app(tmp_path):
+    class Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "test.db"}'
+
+    app = create_app(Config)
+    with app.app_context():
+        db.create_all()
+        seed()
+        yield app
+        db.session.remove()
+
+
+class AppContextClient(FlaskClient):
+    """
+    Runs every request in its own app context, as in production
+
+    A request reuses an already pushed app context, and with it `g` and the
+    database session, which the `app` fixture keeps pushed for the test.
+    """
+
+    def open(self, *args, **kwargs):
+        with self.application.app_context():
+            return super().open(*args, **kwargs)
+
+
+@pytest.fixture
+def client(app):
+    app.test_client_class = AppContextClient
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(app):
+    from app.utils.auth import generate_token
+
+    def headers(user_id):
+        return {'Authorization': f'Bearer {generate_token(user_id)}'}
+    return headers
+
+
+@pytest.fixture
+def statements(app):
+    """SQL statements run on the app's engine during the test"""
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield seen
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def skill_ids(*names):
+    from app.models import Skill
+
+    return [db.session.execute(db.select(Skill.id).where(Skill.name == name)).scalar_one() for name in names]
@@ -0,0 +1,92 @@
+import datetime
+import time
+
+import jwt
+import pytest
+from flask import g
+
+from app import db
+from app.auth import AuthError, TTLCache, authenticate, claims_cache, load_current_user, verify_token
+from app.utils.auth import generate_token
+
+
+def make_token(app, **claims):
+    return jwt.encode({'sub': '1', **claims}, app.config['JWT_SECRET_KEY'], algorithm='HS256')
+
+
+def test_ttl_cache_evicts_oldest_and_expired():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+    cache.set('d', 4, ttl=-1)
+    assert cache.get('d') is None
+    cache.set('e', 5, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get('e') is None
+
+
+def test_verify_token_caches_claims(app, monkeypatch):
+    claims_cache.clear()
+    token = generate_token(1)
+    decodes = []
+    decode = jwt.decode
+    monkeypatch.setattr(jwt, 'decode', lambda *args, **kwargs: decodes.append(1) or decode(*args, **kwargs))
+    assert verify_token(token)['sub'] == '1'
+    assert verify_token(token)['sub'] == '1'
+    assert len(decodes) == 1
+
+
+@pytest.mark.parametrize('claims, message', [
+    ({'exp': datetime.datetime.utcnow() - datetime.timedelta(seconds=5)}, 'Token has expired!'),
+    ({'sub': 'x'}, 'Invalid token subject.'),
+])
+def test_authenticate_rejects(app, claims, message):
+    with app.test_request_context():
+        with pytest.raises(AuthError, match=message):
+            authenticate(make_token(app, **claims))
+
+
+def test_cached_claims_still_expire(app, monkeypatch):
+    claims_cache.clear()
+    now = time.time()
+    token = make_token(app, exp=now + 60)
+    verify_token(token)
+    assert len(claims_cache) == 1
+    monkeypatch.setattr(time, 'time', lambda: now + 61)
+    with pytest.raises(AuthError, match='expired'):
+        verify_token(token)
+
+
+def test_forged_token_is_rejected(app):
+    token = jwt.encode({'sub': '1'}, 'another-secret-of-at-least-32-bytes!!', algorithm='HS256')
+    with pytest.raises(AuthError, match='Invalid token!'):
+        verify_token(token)
+
+
+def test_current_user_is_loaded_once_per_request(app, statements):
+    with app.test_request_context(headers={'Authorization': f'Bearer {generate_token(2)}'}):
+        db.session.expunge_all()
+        assert authenticate().user_id == 2
+        user = load_current_user()
+        assert load_current_user() is user
+        assert g.identity.user_id == user.id == 2
+    assert len([s for s in statements if 'FROM users' in s]) == 1
+
+
+def test_identity_endpoints_skip_the_user_row(client, auth_headers, statements):
+    response = client.get('/api/matching/skills', headers=auth_headers(1))
+    assert response.status_code == 200
+    assert not [s for s in statements if 'FROM users' in s]
+
+
+@pytest.mark.parametrize('headers', [{}, {'Authorization': 'Bearer nonsense'}])
+def test_token_required_answers_401(client, headers):
+    assert client.get('/api/profile/', headers=headers).status_code == 401
+    assert client.get('/api/matching/skills', headers=headers).status_code == 401
+
+
+def test_unknown_user_is_rejected(client, auth_headers):
+    assert client.get('/api/profile/', headers=auth_headers(99)).status_code == 401
@@ -0,0 +1,81 @@
+import pytest
+from sqlalchemy import select
+
+from app import db
+from app.models import BarterCycle, BarterCycleMember
+from app.utils import barter_cycles
+from app.utils.barter_cycles import find_cycles, store_cycles
+
+
+# 1 teaches 2 (Python), 2 teaches 3 (Data Analysis), 3 teaches 1 (Marketing)
+# or 5 (Writing), 5 teaches 1 (Marketing)
+EXPECTED = [(1, 2, 3), (1, 2, 3, 5)]
+
+
+def stored_cycles():
+    members = db.session.execute(
+        select(BarterCycleMember.cycle_id, BarterCycleMember.user_id)
+        .order_by(BarterCycleMember.cycle_id, BarterCycleMember.position)
+    ).all()
+    cycles = {}
+    for cycle_id, user_id in members:
+        cycles.setdefault(cycle_id, []).append(user_id)
+    return sorted(tuple(users) for users in cycles.values())
+
+
+def test_find_cycles(app):
+    finder = find_cycles()
+    assert sorted(finder.cycles) == EXPECTED
+    # Every member teaches the next one
+    for cycle in finder.cycles:
+        for position, user_id in enumerate(cycle):
+            learner_id = cycle[(position + 1) % len(cycle)]
+            assert finder.edge_skill(user_id, learner_id) in finder.user_required[learner_id]
+
+
+def test_store_cycles_replaces_the_previous_generation(app):
+    first = store_cycles(find_cycles())
+    first_ids = set(db.session.execute(select(BarterCycle.id)).scalars())
+    second = store_cycles(find_cycles())
+
+    assert second == first + 1
+    assert BarterCycle.latest_generation() == second
+    assert set(db.session.execute(select(BarterCycle.generation)).scalars()) == {second}
+    # New ids: a reader of the old generation never sees them reused
+    assert not first_ids & set(db.session.execute(select(BarterCycle.id)).scalars())
+    assert stored_cycles() == EXPECTED
+
+
+def test_failed_store_publishes_nothing(app, monkeypatch):
+    generation = store_cycles(find_cycles())
+    before = stored_cycles()
+
+    finder = find_cycles()
+    edge_skill = finder.edge_skill
+    written = []
+
+    def failing_edge_skill(teacher_id, learner_id):
+        # Fails in the second batch, after the first was written
+        written.append(teacher_id)
+        if len(written) > 4:
+            raise RuntimeError('connection lost')
+        return edge_skill(teacher_id, learner_id)
+
+    monkeypatch.setattr(barter_cycles, 'WRITE_BATCH_SIZE', 1)
+    monkeypatch.setattr(finder, 'edge_skill', failing_edge_skill)
+    with pytest.raises(RuntimeError):
+        store_cycles(finder)
+    db.session.rollback()
+
+    assert BarterCycle.latest_generation() == generation
+    assert stored_cycles() == before
+
+
+def test_barter_cycles_route_serves_latest_generation(client, auth_headers):
+    assert client.get('/api/barter-cycles', headers=auth_headers(3)).get_json() == []
+    store_cycles(find_cycles())
+    cycles = client.get('/api/barter-cycles', headers=auth_headers(3)).get_json()
+    assert [tuple(member['user']['id'] for member in cycle['members']) for cycle in cycles] == EXPECTED
+    assert cycles[0]['members'][0]['teaches']['name'] == 'Python'
+    cycles = client.get('/api/barter-cycles', headers=auth_headers(5)).get_json()
+    assert [cycle['length'] for cycle in cycles] == [4]
@@ -0,0 +1,138 @@
+import datetime
+import itertools
+
+import pytest
+
+from app import db
+from app.models import Message
+from app.routes import chat
+from app.utils.auth import generate_token
+
+
+def send(client, headers, receiver_id, content, **extra):
+    return client.post('/api/chat/send', headers=headers, json={'receiver_id': receiver_id, 'content': content, **extra})
+
+
+def add_messages(count, sender_id=1, receiver_id=2):
+    # Two per timestamp, so the keyset has to break ties on id
+    start = datetime.datetime(2024, 1, 1)
+    messages = [Message(sender_id=sender_id, receiver_id=receiver_id, content=f'm{i}',
+                        timestamp=start + datetime.timedelta(seconds=i // 2)) for i in range(count)]
+    db.session.add_all(messages)
+    db.session.commit()
+    return [message.id for message in messages]
+
+
+def read_events(response, count):
+    """The first `count` events of a stream, as (event, data) pairs, giving up after a few heartbeats"""
+    events = []
+    for chunk in itertools.islice(response.response, count + 20):
+        for block in chunk.decode().split('\n\n'):
+            fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+            if 'data' in fields:
+                events.append((fields.get('event'), fields['data']))
+        if len(events) >= count:
+            return events
+    return events
+
+
+@pytest.fixture
+def stream(client, app):
+    app.config['CHAT_STREAM_HEARTBEAT'] = 0.05
+    responses = []
+
+    def open_stream(user_id, last_event_id=None):
+        headers = {'Last-Event-ID': str(last_event_id)} if last_event_id is not None else {}
+        response = client.get('/api/chat/stream', headers=headers, query_string={'token': generate_token(user_id)})
+        responses.append(response)
+        return response
+    yield open_stream
+    for response in responses:
+        response.close()
+
+
+def test_send_stores_message_once_per_client_id(client, auth_headers):
+    response = send(client, auth_headers(1), 2, ' hello ', client_id='abc')
+    assert response.status_code == 201
+    body = response.get_json()
+    assert (body['sender_id'], body['receiver_id'], body['content']) == (1, 2, 'hello')
+
+    retry = send(client, auth_headers(1), 2, 'hello', client_id='abc')
+    assert retry.status_code == 200
+    assert retry.get_json()['id'] == body['id']
+    assert Message.query.count() == 1
+
+
+@pytest.mark.parametrize('receiver_id, content, status', [
+    (None, 'hi', 400), (2, '  ', 400), (1, 'hi', 400), (99, 'hi', 404),
+])
+def test_send_rejects_bad_messages(client, auth_headers, receiver_id, content, status):
+    assert send(client, auth_headers(1), receiver_id, content).status_code == status
+    assert Message.query.count() == 0
+
+
+def test_conversation_pages_newest_first_by_keyset(client, auth_headers, statements):
+    ids = add_messages(5)
+    add_messages(2, sender_id=3)
+    pages, cursor = [], None
+    while True:
+        response = client.get('/api/chat/2', headers=auth_headers(1),
+                              query_string={'limit': 2, **({'cursor': cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append([message['id'] for message in response.get_json()])
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert pages == [ids[:2:-1], ids[2:0:-1], ids[:1]]
+    # Later pages seek past the cursor (SQLite renders every LIMIT with an OFFSET ? of 0)
+    pages_read = [statement for statement in statements if 'ORDER BY messages.timestamp DESC' in statement]
+    assert ['messages.id < ?' in statement for statement in pages_read] == [False, True, True]
+
+
+def test_conversation_rejects_bad_cursor(client, auth_headers):
+    assert client.get('/api/chat/2', headers=auth_headers(1), query_string={'cursor': 'zzz'}).status_code == 400
+
+
+def test_stream_requires_token(client):
+    assert client.get('/api/chat/stream').status_code == 401
+
+
+def test_stream_pushes_sent_messages_to_both_sides(client, auth_headers, stream):
+    receiver, sender = stream(2), stream(1)
+    message_id = send(client, auth_headers(1), 2, 'hi').get_json()['id']
+    for response in (receiver, sender):
+        event, data = read_events(response, 1)[0]
+        assert event == 'message'
+        assert f'"id":{message_id}' in data
+
+
+def test_stream_replays_missed_messages_once(client, auth_headers, stream):
+    ids = add_messages(3)
+    response = stream(2, last_event_id=ids[0])
+    live_id = send(client, auth_headers(1), 2, 'live').get_json()['id']
+    events = read_events(response, 3)
+    assert [f'"id":{i}' in data for i, (_, data) in zip(ids[1:] + [live_id], events)] == [True] * 3
+
+
+def test_stream_resyncs_when_replay_limit_is_hit(monkeypatch, stream):
+    monkeypatch.setattr(chat, 'REPLAY_LIMIT', 2)
+    ids = add_messages(5)
+    events = read_events(stream(2, last_event_id=ids[0]), 3)
+    assert [event for event, _ in events] == ['message', 'message', 'resync']
+    assert f'"id":{ids[2]}' in events[1][1]
+
+    # Reconnecting from the last id sent picks up the rest
+    events = read_events(stream(2, last_event_id=ids[2]), 2)
+    assert [f'"id":{i}' in data for i, (_, data) in zip(ids[3:], events)] == [True, True]
+
+
+def test_stream_resyncs_subscriber_that_falls_behind(app, monkeypatch, stream):
+    from app.utils.pubsub import pubsub
+
+    monkeypatch.setattr(pubsub, 'maxsize', 2)
+    response = stream(2)
+    body = iter(response.response)
+    next(body)  # retry: line, once subscribed
+    for i in range(3):
+        pubsub.publish(chat.user_topic(2), {'id': i + 1})
+    assert b'event: resync' in next(body)
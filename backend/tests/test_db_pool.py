@@ -0,0 +1,47 @@
+from sqlalchemy import text
+
+from app import create_app, db
+from app.utils.db_pool import get_pool_status, pool_stats, pooled_connection
+
+from conftest import TestConfig
+
+
+def test_pooled_connections_are_counted(tmp_path):
+    class Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "pool.db"}'
+        SQLALCHEMY_ENGINE_OPTIONS = {'pool_size': 1, 'max_overflow': 1, 'pool_pre_ping': True}
+
+    app = create_app(Config)
+    with app.app_context():
+        db.engine.dispose()
+        pool_stats.reset()
+        with pooled_connection() as first, pooled_connection() as second:
+            assert first.execute(text('SELECT 1')).scalar() == second.execute(text('SELECT 2')).scalar() - 1
+            status = get_pool_status()
+            assert (status['checkedout'], status['overflow']) == (2, 1)
+        with pooled_connection():
+            pass
+
+        status = get_pool_status()
+        assert status['pool_class'] == 'QueuePool'
+        assert (status['size'], status['checkedout']) == (1, 0)
+        assert (status['checkouts'], status['checkins'], status['waits']) == (3, 3, 3)
+        assert (status['peak_checked_out'], status['peak_overflow']) == (2, 1)
+        # The overflow connection is closed on checkin, so the third checkout reuses the pooled one
+        assert status['connects'] == 2
+
+
+def test_session_checkouts_record_their_wait(tmp_path):
+    class Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "pool.db"}'
+
+    app = create_app(Config)
+    with app.app_context():
+        db.engine.dispose()
+        pool_stats.reset()
+        assert db.session.execute(text('SELECT 1')).scalar() == 1
+        db.session.remove()
+
+        status = get_pool_status()
+        assert status['pool_class'] == 'QueuePool'
+        assert status['checkouts'] == status['waits'] == 1
@@ -0,0 +1,40 @@
+from app import db
+from app.models import Skill, User
+
+from conftest import skill_ids
+
+
+def test_skill_users_cost_a_constant_number_of_queries(client, auth_headers, statements):
+    design, = skill_ids('Graphic Design')
+    headers = auth_headers(1)
+    client.get(f'/api/skills/{design}/users', headers=headers)
+    statements.clear()
+    response = client.get(f'/api/skills/{design}/users', headers=headers)
+    assert [user['id'] for user in response.get_json()] == [2, 4]
+    baseline = len(statements)
+
+    for user_id in range(6, 16):
+        user = User(id=user_id, email=f'user{user_id}@example.com', name=f'User {user_id}', password_hash='!')
+        user.offered_skills = [db.session.get(Skill, design)]
+        db.session.add(user)
+    db.session.commit()
+    statements.clear()
+    response = client.get(f'/api/skills/{design}/users', headers=headers)
+    assert len(response.get_json()) == 12
+    assert response.headers['X-Total-Count'] == '12'
+    assert len(statements) == baseline
+
+
+def test_skill_users_page_with_cursor(client, auth_headers):
+    design, = skill_ids('Graphic Design')
+    response = client.get(f'/api/skills/{design}/users', headers=auth_headers(1),
+                          query_string={'limit': 1, 'fields': 'name,offered_skills'})
+    assert response.get_json() == [{
+        'id': 2, 'name': 'User 2',
+        'offered_skills': [{'id': skill_id, 'name': name} for skill_id, name in
+                           zip(skill_ids('Data Analysis', 'Graphic Design'), ('Data Analysis', 'Graphic Design'))]
+    }]
+    response = client.get(f'/api/skills/{design}/users', headers=auth_headers(1),
+                          query_string={'cursor': response.headers['X-Next-Cursor']})
+    assert [user['id'] for user in response.get_json()] == [4]
+    assert 'X-Next-Cursor' not in response.headers
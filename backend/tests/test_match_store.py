@@ -0,0 +1,60 @@
+from sqlalchemy import delete, insert, select
+
+from app import db
+from app.models import MatchCandidate, User, user_offered_skills, user_required_skills
+from app.utils import match_store
+from app.utils.skill_index import skill_index
+
+from conftest import skill_ids
+
+
+def stored_pairs():
+    return sorted(db.session.execute(select(MatchCandidate.user_id, MatchCandidate.candidate_id)).all())
+
+
+def test_rebuild_all_matches_live_computation(app):
+    assert match_store.rebuild_all() == 4
+    assert stored_pairs() == [(1, 2), (1, 4), (2, 1), (4, 1)]
+    assert match_store.check_consistency() == []
+
+
+def test_refresh_users_reads_skills_from_database(app):
+    match_store.rebuild_all()
+    marketing, writing = skill_ids('Marketing', 'Writing')
+    # Another process changes users 1 and 2; this process's index is not told
+    db.session.execute(delete(user_required_skills).where(user_required_skills.c.user_id == 2))
+    db.session.execute(insert(user_offered_skills).values(user_id=1, skill_id=writing))
+    db.session.commit()
+    assert 2 in [candidate for candidate, _, _ in skill_index.reciprocal_matches(1)]
+
+    match_store.refresh_users([1, 2])
+    assert stored_pairs() == [(1, 4), (1, 5), (4, 1), (5, 1)]
+    row = db.session.get(MatchCandidate, (1, 5))
+    assert (row.offered_ids, row.required_ids, row.score) == ([marketing], [writing], 2)
+    # What a fresh index computes
+    assert match_store.check_consistency() == []
+
+
+def test_skill_changes_refresh_candidates(app):
+    match_store.rebuild_all()
+    user = db.session.get(User, 4)
+    user.required_skills = []
+    db.session.commit()
+    assert stored_pairs() == [(1, 2), (2, 1)]
+
+
+def test_failed_inline_refresh_is_retried_by_next_request(app, client, auth_headers, monkeypatch):
+    match_store.rebuild_all()
+    refresh_users = match_store.refresh_users
+
+    def fail(user_ids):
+        raise RuntimeError('database went away')
+    monkeypatch.setattr(match_store, 'refresh_users', fail)
+    user = db.session.get(User, 4)
+    user.required_skills = []
+    db.session.commit()
+    assert (1, 4) in stored_pairs()
+
+    monkeypatch.setattr(match_store, 'refresh_users', refresh_users)
+    assert client.get('/api/matches', headers=auth_headers(1)).status_code == 200
+    assert stored_pairs() == [(1, 2), (2, 1)]
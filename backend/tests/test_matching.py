@@ -0,0 +1,40 @@
+import pytest
+
+from app.utils.matching import find_ranked_matches
+from app.utils.pagination import encode_cursor
+
+from conftest import skill_ids
+
+
+def ranked_ids(result):
+    return [(match['id'], match['score']) for match in result['matches']]
+
+
+def test_ranked_matches_page_with_cursor(app):
+    first = find_ranked_matches(1, limit=2)
+    assert ranked_ids(first) == [(2, 3), (4, 2)]
+    assert first['total'] == 4
+    second = find_ranked_matches(1, limit=2, cursor=first['next_cursor'])
+    assert ranked_ids(second) == [(3, 1), (5, 1)]
+    assert second['next_cursor'] is None
+
+
+def test_ranked_matches_filters(app):
+    writing, = skill_ids('Writing')
+    assert ranked_ids(find_ranked_matches(1, {'skill_id': writing})) == [(3, 1), (5, 1)]
+    assert ranked_ids(find_ranked_matches(1, {'location': 'berl'})) == [(2, 3), (4, 2)]
+
+
+@pytest.mark.parametrize('kwargs', [{'cursor': 'zzz'}, {'cursor': encode_cursor(1)}, {'sort': 'name'}])
+def test_ranked_matches_reject_bad_arguments(app, kwargs):
+    with pytest.raises(ValueError):
+        find_ranked_matches(1, **kwargs)
+
+
+def test_ranked_endpoint_sets_total_header(client, auth_headers):
+    response = client.get('/api/matching/', headers=auth_headers(1), query_string={'limit': 1, 'fields': 'name'})
+    assert response.status_code == 200
+    assert response.headers['X-Total-Count'] == '4'
+    body = response.get_json()
+    assert body['data'] == [{'id': 2, 'name': 'User 2', 'score': 3}]
+    assert body['next_cursor']
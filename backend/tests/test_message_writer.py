@@ -0,0 +1,96 @@
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import Message
+from app.utils.message_writer import MessageQueueFull, message_writer
+
+
+@pytest.fixture
+def writer(app):
+    published = []
+
+    def configure(**options):
+        message_writer.configure(enabled=True, **options)
+        return message_writer
+    message_writer.add_listener(published.append)
+    configure.published = published
+    yield configure
+    message_writer.configure()
+    message_writer._listeners.remove(published.append)
+
+
+@pytest.fixture
+def commits(app):
+    seen = []
+
+    def record(conn):
+        seen.append(conn)
+    event.listen(db.engine, 'commit', record)
+    yield seen
+    event.remove(db.engine, 'commit', record)
+
+
+def test_commits_once_per_batch(writer, commits):
+    writer(batch_size=3, flush_interval=0.5)
+    futures = [message_writer.submit(1, 2, f'm{i}') for i in range(5)]
+    payloads = [future.result(timeout=5) for future in futures]
+
+    assert len(commits) == 2
+    # Stored and published in submission order, one callback per batch
+    ids = [payload['id'] for payload in payloads]
+    assert ids == sorted(ids)
+    assert [message.content for message in Message.query.order_by(Message.id)] == [f'm{i}' for i in range(5)]
+    assert [[payload['content'] for payload in batch] for batch in writer.published] == [['m0', 'm1', 'm2'], ['m3', 'm4']]
+
+
+def test_shutdown_drains_the_queue(writer):
+    writer(batch_size=100, flush_interval=30)
+    futures = [message_writer.submit(1, 2, f'm{i}') for i in range(3)]
+    message_writer.shutdown()
+    assert all(future.done() for future in futures)
+    assert Message.query.count() == 3
+
+
+def test_duplicate_client_id_in_one_batch_is_stored_once(writer):
+    writer(batch_size=10, flush_interval=0.2)
+    first, retry = (message_writer.submit(1, 2, 'hi', client_id='abc') for _ in range(2))
+    assert first.result(timeout=5) == retry.result(timeout=5)
+    assert Message.query.count() == 1
+
+
+def test_full_buffer_pushes_back(writer, monkeypatch, client, auth_headers):
+    writer(max_pending=1, enqueue_timeout=0.01)
+    # No writer thread, so nothing leaves the buffer
+    monkeypatch.setattr(message_writer, '_ensure_started', lambda: None)
+    message_writer.submit(1, 2, 'first')
+    with pytest.raises(MessageQueueFull):
+        message_writer.submit(1, 2, 'second')
+
+    response = client.post('/api/chat/send', headers=auth_headers(1), json={'receiver_id': 2, 'content': 'third'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_send_answers_once_the_batch_commits(writer, client, auth_headers):
+    writer(flush_interval=0.05)
+    response = client.post('/api/chat/send', headers=auth_headers(1), json={'receiver_id': 2, 'content': 'hi'})
+    assert response.status_code == 201
+    assert db.session.get(Message, response.get_json()['id']).content == 'hi'
+
+
+def test_published_messages_match_stored_rows(writer, monkeypatch, client, auth_headers):
+    # The path for databases without RETURNING (MySQL): one INSERT per row
+    monkeypatch.setattr(db.engine.dialect, 'insert_executemany_returning_sort_by_parameter_order', False)
+    # Ids that a concurrent writer interleaves must not shift this batch's
+    db.session.add(Message(sender_id=3, receiver_id=4, content='other'))
+    db.session.commit()
+    writer(batch_size=10, flush_interval=0.2)
+    futures = [message_writer.submit(1, 2, f'm{i}') for i in range(3)]
+    published = [future.result(timeout=5) for future in futures]
+
+    stored = client.get('/api/chat/2', headers=auth_headers(1)).get_json()
+    assert sorted(stored, key=lambda message: message['id']) == published
+    # Whole seconds, as a MySQL TIMESTAMP column stores them
+    assert not any('.' in message['timestamp'] for message in published)
+    assert writer.published == [published]
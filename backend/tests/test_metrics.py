@@ -0,0 +1,74 @@
+import logging
+import re
+
+import pytest
+
+from app import create_app, db
+from app.utils.metrics import metrics
+
+from conftest import AppContextClient, TestConfig, seed
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+@pytest.fixture
+def metrics_client(tmp_path):
+    class Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "test.db"}'
+        METRICS_ENDPOINT = True
+        METRICS_TOKEN = 'scrape-token'
+
+    app = create_app(Config)
+    with app.app_context():
+        db.create_all()
+        seed()
+    app.test_client_class = AppContextClient
+    yield app.test_client()
+    with app.app_context():
+        db.session.remove()
+
+
+def server_timing(response):
+    match = re.fullmatch(r'db;dur=([\d.]+);desc="(\d+) queries", app;dur=([\d.]+)', response.headers['Server-Timing'])
+    return float(match[1]), int(match[2]), float(match[3])
+
+
+def test_server_timing_counts_request_statements(client, auth_headers, statements):
+    response = client.get('/api/skills', headers=auth_headers(1))
+    db_ms, queries, app_ms = server_timing(response)
+    assert queries == len(statements) > 0
+    assert 0 <= db_ms <= app_ms
+
+
+def test_slow_queries_are_logged_with_route(client, auth_headers, monkeypatch, caplog):
+    monkeypatch.setattr(metrics, 'slow_query_seconds', 0)
+    with caplog.at_level(logging.WARNING):
+        client.get('/api/skills', headers=auth_headers(1))
+    assert any('Slow query' in message and 'GET /api/skills' in message for message in caplog.messages)
+
+
+def test_metrics_endpoint_exports_route_totals(metrics_client):
+    assert metrics_client.get('/metrics').status_code == 401
+    metrics_client.get('/api/skills')
+    response = metrics_client.get('/metrics', headers={'Authorization': 'Bearer scrape-token'})
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{route="/api/skills",method="GET"} 1' in text
+    assert 'http_responses_total{route="/metrics",method="GET",status="401"} 1' in text
+    assert re.search(r'^db_statements_total\{route="/api/skills",method="GET"\} [1-9]', text, re.M)
+    assert re.search(r'^db_pool\{stat="\w+"\} ', text, re.M)
+    assert 'cache_requests_total{cache="skill_catalog",result="hit"}' in text
+
+
+def test_metrics_endpoint_is_off_without_token(tmp_path):
+    class Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "test.db"}'
+        METRICS_ENDPOINT = True
+        METRICS_TOKEN = None
+
+    assert create_app(Config).test_client().get('/metrics').status_code == 404
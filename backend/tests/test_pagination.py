@@ -0,0 +1,72 @@
+import pytest
+
+from app.utils.pagination import decode_cursor, decode_numeric_cursor, encode_cursor, parse_limit
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor('2026-10-18T12:00:00', 42)
+    assert '=' not in cursor
+    assert decode_cursor(cursor, 2) == ['2026-10-18T12:00:00', 42]
+
+
+@pytest.mark.parametrize('cursor', ['', 'not base64!', 'e30', encode_cursor(1, 2, 3)])
+def test_decode_rejects_malformed_cursors(cursor):
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        decode_cursor(cursor, 2)
+
+
+def test_numeric_cursor():
+    assert decode_numeric_cursor(encode_cursor(4.5, 7), 2) == [4.5, 7]
+    for values in (('7',), (True,), (None,)):
+        with pytest.raises(ValueError, match='Invalid cursor'):
+            decode_numeric_cursor(encode_cursor(*values), 1)
+
+
+@pytest.mark.parametrize('value, expected', [(None, 20), ('', 20), ('5', 5), ('1000', 100)])
+def test_parse_limit(value, expected):
+    assert parse_limit(value) == expected
+
+
+@pytest.mark.parametrize('value', ['0', '-3', 'ten', '1.5'])
+def test_parse_limit_rejects(value):
+    with pytest.raises(ValueError, match='positive integer'):
+        parse_limit(value)
+
+
+def test_users_pages_with_id_cursor(client, auth_headers):
+    headers = auth_headers(1)
+    seen = []
+    cursor = None
+    while True:
+        query = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+        response = client.get('/api/users', headers=headers, query_string=query)
+        assert response.status_code == 200
+        assert response.headers['X-Total-Count'] == '4'
+        seen += [user['id'] for user in response.get_json()]
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert seen == [2, 3, 4, 5]
+
+
+@pytest.mark.parametrize('cursor', ['zzz', encode_cursor('1'), encode_cursor(1, 2)])
+def test_users_rejects_bad_cursor(client, auth_headers, cursor):
+    response = client.get('/api/users', headers=auth_headers(1), query_string={'cursor': cursor})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid cursor'}
+
+
+def test_users_search_pages_by_rank(client, auth_headers):
+    headers = auth_headers(2)
+    seen = []
+    cursor = None
+    while True:
+        query = {'search': 'paris', 'limit': 1, **({'cursor': cursor} if cursor else {})}
+        response = client.get('/api/users', headers=headers, query_string=query)
+        assert response.status_code == 200
+        assert response.headers['X-Total-Count'] == '3'
+        seen += [user['id'] for user in response.get_json()]
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert seen == [1, 3, 5]
@@ -0,0 +1,81 @@
+import pytest
+
+from app import db
+from app.models import User
+from app.utils.passwords import PasswordHasher, PasswordHasherBusy, password_hasher
+
+
+@pytest.fixture
+def user(app):
+    user = db.session.get(User, 1)
+    user.set_password('correct horse')
+    db.session.commit()
+    return user
+
+
+def login(client, password='correct horse'):
+    return client.post('/api/auth/login', json={'email': 'user1@example.com', 'password': password})
+
+
+def test_hash_and_check_inline():
+    hasher = PasswordHasher()
+    hasher.configure(workers=0, rounds=4)
+    pw_hash = hasher.hash('secret')
+    assert pw_hash.startswith('$2b$04$')
+    assert hasher.check(pw_hash, 'secret')
+    assert not hasher.check(pw_hash, 'wrong')
+    assert not hasher.check('not a hash', 'secret')
+    assert not hasher.needs_rehash(pw_hash)
+    hasher.configure(workers=0, rounds=5)
+    assert hasher.needs_rehash(pw_hash)
+    with pytest.raises(ValueError):
+        hasher.hash('')
+
+
+def test_process_pool_hashes_and_rejects_when_full():
+    hasher = PasswordHasher()
+    hasher.configure(workers=1, max_pending=1, rounds=4)
+    try:
+        pw_hash = hasher.hash('secret')
+        assert hasher.check(pw_hash, 'secret')
+        assert [hasher.check(h, 'a') for h in hasher.hash_many(['a', 'b'])] == [True, False]
+        # The only slot is taken: the next job fails fast
+        hasher._slots.acquire()
+        with pytest.raises(PasswordHasherBusy):
+            hasher.hash('secret')
+        hasher._slots.release()
+    finally:
+        hasher.shutdown()
+
+
+def test_login_rehashes_outdated_cost(client, user, monkeypatch):
+    old_hash = user.password_hash
+    monkeypatch.setattr(password_hasher, 'rounds', 5)
+    assert login(client).status_code == 200
+    db.session.expire_all()
+    new_hash = db.session.get(User, 1).password_hash
+    assert new_hash != old_hash and new_hash.startswith('$2b$05$')
+    assert login(client, 'wrong').status_code == 401
+
+
+def test_login_skips_rehash_when_pool_is_busy(client, user, monkeypatch):
+    old_hash = user.password_hash
+    monkeypatch.setattr(password_hasher, 'rounds', 5)
+
+    def busy(password):
+        raise PasswordHasherBusy('Password hashing queue is full')
+    monkeypatch.setattr(password_hasher, 'hash', busy)
+    response = login(client)
+    assert response.status_code == 200
+    assert response.get_json()['userId'] == 1
+    db.session.expire_all()
+    assert db.session.get(User, 1).password_hash == old_hash
+
+
+def test_signup_answers_503_when_pool_is_busy(client, monkeypatch):
+    def busy(password):
+        raise PasswordHasherBusy('Password hashing queue is full')
+    monkeypatch.setattr(password_hasher, 'hash', busy)
+    response = client.post('/api/auth/signup', json={'email': 'new@example.com', 'password': 'pw', 'name': 'New'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
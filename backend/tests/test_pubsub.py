@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from app.utils.pubsub import PubSub, RedisBroker
+
+fakeredis = pytest.importorskip('fakeredis')
+redis = pytest.importorskip('redis')
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(RedisBroker, 'RECONNECT_DELAY', 0.01)
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def hubs(server):
+    """Two processes' hubs sharing one Redis"""
+    made = []
+    for _ in range(2):
+        hub = PubSub()
+        hub.broker = RedisBroker(fakeredis.FakeRedis(server=server), hub)
+        made.append(hub)
+    return made
+
+
+def test_local_hub_delivers_to_topic_subscribers():
+    hub = PubSub(maxsize=2)
+    with hub.subscribe('a') as a, hub.subscribe('b') as b:
+        assert hub.publish('a', {'id': 1}) == 1
+        assert a.get(timeout=0) == {'id': 1}
+        assert b.get(timeout=0) is None
+        for i in range(3):
+            hub.publish('a', {'id': i})
+        assert a.overflowed
+    assert hub.subscriber_count() == 0
+
+
+def test_broker_delivers_across_processes_once(hubs):
+    first, second = hubs
+    with first.subscribe('user:2') as remote, second.subscribe('user:2') as local:
+        second.publish('user:2', {'id': 7, 'content': 'hi'})
+        assert remote.get(timeout=2) == {'id': 7, 'content': 'hi'}
+        assert local.get(timeout=2) == {'id': 7, 'content': 'hi'}
+        assert local.get(timeout=0.1) is None
+
+
+def test_broker_reconnect_makes_subscribers_resync(hubs):
+    first, second = hubs
+    dropped = threading.Event()
+    make_listener = first.broker.client.pubsub
+
+    def dropping_listener():
+        # The first connection drops once subscribed, as a Redis restart would
+        listener = make_listener()
+        listen = listener.listen
+
+        def listen_then_drop():
+            for item in listen():
+                yield item
+                if item['type'] == 'psubscribe' and not dropped.is_set():
+                    dropped.wait()
+                    raise redis.ConnectionError('Connection reset by peer')
+        listener.listen = listen_then_drop
+        return listener
+    first.broker.client.pubsub = dropping_listener
+
+    with first.subscribe('user:2') as subscription:
+        dropped.set()
+        deadline = time.monotonic() + 2
+        while not subscription.overflowed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert subscription.overflowed
+        # And it listens again
+        second.publish('user:2', {'id': 2})
+        assert subscription.get(timeout=2) == {'id': 2}
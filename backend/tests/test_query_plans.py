@@ -0,0 +1,39 @@
+from app import db
+from app.utils.query_plans import HOT_ROUTES, check_plans, explain
+
+
+def test_hot_routes_use_indexes(app, capsys):
+    failures = check_plans(app, user_id=1)
+    output = capsys.readouterr().out
+    assert failures == 0, output
+    for method, template, _ in HOT_ROUTES:
+        assert f'{method} {template}' in output
+    assert 'barter session duplicate check' in output
+    assert 'conversation history' in output
+
+
+def test_explain_reports_full_scans(app):
+    with db.engine.connect() as conn:
+        plan, scans = explain(conn, 'SELECT * FROM messages WHERE content = ?', ('hi',))
+        assert scans == ['messages']
+        plan, scans = explain(conn, 'SELECT * FROM messages WHERE sender_id = ? AND receiver_id = ?', (1, 2))
+        assert scans == []
+        assert any('ix_messages_sender_receiver_timestamp' in line for line in plan)
+
+
+def test_check_plans_counts_unindexed_queries(app, capsys, monkeypatch):
+    from app.models import Message
+    from app.utils import query_plans
+
+    monkeypatch.setattr(query_plans, 'HOT_ROUTES', [])
+    monkeypatch.setattr(query_plans, 'hot_queries', lambda ctx: [
+        ('messages by content', Message.query.filter(Message.content == 'hi')),
+    ])
+    assert check_plans(app, user_id=1) == 1
+    assert 'FULL SCAN of messages' in capsys.readouterr().out
+
+
+def test_cli_command(app):
+    result = app.test_cli_runner().invoke(args=['check-query-plans', '--user-id', '1'])
+    assert result.exit_code == 0, result.output
+    assert 'All query plans use indexes' in result.output
@@ -0,0 +1,85 @@
+import pytest
+
+from app import db
+from app.models import BarterSession, Feedback, UserReputation
+from app.models.reputation import RECENT_WINDOW
+from app.utils.matching import find_ranked_matches
+
+from conftest import skill_ids
+
+
+def rate(user_id, *ratings):
+    for rating in ratings:
+        reputation = UserReputation.record_rating(user_id, rating)
+    db.session.commit()
+    return reputation
+
+
+def completed_session(requester_id=1, provider_id=2, status='completed'):
+    python, design = skill_ids('Python', 'Graphic Design')
+    session = BarterSession(requester_id=requester_id, provider_id=provider_id, status=status,
+                            offered_skill_id=python, requested_skill_id=design)
+    db.session.add(session)
+    db.session.commit()
+    return session.id
+
+
+def test_record_rating_keeps_running_totals(app):
+    reputation = rate(2, 5, 3, 4)
+    assert (reputation.rating_count, reputation.rating_sum, reputation.recent) == (3, 12, [4, 3, 5])
+    assert UserReputation.summary(reputation) == {'count': 3, 'average': 4.0, 'recent_average': 4.0}
+    assert UserReputation.query.count() == 1
+
+
+def test_recent_average_only_covers_the_window(app):
+    reputation = rate(2, *[1] * RECENT_WINDOW + [5] * RECENT_WINDOW)
+    assert reputation.recent == [5] * RECENT_WINDOW
+    assert UserReputation.summary(reputation) == {'count': 2 * RECENT_WINDOW, 'average': 3.0, 'recent_average': 5.0}
+
+
+def test_summary_of_unrated_user(app):
+    assert UserReputation.summary(None) == {'count': 0, 'average': None, 'recent_average': None}
+
+
+def test_feedback_updates_reviewee_reputation(client, auth_headers):
+    session_id = completed_session()
+    response = client.post(f'/api/sessions/{session_id}/feedback', headers=auth_headers(1), json={'rating': 4})
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['reviewee_id'] == 2
+    assert body['reputation'] == {'count': 1, 'average': 4.0, 'recent_average': 4.0}
+
+    response = client.post(f'/api/sessions/{session_id}/feedback', headers=auth_headers(1), json={'rating': 2})
+    assert response.status_code == 400
+    assert db.session.get(UserReputation, 2).rating_count == 1
+    assert Feedback.query.count() == 1
+
+
+@pytest.mark.parametrize('user_id, rating, status, expected', [
+    (1, 6, 'completed', 400), (1, 'x', 'completed', 400), (3, 4, 'completed', 403), (1, 4, 'pending', 400),
+])
+def test_feedback_rejected(client, auth_headers, user_id, rating, status, expected):
+    session_id = completed_session(status=status)
+    response = client.post(f'/api/sessions/{session_id}/feedback', headers=auth_headers(user_id), json={'rating': rating})
+    assert response.status_code == expected
+    assert UserReputation.query.count() == 0
+
+
+def test_feedback_for_missing_session(client, auth_headers):
+    assert client.post('/api/sessions/99/feedback', headers=auth_headers(1), json={'rating': 4}).status_code == 404
+
+
+def test_ranked_matches_sort_by_reputation(app, statements):
+    rate(3, 5)
+    rate(4, 2, 4)
+    find_ranked_matches(1)  # Loads the skill index and names
+    del statements[:]
+    by_score = find_ranked_matches(1)
+    score_statements = len(statements)
+    del statements[:]
+    by_reputation = find_ranked_matches(1, sort='reputation')
+    assert [match['id'] for match in by_score['matches']] == [2, 4, 3, 5]
+    assert [match['id'] for match in by_reputation['matches']] == [3, 4, 2, 5]
+    assert by_reputation['matches'][1]['reputation'] == {'count': 2, 'average': 3.0, 'recent_average': 3.0}
+    # Averages come with the profile check ranking needs anyway
+    assert len(statements) == score_statements
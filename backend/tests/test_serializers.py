@@ -0,0 +1,64 @@
+import datetime
+import json
+
+import pytest
+
+from app.utils import serializers
+from app.utils.serializers import (STREAM_THRESHOLD, FieldsError, SkillDTO, UserDTO, dumps, json_list_response,
+                                   parse_fields)
+
+
+def make_user(**kwargs):
+    return UserDTO(7, 'Ada', email='ada@example.com', bio='Bio', location='Paris',
+                   offered_skills=[SkillDTO(1, 'Python')], **kwargs)
+
+
+def test_dumps_is_compact_and_encodes_dates(monkeypatch):
+    payload = {'when': datetime.datetime(2026, 10, 18, 12, 0), 'name': 'Zoë', 'skill': SkillDTO(1, 'Python')}
+    expected = b'{"when":"2026-10-18T12:00:00","name":"Zo\xc3\xab","skill":{"id":1,"name":"Python"}}'
+    assert dumps(payload) == expected
+    # Same bytes without orjson
+    monkeypatch.setattr(serializers, 'orjson', None)
+    assert dumps(payload) == expected
+
+
+def test_dto_uses_slots():
+    with pytest.raises(AttributeError):
+        make_user().nickname = 'A'
+
+
+def test_to_dict_sparse_fields_renames_and_nesting():
+    user = make_user()
+    assert user.to_dict({'name'}) == {'id': 7, 'name': 'Ada'}
+    assert user.to_dict({'offered_skills', 'required_skills'}, renames={'required_skills': 'requested_skills'}) == {
+        'id': 7, 'offered_skills': [{'id': 1, 'name': 'Python'}], 'requested_skills': []
+    }
+    assert user.to_dict({'bio', 'photo_url'}, defaults={'photo_url': ''}, nest_profile=True) == {
+        'id': 7, 'profile': {'bio': 'Bio', 'photo_url': ''}
+    }
+    assert user.to_dict({'name'}, nest_profile=True) == {'id': 7, 'name': 'Ada'}
+
+
+def test_parse_fields():
+    assert parse_fields(None, UserDTO.FIELDS) is None
+    assert parse_fields('name, bio,', UserDTO.FIELDS) == {'name', 'bio'}
+    with pytest.raises(FieldsError, match='Unknown field\\(s\\): password'):
+        parse_fields('name,password', UserDTO.FIELDS)
+
+
+def test_long_lists_are_streamed(app):
+    items = [{'id': i} for i in range(STREAM_THRESHOLD + 1)]
+    with app.test_request_context():
+        response = json_list_response(items, prefix=b'{"data":', suffix=b'}')
+        assert response.is_streamed
+        assert json.loads(b''.join(response.response)) == {'data': items}
+        short = json_list_response(items[:2])
+        assert not short.is_streamed and short.get_json() == items[:2]
+
+
+def test_endpoints_honour_fields(client, auth_headers):
+    response = client.get('/api/users', headers=auth_headers(1), query_string={'fields': 'name', 'limit': 1})
+    assert response.get_json() == [{'id': 2, 'name': 'User 2'}]
+    response = client.get('/api/users', headers=auth_headers(1), query_string={'fields': 'password'})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Unknown field(s): password'}
@@ -0,0 +1,78 @@
+import datetime
+
+import pytest
+
+from app import db
+from app.models import BarterSession
+
+from conftest import skill_ids
+
+
+def add_sessions(*specs):
+    """Sessions from (requester_id, provider_id, status) triples, a second apart, oldest first"""
+    python, design = skill_ids('Python', 'Graphic Design')
+    start = datetime.datetime(2024, 1, 1)
+    sessions = [BarterSession(requester_id=requester_id, provider_id=provider_id, status=status,
+                              offered_skill_id=python, requested_skill_id=design,
+                              created_at=start + datetime.timedelta(seconds=i))
+                for i, (requester_id, provider_id, status) in enumerate(specs)]
+    db.session.add_all(sessions)
+    db.session.commit()
+    return [session.id for session in sessions]
+
+
+def list_sessions(client, auth_headers, user_id=1, **params):
+    response = client.get('/api/sessions/', headers=auth_headers(user_id), query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_lists_both_roles_newest_first_with_counts(client, auth_headers):
+    ids = add_sessions((1, 2, 'pending'), (3, 1, 'completed'), (2, 3, 'pending'), (1, 4, 'pending'))
+    body = list_sessions(client, auth_headers)
+    assert [session['id'] for session in body['sessions']] == [ids[3], ids[1], ids[0]]
+    assert [session['role'] for session in body['sessions']] == ['requester', 'provider', 'requester']
+    first = body['sessions'][0]
+    assert first['provider'] == {'id': 4, 'name': 'User 4'}
+    assert (first['offered_skill']['name'], first['requested_skill']['name']) == ('Python', 'Graphic Design')
+    assert body['counts'] == {'pending': 2, 'accepted': 0, 'rejected': 0, 'completed': 1, 'cancelled': 0}
+    assert body['total'] == 3
+    assert body['next_cursor'] is None
+
+
+def test_filters_leave_counts_alone(client, auth_headers):
+    ids = add_sessions((1, 2, 'pending'), (3, 1, 'completed'), (1, 4, 'rejected'))
+    body = list_sessions(client, auth_headers, status='pending,rejected')
+    assert [session['id'] for session in body['sessions']] == [ids[2], ids[0]]
+    assert body['total'] == 3
+    body = list_sessions(client, auth_headers, role='provider')
+    assert [session['id'] for session in body['sessions']] == [ids[1]]
+
+
+def test_pages_by_keyset(client, auth_headers):
+    ids = add_sessions(*[(1, 2, 'pending')] * 5)
+    seen, cursor = [], None
+    while True:
+        body = list_sessions(client, auth_headers, limit=2, **({'cursor': cursor} if cursor else {}))
+        seen.append([session['id'] for session in body['sessions']])
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert seen == [ids[:2:-1], ids[2:0:-1], ids[:1]]
+
+
+@pytest.mark.parametrize('params', [{'status': 'done'}, {'role': 'owner'}, {'cursor': 'zzz'}, {'limit': 0}])
+def test_rejects_bad_parameters(client, auth_headers, params):
+    assert client.get('/api/sessions/', headers=auth_headers(1), query_string=params).status_code == 400
+
+
+def test_statement_count_does_not_grow_with_sessions(client, auth_headers, statements):
+    add_sessions(*[(1, 2, 'pending')] * 2)
+    del statements[:]
+    list_sessions(client, auth_headers)
+    few = len(statements)
+    add_sessions(*[(1, n, status) for n in (2, 3, 4, 5) for status in ('accepted', 'completed', 'cancelled')])
+    del statements[:]
+    body = list_sessions(client, auth_headers)
+    assert len(body['sessions']) == 14
+    assert len(statements) == few
@@ -0,0 +1,62 @@
+from app import db
+from app.models import Skill, User
+from app.utils.skill_catalog import SkillCatalog, skill_catalog
+
+
+def test_catalog_counts_offerers(client):
+    response = client.get('/api/skills')
+    assert response.status_code == 200
+    counts = {skill['name']: skill['user_count'] for skill in response.get_json()}
+    assert counts == {'Data Analysis': 1, 'Graphic Design': 2, 'Marketing': 2, 'Python': 1,
+                      'Web Development': 1, 'Writing': 1}
+    assert [skill['name'] for skill in response.get_json()] == sorted(counts)
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert response.headers['Last-Modified']
+
+
+def test_matching_etag_gets_304_without_queries(client, statements):
+    etag = client.get('/api/skills').headers['ETag']
+    statements.clear()
+    response = client.get('/api/skills', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert statements == []
+
+
+def test_if_modified_since(client):
+    last_modified = client.get('/api/skills').headers['Last-Modified']
+    assert client.get('/api/skills', headers={'If-Modified-Since': last_modified}).status_code == 304
+    assert client.get('/api/skills', headers={'If-Modified-Since': 'Thu, 01 Jan 2015 00:00:00 GMT'}).status_code == 200
+
+
+def test_writes_invalidate_the_catalog(client, auth_headers):
+    etag = client.get('/api/skills').headers['ETag']
+    user = db.session.get(User, 4)
+    user.offered_skills.append(Skill(name='Pottery'))
+    db.session.commit()
+
+    response = client.get('/api/skills', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert {'name': 'Pottery', 'user_count': 1} in [
+        {'name': skill['name'], 'user_count': skill['user_count']} for skill in response.get_json()
+    ]
+    # The matching view of the catalog shares the validators
+    response = client.get('/api/matching/skills', headers={**auth_headers(1), 'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+
+
+def test_catalog_is_built_once_per_version(client):
+    client.get('/api/skills')
+    misses = skill_catalog.misses
+    client.get('/api/skills')
+    client.get('/api/skills')
+    assert skill_catalog.misses == misses
+
+
+def test_etag_is_the_same_in_every_process(client):
+    etag = client.get('/api/skills').headers['ETag']
+    # Another worker, or this one after a restart or a rebuild, with the same skills
+    skill_catalog.invalidate()
+    assert client.get('/api/skills', headers={'If-None-Match': etag}).status_code == 304
+    assert f'W/"{SkillCatalog().etag}"' == etag
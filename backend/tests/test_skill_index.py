@@ -0,0 +1,105 @@
+import time
+
+from sqlalchemy import delete
+
+from app import db
+from app.models import Skill, User, user_offered_skills
+from app.utils.skill_index import skill_index
+from app.utils.user_set import UserSet
+
+from conftest import skill_ids
+
+
+def test_skill_index_loads_join_tables(app):
+    python, web, design = skill_ids('Python', 'Web Development', 'Graphic Design')
+    assert skill_index.offered_by(1) == {python, web}
+    assert skill_index.offerer_count(design) == 2
+    assert [candidate for candidate, _, _ in skill_index.reciprocal_matches(1)] == [2, 4]
+
+
+def test_skill_index_applies_orm_changes_on_commit(app):
+    skill_index.ensure_loaded()
+    writing, = skill_ids('Writing')
+    user = db.session.get(User, 4)
+    user.offered_skills.append(db.session.get(Skill, writing))
+    db.session.flush()
+    # Not visible before the commit
+    assert writing not in skill_index.offered_by(4)
+    db.session.commit()
+    assert writing in skill_index.offered_by(4)
+    assert skill_index.offerer_count(writing) == 2
+
+
+def test_skill_index_discards_rolled_back_changes(app):
+    skill_index.ensure_loaded()
+    before = skill_index.offered_by(4)
+    user = db.session.get(User, 4)
+    user.offered_skills = []
+    db.session.flush()
+    db.session.rollback()
+    assert skill_index.offered_by(4) == before
+
+
+def test_skill_index_drops_deleted_users(app):
+    skill_index.ensure_loaded()
+    db.session.delete(db.session.get(User, 5))
+    db.session.commit()
+    assert skill_index.offered_by(5) == frozenset()
+    assert 5 not in [candidate for candidate, _, _ in skill_index.reciprocal_matches(3)]
+
+
+def test_skill_index_rebuilds_after_max_age(app, monkeypatch):
+    skill_index.ensure_loaded()
+    calls = []
+    monkeypatch.setattr(skill_index, '_listeners', skill_index._listeners + [lambda: calls.append(1)])
+    # Another process's write: not seen by this process's session hooks
+    db.session.execute(delete(user_offered_skills).where(user_offered_skills.c.user_id == 4))
+    db.session.commit()
+    assert skill_index.offered_by(4)
+
+    skill_index.loaded_at = time.monotonic() - skill_index.max_age - 1
+    assert skill_index.offered_by(4) == frozenset()
+    assert calls
+
+
+def test_skill_index_snapshot_is_a_copy(app):
+    offerers, requirers, user_offered, user_required = skill_index.snapshot()
+    skill_index.set_user_skills(1, offered=())
+    assert user_offered[1]
+    assert skill_index.offered_by(1) == frozenset()
+
+
+def test_user_set_switches_between_sparse_and_dense():
+    sparse = UserSet([10 ** 6, 3, 3])
+    assert list(sparse) == [3, 10 ** 6] and len(sparse) == 2
+    assert sparse.nbytes == 8
+    dense = UserSet(range(1, 64))
+    assert dense.to_bitmap() == (1 << 64) - 2
+    assert list(sparse | dense) == list(range(1, 64)) + [10 ** 6]
+    assert list(sparse & dense) == [3]
+    assert list(dense - sparse) == [1, 2] + list(range(4, 64))
+    assert sparse.with_user(5) == UserSet([3, 5, 10 ** 6])
+    assert dense.without_user(1) == UserSet(range(2, 64))
+    assert 3 in sparse and 4 not in sparse and 63 in dense
+
+
+def test_matches_endpoint(client, auth_headers):
+    response = client.get('/api/matches', headers=auth_headers(1), query_string={'fields': 'name'})
+    assert response.status_code == 200
+    matches = response.get_json()
+    assert [match['user'] for match in matches] == [{'id': 2, 'name': 'User 2'}, {'id': 4, 'name': 'User 4'}]
+    python, design = skill_ids('Python', 'Graphic Design')
+    assert matches[1]['possible_exchanges'] == [{
+        'offered_skill_id': python, 'offered_skill_name': 'Python',
+        'requested_skill_id': design, 'requested_skill_name': 'Graphic Design'
+    }]
+
+
+def test_matches_endpoint_is_a_list_when_empty(client, auth_headers):
+    # User 5 has candidates of neither kind, user 6 has no skills at all
+    db.session.add(User(id=6, email='user6@example.com', name='User 6', password_hash='!'))
+    db.session.commit()
+    for user_id in (5, 6):
+        response = client.get('/api/matches', headers=auth_headers(user_id))
+        assert response.status_code == 200
+        assert response.get_json() == []
@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('pandas')
+pytest.importorskip('sklearn')
+pytest.importorskip('nltk')
+
+import pandas as pd  # noqa: E402
+
+from app import skill_matcher  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def nltk_data(monkeypatch):
+    """The NLTK corpora are a separate download: fall back to a small stop list and str.split"""
+    try:
+        skill_matcher.stopwords.words('english')
+        skill_matcher.word_tokenize('probe')
+    except LookupError:
+        monkeypatch.setattr(skill_matcher, 'stopwords', SimpleNamespace(words=lambda language: ['and', 'of', 'the']))
+        monkeypatch.setattr(skill_matcher, 'word_tokenize', str.split)
+    skill_matcher.get_stop_words.cache_clear()
+    skill_matcher._normalize_tokens.cache_clear()
+    yield
+    skill_matcher.get_stop_words.cache_clear()
+    skill_matcher._normalize_tokens.cache_clear()
+
+
+def test_normalize_texts_matches_preprocess_text():
+    texts = pd.Series(['Design of the Web', 'C++ and Python!', None, 'Data-Analysis', 'Design of the Web'])
+    expected = [skill_matcher.preprocess_text(text) for text in texts]
+    assert skill_matcher.normalize_texts(texts).tolist() == [text or '' for text in expected]
+    assert expected[0] == 'design web'
+
+
+def test_similarity_engine_top_k(app):
+    engine = skill_matcher.build_similarity_engine(batch_size=2)
+    top = engine.top_k_for_user(1, k=3)
+    assert len(top) == 3
+    assert 1 not in [user_id for user_id, _, _ in top]
+    scores = [score for _, _, score in top]
+    assert scores == sorted(scores, reverse=True) and scores[-1] > 0
+    # Batched scoring of everyone agrees with the single-user path
+    everyone = dict(engine.top_k_all(k=3))
+    assert everyone[1] == [(user_id, score) for user_id, _, score in top]
+    assert engine.top_k_for_user(99) == []
+
+
+def test_similarity_engine_mutual_scores_are_symmetric(app):
+    engine = skill_matcher.build_similarity_engine()
+    everyone = {user_id: dict(similar) for user_id, similar in engine.top_k_all(k=10, mutual=True)}
+    for user_id, similar in everyone.items():
+        for other_id, score in similar.items():
+            assert everyone[other_id][user_id] == pytest.approx(score)
+
+
+def fail(what):
+    def unexpected(*args, **kwargs):
+        raise AssertionError(f'unexpected {what}')
+    return unexpected
+
+
+def user_texts(users):
+    return {
+        row.user_id: (row.processed_text_offered, row.processed_text_requested)
+        for row in users.itertuples()
+    }
+
+
+def test_data_cache_patches_changed_users(app, monkeypatch):
+    from app import db
+    from app.models import Skill, User
+
+    cache = skill_matcher.SkillDataCache(chunksize=2)
+    assert user_texts(cache.get_users())[5] == ('marketing', 'writing')
+    version = cache.version
+
+    monkeypatch.setattr(cache, '_reload', fail('full reload'))
+
+    user = db.session.get(User, 5)
+    user.offered_skills.append(Skill(name='Pottery'))
+    db.session.delete(db.session.get(User, 4))
+    db.session.commit()
+
+    users = cache.get_users()
+    assert cache.version > version
+    texts = user_texts(users)
+    assert sorted(texts) == [1, 2, 3, 5]
+    assert sorted(texts[5][0].split()) == ['marketing', 'pottery']
+    assert texts[1] == user_texts(skill_matcher.build_users_frame(cache.skills))[1]
+    # Callers get copies of the cached frame
+    users.drop(users.index, inplace=True)
+    assert len(cache.get_users()) == 4
+
+
+def test_data_cache_skips_unchanged_version(app, monkeypatch):
+    cache = skill_matcher.SkillDataCache()
+    cache.refresh()
+    monkeypatch.setattr(skill_matcher, 'fetch_skills', fail('fetch'))
+    cache.refresh()
+    assert len(cache.get_users()) == 5
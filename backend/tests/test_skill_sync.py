@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import select
+
+from app import db
+from app.models import Profile, Skill, User, user_offered_skills
+from app.utils.skill_index import skill_index
+from app.utils.skill_sync import MAX_SKILL_NAME_LENGTH, clean_skill_names, resolve_skill_ids, sync_user_skills
+from app.utils.user_import import clean_record
+
+from conftest import skill_ids
+
+LONG_NAME = 'x' * (MAX_SKILL_NAME_LENGTH + 1)
+
+
+def offered_names(user_id):
+    return sorted(db.session.execute(
+        select(Skill.name).join(user_offered_skills).where(user_offered_skills.c.user_id == user_id)
+    ).scalars())
+
+
+def test_clean_skill_names():
+    assert clean_skill_names([' Python', 'python', '', None, 'SQL ']) == ['Python', 'SQL']
+    assert clean_skill_names(['y' * MAX_SKILL_NAME_LENGTH]) == ['y' * MAX_SKILL_NAME_LENGTH]
+    with pytest.raises(ValueError, match=f'at most {MAX_SKILL_NAME_LENGTH} characters'):
+        clean_skill_names(['Python', LONG_NAME])
+
+
+def test_resolve_skill_ids_creates_missing_skills(app):
+    python, = skill_ids('Python')
+    # Matched by the column collation: case-sensitive on SQLite
+    ids = resolve_skill_ids(['Python', 'Pottery'])
+    assert ids['python'] == python
+    assert db.session.get(Skill, ids['pottery']).name == 'Pottery'
+    assert resolve_skill_ids(['Knitting'], create=False) == {}
+
+
+def test_sync_user_skills_writes_only_the_diff(app, statements):
+    changed = sync_user_skills({
+        1: {'offered': ['Python', 'Pottery']},
+        2: {'offered': ['Data Analysis', 'Graphic Design']},
+        3: {'required': None},
+    })
+    assert changed == {1}
+    assert offered_names(1) == ['Pottery', 'Python']
+    assert offered_names(2) == ['Data Analysis', 'Graphic Design']
+    pottery, = skill_ids('Pottery')
+    assert pottery in skill_index.offered_by(1)
+    # One batched DELETE and INSERT for all changed pairs, whatever the number of users
+    prefixes = [' '.join(statement.split()[:3]) for statement in statements]
+    assert prefixes.count('DELETE FROM user_offered_skills') == 1
+    assert prefixes.count('INSERT INTO user_offered_skills') == 1
+    assert db.session.get(User, 1).skills_version > db.session.get(User, 2).skills_version
+
+
+def test_profile_update_syncs_skills(client, auth_headers):
+    response = client.put('/api/profile/', headers=auth_headers(4), json={
+        'bio': 'New bio', 'offered_skills': ['Graphic Design', 'Writing'], 'required_skills': ['Python']
+    })
+    assert response.status_code == 200
+    assert offered_names(4) == ['Graphic Design', 'Writing']
+    assert db.session.get(Profile, 4).offered_skills == 'Graphic Design,Writing'
+
+
+def test_profile_update_rejects_long_skill_names(client, auth_headers):
+    response = client.put('/api/profile/', headers=auth_headers(4), json={
+        'bio': 'New bio', 'offered_skills': ['Writing', LONG_NAME]
+    })
+    assert response.status_code == 400
+    assert 'at most' in response.get_json()['error']
+    db.session.expire_all()
+    assert db.session.get(Profile, 4).bio == 'Bio of user 4'
+    assert offered_names(4) == ['Graphic Design']
+
+
+def test_import_rejects_long_skill_names():
+    record = {'email': 'a@example.com', 'name': 'A', 'offered_skills': f'Python;{LONG_NAME}'}
+    assert clean_record(record) is None
+    assert clean_record({**record, 'offered_skills': 'Python'})['offered_skills'] == ['Python']
@@ -0,0 +1,81 @@
+import random
+
+from app import create_app, db
+from app.models import Skill, User
+from app.utils.skill_index import skill_index
+from app.utils.skill_typeahead import normalize, skill_typeahead
+from app.utils.user_set import UserSet
+
+from conftest import TestConfig, skill_ids
+
+
+def names(skill_ids):
+    return [skill_typeahead.names[skill_id] for skill_id in skill_ids]
+
+
+def test_complete_ranks_by_popularity(app):
+    # Graphic Design: 2 offerers + 1 requirer; Data Analysis: 1 + 1
+    assert names(skill_typeahead.complete('d')) == ['Graphic Design', 'Data Analysis', 'Web Development']
+    assert names(skill_typeahead.complete('  WEB   dev')) == ['Web Development']
+    assert names(skill_typeahead.complete('ma', limit=1)) == ['Marketing']
+    assert skill_typeahead.complete('xyz') == []
+    assert len(skill_typeahead.complete('')) == 6
+
+
+def test_new_skills_are_inserted(app):
+    skill_typeahead.ensure_loaded()
+    user = db.session.get(User, 3)
+    user.offered_skills.append(Skill(name='Data Engineering'))
+    db.session.commit()
+    assert 'Data Engineering' in names(skill_typeahead.complete('data e'))
+
+
+def test_matches_brute_force_prefix_search(app):
+    rnd = random.Random(7)
+    words = ['data', 'dart', 'design', 'develop', 'dev', 'web', 'go', 'golang', 'graph', 'graphic']
+    skill_index.reset()
+    skill_index.skill_names = {
+        skill_id: ' '.join(rnd.choice(words) for _ in range(rnd.randint(1, 3))) for skill_id in range(1, 400)
+    }
+    skill_index.offerers = {
+        skill_id: UserSet(rnd.sample(range(1, 50), rnd.randint(0, 5))) for skill_id in skill_index.skill_names
+    }
+    skill_index.loaded_at = float('inf')
+    skill_typeahead.load()
+
+    def rank(skill_id):
+        return (-len(skill_index.offerers[skill_id]), normalize(skill_index.skill_names[skill_id]), skill_id)
+
+    for query in ['d', 'de', 'dev', 'develop', 'g', 'gr', 'graph', 'graphic d', 'web da', 'x', 'data data']:
+        expected = sorted(
+            (skill_id for skill_id, name in skill_index.skill_names.items()
+             if any(name[start:].startswith(query) for start in range(len(name))
+                    if start == 0 or name[start - 1] == ' ')),
+            key=rank
+        )[:skill_typeahead.top_k]
+        assert skill_typeahead.complete(query) == expected, query
+
+
+def test_autocomplete_endpoint(client):
+    response = client.get('/api/skills/autocomplete', query_string={'q': 'py'})
+    python, = skill_ids('Python')
+    assert response.get_json() == [{'id': python, 'name': 'Python', 'offered_count': 1, 'required_count': 2}]
+    assert client.get('/api/skills/autocomplete', query_string={'limit': 0}).status_code == 400
+
+
+def test_trie_is_built_once_serving(app):
+    class Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = app.config['SQLALCHEMY_DATABASE_URI']
+        SKILL_TYPEAHEAD_PRELOAD = True
+
+    serving = create_app(Config)
+    # Commands such as `flask db upgrade` create the app without serving it
+    result = serving.test_cli_runner().invoke(args=['check-matches'])
+    assert result.exit_code == 0, result.output
+    assert skill_typeahead._preload_thread is None
+    assert not skill_typeahead.loaded
+
+    serving.test_client().get('/api/skills')
+    skill_typeahead._preload_thread.join(timeout=10)
+    assert skill_typeahead.loaded
+    assert len(skill_typeahead.names) == 6
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from app import db
+from app.utils.user_export import export_slots, iter_batches
+
+from conftest import SEED_SKILLS
+
+
+def parse(data):
+    return [json.loads(line) for line in data.decode().splitlines()]
+
+
+@pytest.fixture
+def export_client(app, client):
+    app.config['EXPORT_TOKEN'] = 'operator-token'
+    export_slots.configure(1)
+    yield client
+    export_slots.configure(app.config['EXPORT_MAX_CONCURRENT'])
+
+
+def test_batches_carry_profiles_and_skills(app):
+    batches = list(iter_batches(db.engine, batch_size=2))
+    assert [[user['id'] for user in batch] for batch in batches] == [[1, 2], [3, 4], [5]]
+    users = [user for batch in batches for user in batch]
+    for user in users:
+        offered, required = SEED_SKILLS[user['id']]
+        assert [skill['name'] for skill in user['offered_skills']] == sorted(offered)
+        assert [skill['name'] for skill in user['required_skills']] == sorted(required)
+    assert users[1]['location'] == 'Berlin'
+    assert [user['id'] for batch in iter_batches(db.engine, after_id=3) for user in batch] == [4, 5]
+
+
+def test_endpoint_is_off_without_token(client):
+    assert client.get('/api/users/export').status_code == 404
+
+
+@pytest.mark.parametrize('headers, query, status', [
+    ({}, {}, 401), ({'Authorization': 'Bearer wrong'}, {}, 401),
+    ({'Authorization': 'Bearer operator-token'}, {'after_id': '-1'}, 400),
+])
+def test_endpoint_rejects(export_client, headers, query, status):
+    assert export_client.get('/api/users/export', headers=headers, query_string=query).status_code == status
+
+
+def test_endpoint_streams_ndjson(export_client):
+    headers = {'Authorization': 'Bearer operator-token'}
+    response = export_client.get('/api/users/export', headers=headers, query_string={'after_id': 2})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert [user['id'] for user in parse(response.get_data())] == [3, 4, 5]
+
+
+def test_endpoint_caps_concurrent_exports(export_client):
+    headers = {'Authorization': 'Bearer operator-token'}
+    streaming = export_client.get('/api/users/export', headers=headers)
+    busy = export_client.get('/api/users/export', headers=headers)
+    assert busy.status_code == 503
+    assert busy.headers['Retry-After'] == '30'
+    # Closing the first, even unread, frees its slot
+    streaming.close()
+    assert export_client.get('/api/users/export', headers=headers).status_code == 200
+
+
+def test_cli_writes_file(app, tmp_path):
+    path = tmp_path / 'users.ndjson'
+    result = app.test_cli_runner().invoke(args=['export-users', str(path), '--batch-size', '2', '--after-id', '1'])
+    assert result.exit_code == 0, result.output
+    assert [user['id'] for user in parse(path.read_bytes())] == [2, 3, 4, 5]
+    assert 'Exported 4 users (last id 5)' in result.output
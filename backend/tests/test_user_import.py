@@ -0,0 +1,102 @@
+import io
+import json
+import os
+
+import click
+import pytest
+from sqlalchemy import func, select
+
+from app import db
+from app.models import User
+from app.utils.user_import import _read_checkpoint, run_import
+from app.utils.skill_index import skill_index
+
+
+def ndjson(count, start=0):
+    return ''.join(
+        json.dumps({'email': f'import{i}@example.com', 'name': f'Imported {i}',
+                    'offered_skills': 'Python;Knitting'}) + '\n'
+        for i in range(start, start + count)
+    )
+
+
+def user_count():
+    return db.session.scalar(select(func.count()).select_from(User))
+
+
+def test_run_import_writes_a_checkpoint_per_batch(app, tmp_path):
+    checkpoint = str(tmp_path / 'users.ndjson.checkpoint')
+    seen = []
+    stats = run_import(io.StringIO(ndjson(5) + 'not json\n'), 'ndjson', batch_size=2,
+                       checkpoint_path=checkpoint, source='users.ndjson',
+                       progress=lambda stats: seen.append(stats.rows))
+
+    assert (stats.rows, stats.imported, stats.invalid) == (6, 5, 1)
+    assert seen == [2, 4, 6, 6]
+    with open(checkpoint) as f:
+        assert json.load(f) == {'source': 'users.ndjson', 'rows': 6, 'imported': 5}
+    assert user_count() == 10
+    knitting = db.session.scalar(select(User).where(User.email == 'import0@example.com'))
+    assert sorted(skill.name for skill in knitting.offered_skills) == ['Knitting', 'Python']
+
+
+def test_run_import_resumes_after_skipped_rows(app):
+    stats = run_import(io.StringIO(ndjson(6)), 'ndjson', batch_size=4, skip_rows=4)
+    assert (stats.rows, stats.imported) == (6, 2)
+    assert sorted(db.session.scalars(select(User.email).where(User.email.like('import%')))) == [
+        'import4@example.com', 'import5@example.com'
+    ]
+
+
+def test_replayed_rows_are_skipped_as_duplicates(app):
+    run_import(io.StringIO(ndjson(3)), 'ndjson')
+    stats = run_import(io.StringIO(ndjson(4)), 'ndjson')
+    assert (stats.imported, stats.duplicates) == (1, 3)
+    assert user_count() == 9
+
+
+def test_imported_skills_reach_the_indexes(app):
+    skill_index.ensure_loaded()
+    run_import(io.StringIO(ndjson(1)), 'ndjson')
+    user_id = db.session.scalar(select(User.id).where(User.email == 'import0@example.com'))
+    assert len(skill_index.offered_by(user_id)) == 2
+
+
+def test_read_checkpoint(tmp_path):
+    path = str(tmp_path / 'checkpoint')
+    assert _read_checkpoint(path, 'a.csv') == 0
+    with open(path, 'w') as f:
+        json.dump({'source': 'a.csv', 'rows': 30, 'imported': 28}, f)
+    assert _read_checkpoint(path, 'a.csv') == 30
+    with pytest.raises(click.ClickException, match='--restart'):
+        _read_checkpoint(path, 'b.csv')
+
+
+def test_cli_resumes_from_checkpoint_and_removes_it(app, tmp_path):
+    path = tmp_path / 'users.ndjson'
+    path.write_text(ndjson(10))
+    checkpoint = str(path) + '.checkpoint'
+    with open(checkpoint, 'w') as f:
+        json.dump({'source': os.path.abspath(path), 'rows': 6, 'imported': 6}, f)
+
+    result = app.test_cli_runner().invoke(args=['import-users', str(path), '--batch-size', '3'])
+    assert result.exit_code == 0, result.output
+    assert 'Resuming after row 6' in result.output
+    assert user_count() == 5 + 4
+    assert not os.path.exists(checkpoint)
+
+
+def test_cli_refuses_another_files_checkpoint(app, tmp_path):
+    path = tmp_path / 'users.ndjson'
+    path.write_text(ndjson(2))
+    with open(str(path) + '.checkpoint', 'w') as f:
+        json.dump({'source': '/elsewhere/users.ndjson', 'rows': 1}, f)
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['import-users', str(path)])
+    assert result.exit_code != 0
+    assert user_count() == 5
+
+    result = runner.invoke(args=['import-users', str(path), '--restart'])
+    assert result.exit_code == 0, result.output
+    assert user_count() == 7
@@ -0,0 +1,102 @@
+import time
+
+from sqlalchemy import insert, update
+
+from app import db
+from app.models import Profile, Skill, User
+from app.utils.user_search import FIELD_WEIGHTS, UserSearchIndex, user_search
+
+
+def search_ids(query, exclude=None):
+    return [user_id for _, user_id in user_search.search(query, exclude=exclude)]
+
+
+def test_search_ranks_name_location_and_skills(app):
+    assert search_ids('user 2') == [2]
+    assert search_ids('berlin') == [2, 4]
+    # Partial skill term through the skill-name trigrams ('dev' -> 'development')
+    assert search_ids('dev') == [1, 2]
+    assert search_ids('python', exclude=1) == [2, 4]
+    assert search_ids('nothing matches this') == []
+
+
+def test_search_reindexes_profile_and_name_changes(app):
+    user_search.ensure_loaded()
+    profile = db.session.get(Profile, 3)
+    profile.location = 'Tokyo'
+    user = db.session.get(User, 5)
+    user.name = 'Astrid'
+    db.session.commit()
+    assert search_ids('tokyo') == [3]
+    assert search_ids('paris') == [1, 5]
+    assert search_ids('astrid') == [5]
+
+
+def test_search_drops_deleted_users(app):
+    user_search.ensure_loaded()
+    db.session.delete(db.session.get(User, 2))
+    db.session.commit()
+    assert search_ids('berlin') == [4]
+
+
+def test_search_follows_skill_index_changes(app):
+    user_search.ensure_loaded()
+    user = db.session.get(User, 3)
+    user.offered_skills.append(Skill(name='Pottery'))
+    db.session.commit()
+    assert search_ids('pottery') == [3]
+
+
+def test_search_rebuild_swaps_in_fresh_dicts(app):
+    user_search.ensure_loaded()
+    old_postings = user_search.postings
+    # A Core write the hooks do not see, picked up by the rebuild
+    db.session.execute(insert(User.__table__).values(id=6, email='user6@example.com', name='Zelda',
+                                                     password_hash='!'))
+    db.session.commit()
+    assert search_ids('zelda') == []
+
+    user_search.loaded_at = time.monotonic() - user_search.max_age - 1
+    assert search_ids('zelda') == [6]
+    assert user_search.postings is not old_postings
+    # Searches still holding the old dicts are not changed under them
+    assert 'zelda' not in old_postings
+
+
+def test_rebuild_keeps_changes_committed_while_it_reads(app, monkeypatch):
+    user_search.ensure_loaded()
+    # Renamed without the session hooks noticing; applied by hand below
+    db.session.execute(update(User.__table__).where(User.id == 3).values(name='Bartholomew'))
+    db.session.commit()
+    index_user = UserSearchIndex._index_user
+
+    def stale_read(postings, vocabulary, user_tokens, user_id, name, *args):
+        if user_id == 3 and postings is not user_search.postings:
+            # The rebuild read user 3 just before the rename committed, and
+            # the rename's commit hook runs while the rebuild is still reading
+            name = 'User 3'
+            user_search.reindex_users({3})
+        index_user(postings, vocabulary, user_tokens, user_id, name, *args)
+    monkeypatch.setattr(UserSearchIndex, '_index_user', staticmethod(stale_read))
+
+    user_search.load()
+    assert search_ids('bartholomew') == [3]
+    # 'user' is left from the bio only, not from the old name
+    assert user_search.user_tokens[3]['user'] == FIELD_WEIGHTS['bio']
+
+
+def test_search_page_matches_full_ranking(app):
+    # Found by bio only, so ranked below the users named 'User N'
+    db.session.get(User, 3).name = 'Ann'
+    db.session.commit()
+    ranked = user_search.search('user', exclude=1)
+    assert [user_id for _, user_id in ranked] == [2, 4, 5, 3]
+    pages, after = [], None
+    while True:
+        total, page, more = user_search.search_page('user', 3, after=after, exclude=1)
+        assert total == 4
+        pages.append(page)
+        if not more:
+            break
+        after = page[-1]
+    assert pages == [ranked[:3], ranked[3:]]
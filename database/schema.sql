@@ -4,7 +4,24 @@ CREATE TABLE IF NOT EXISTS `users` (
   `password_hash` VARCHAR(128) NOT NULL,
   `name` VARCHAR(100) NOT NULL,
   `google_id` VARCHAR(120) UNIQUE,
-  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  `skills_updated_at` TIMESTAMP NULL DEFAULT NULL,
+  `skills_version` BIGINT NULL DEFAULT NULL,
+  INDEX `ix_users_skills_updated_at` (`skills_updated_at`),
+  INDEX `ix_users_skills_version` (`skills_version`)
+);
+
+CREATE TABLE IF NOT EXISTS `data_versions` (
+  `name` VARCHAR(50) PRIMARY KEY,
+  `version` BIGINT NOT NULL
+);
+
+INSERT IGNORE INTO `data_versions` (`name`, `version`) VALUES ('skills', 0), ('barter_cycles', 0);
+
+CREATE TABLE IF NOT EXISTS `skill_tombstones` (
+  `version` BIGINT NOT NULL,
+  `user_id` INT NOT NULL,
+  PRIMARY KEY (`version`, `user_id`)
 );
 
 CREATE TABLE IF NOT EXISTS `profiles` (
@@ -26,6 +43,7 @@ CREATE TABLE IF NOT EXISTS `user_offered_skills` (
   `user_id` INT NOT NULL,
   `skill_id` INT NOT NULL,
   PRIMARY KEY (`user_id`, `skill_id`),
+  INDEX `ix_user_offered_skills_skill_user` (`skill_id`, `user_id`),
   FOREIGN KEY (`user_id`) REFERENCES `users`(`id`),
   FOREIGN KEY (`skill_id`) REFERENCES `skills`(`id`)
 );
@@ -34,6 +52,7 @@ CREATE TABLE IF NOT EXISTS `user_required_skills` (
   `user_id` INT NOT NULL,
   `skill_id` INT NOT NULL,
   PRIMARY KEY (`user_id`, `skill_id`),
+  INDEX `ix_user_required_skills_skill_user` (`skill_id`, `user_id`),
   FOREIGN KEY (`user_id`) REFERENCES `users`(`id`),
   FOREIGN KEY (`skill_id`) REFERENCES `skills`(`id`)
 );
@@ -55,6 +74,8 @@ CREATE TABLE IF NOT EXISTS `barter_sessions` (
   `requested_skill_id` INT NOT NULL,
   `status` ENUM('pending', 'accepted', 'rejected', 'completed', 'cancelled') DEFAULT 'pending',
   `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  INDEX `ix_barter_sessions_duplicate` (`requester_id`, `provider_id`, `offered_skill_id`, `requested_skill_id`, `status`),
+  INDEX `ix_barter_sessions_provider_status` (`provider_id`, `status`),
   FOREIGN KEY (`requester_id`) REFERENCES `users`(`id`),
   FOREIGN KEY (`provider_id`) REFERENCES `users`(`id`),
   FOREIGN KEY (`offered_skill_id`) REFERENCES `skills`(`id`),
@@ -66,7 +87,10 @@ CREATE TABLE IF NOT EXISTS `messages` (
   `sender_id` INT NOT NULL,
   `receiver_id` INT NOT NULL,
   `content` TEXT NOT NULL,
+  `client_id` VARCHAR(64) NULL,
   `timestamp` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  INDEX `ix_messages_sender_receiver_timestamp` (`sender_id`, `receiver_id`, `timestamp`),
+  UNIQUE KEY `uq_messages_sender_client_id` (`sender_id`, `client_id`),
   FOREIGN KEY (`sender_id`) REFERENCES `users`(`id`),
   FOREIGN KEY (`receiver_id`) REFERENCES `users`(`id`)
 );
@@ -79,7 +103,50 @@ CREATE TABLE IF NOT EXISTS `feedback` (
   `rating` INT NOT NULL CHECK (rating >= 1 AND rating <= 5),
   `comment` TEXT,
   `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE KEY `uq_feedback_session_reviewer` (`session_id`, `reviewer_id`),
   FOREIGN KEY (`session_id`) REFERENCES `barter_sessions`(`id`),
   FOREIGN KEY (`reviewer_id`) REFERENCES `users`(`id`),
   FOREIGN KEY (`reviewee_id`) REFERENCES `users`(`id`)
 );
+
+CREATE TABLE IF NOT EXISTS `user_reputations` (
+  `user_id` INT PRIMARY KEY,
+  `rating_count` INT NOT NULL DEFAULT 0,
+  `rating_sum` INT NOT NULL DEFAULT 0,
+  `recent_ratings` VARCHAR(64) NOT NULL DEFAULT '',
+  `updated_at` TIMESTAMP NULL DEFAULT NULL,
+  FOREIGN KEY (`user_id`) REFERENCES `users`(`id`) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS `match_candidates` (
+  `user_id` INT NOT NULL,
+  `candidate_id` INT NOT NULL,
+  `score` INT NOT NULL,
+  `offered_skill_ids` TEXT NOT NULL,
+  `required_skill_ids` TEXT NOT NULL,
+  `updated_at` TIMESTAMP NULL DEFAULT NULL,
+  PRIMARY KEY (`user_id`, `candidate_id`),
+  INDEX `ix_match_candidates_candidate_id` (`candidate_id`),
+  FOREIGN KEY (`user_id`) REFERENCES `users`(`id`) ON DELETE CASCADE,
+  FOREIGN KEY (`candidate_id`) REFERENCES `users`(`id`) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS `barter_cycles` (
+  `id` INT PRIMARY KEY,
+  `generation` INT NOT NULL,
+  `length` INT NOT NULL,
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  INDEX `ix_barter_cycles_generation` (`generation`)
+);
+
+CREATE TABLE IF NOT EXISTS `barter_cycle_members` (
+  `cycle_id` INT NOT NULL,
+  `position` INT NOT NULL,
+  `user_id` INT NOT NULL,
+  `skill_id` INT NOT NULL,
+  PRIMARY KEY (`cycle_id`, `position`),
+  INDEX `ix_barter_cycle_members_user_cycle` (`user_id`, `cycle_id`),
+  FOREIGN KEY (`cycle_id`) REFERENCES `barter_cycles`(`id`),
+  FOREIGN KEY (`user_id`) REFERENCES `users`(`id`) ON DELETE CASCADE,
+  FOREIGN KEY (`skill_id`) REFERENCES `skills`(`id`)
+);
@@ -12,15 +12,17 @@ export const getSkills = async () => {
   }
 };
 
-export const getUsersBySkill = async (skillId) => {
+// One page of the users offering a skill; pass the previous page's nextCursor for the next one
+export const getUsersBySkill = async (skillId, cursor) => {
   try {
     const token = localStorage.getItem('token');
     const response = await axios.get(`${API_URL}/skills/${skillId}/users`, {
       headers: {
         'Authorization': `Bearer ${token}`
-      }
+      },
+      params: cursor ? { cursor } : {}
     });
-    return response.data;
+    return { users: response.data, nextCursor: response.headers['x-next-cursor'] || null };
   } catch (error) {
     console.error(`Error fetching users for skill ${skillId}:`, error);
     throw error;
@@ -8,9 +8,15 @@ const getAuthHeaders = (token) => ({
   'Content-Type': 'application/json'
 });
 
-export const getAllUsers = (token) => {
+// One page of users, ranked by `search` when given; pass the previous
+// response's X-Next-Cursor header (with the same search) for the next one
+export const getAllUsers = (token, cursor, search) => {
+  const params = {};
+  if (cursor) params.cursor = cursor;
+  if (search) params.search = search;
   return axios.get(API_URL, {
-    headers: getAuthHeaders(token)
+    headers: getAuthHeaders(token),
+    params
   });
 };
 
@@ -9,6 +9,8 @@ const SkillsBrowser = ({ onInitiateBarter }) => {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const [searchTerm, setSearchTerm] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     const fetchSkills = async () => {
@@ -31,8 +33,9 @@ const SkillsBrowser = ({ onInitiateBarter }) => {
     try {
       setSelectedSkill(skill);
       setLoading(true);
-      const data = await getUsersBySkill(skill.id);
-      setUsers(data);
+      const page = await getUsersBySkill(skill.id);
+      setUsers(page.users);
+      setNextCursor(page.nextCursor);
     } catch (err) {
       console.error('Error fetching users for skill:', err);
       setError('Failed to load users for this skill.');
@@ -41,6 +44,20 @@ const SkillsBrowser = ({ onInitiateBarter }) => {
     }
   };
 
+  const loadMoreUsers = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await getUsersBySkill(selectedSkill.id, nextCursor);
+      setUsers(prev => [...prev, ...page.users]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      console.error('Error fetching users for skill:', err);
+      setError('Failed to load users for this skill.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const filteredSkills = skills.filter(skill =>
     skill.name.toLowerCase().includes(searchTerm.toLowerCase())
   );
@@ -199,6 +216,17 @@ const SkillsBrowser = ({ onInitiateBarter }) => {
               </div>
             </div>
           ))}
+          {nextCursor && (
+            <div className="text-center">
+              <button
+                onClick={loadMoreUsers}
+                disabled={loadingMore}
+                className="px-4 py-2 border border-blue-600 rounded-md text-sm font-medium text-blue-600 hover:bg-blue-50 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-blue-500 disabled:opacity-50"
+              >
+                {loadingMore ? 'Loading...' : 'Load more'}
+              </button>
+            </div>
+          )}
         </div>
       )}
     </div>
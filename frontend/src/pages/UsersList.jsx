@@ -1,39 +1,70 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Link } from 'react-router-dom';
 import { getAllUsers } from '../api/users';
 
+// Wait for typing to pause before searching
+const SEARCH_DELAY_MS = 300;
+
 const UsersList = () => {
     const [users, setUsers] = useState([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState('');
     const [searchTerm, setSearchTerm] = useState('');
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
+    // Search the current results belong to; cursors are only valid for it
+    const [activeSearch, setActiveSearch] = useState('');
+    // Only the latest request may update the list
+    const requestId = useRef(0);
 
     useEffect(() => {
+        const token = localStorage.getItem('token');
+        if (!token) {
+            setError('Please log in to view users.');
+            setLoading(false);
+            return;
+        }
+        const search = searchTerm.trim();
         const fetchUsers = async () => {
+            const id = ++requestId.current;
+            // A new search starts from its first page
+            setNextCursor(null);
             try {
-                const token = localStorage.getItem('token');
-                if (!token) {
-                    setError('Please log in to view users.');
-                    setLoading(false);
-                    return;
-                }
-                const response = await getAllUsers(token);
+                const response = await getAllUsers(token, null, search);
+                if (id !== requestId.current) return;
                 setUsers(response.data);
+                setActiveSearch(search);
+                setNextCursor(response.headers['x-next-cursor'] || null);
             } catch (err) {
+                if (id !== requestId.current) return;
                 setError('Failed to fetch users. Please try again later.');
                 console.error('Error fetching users:', err);
             } finally {
-                setLoading(false);
+                if (id === requestId.current) setLoading(false);
             }
         };
 
-        fetchUsers();
-    }, []);
+        // The first page loads at once; searches start once typing pauses
+        const timer = setTimeout(fetchUsers, loading ? 0 : SEARCH_DELAY_MS);
+        return () => clearTimeout(timer);
+        // eslint-disable-next-line react-hooks/exhaustive-deps
+    }, [searchTerm]);
 
-    const filteredUsers = users.filter(user => 
-        user.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        (user.bio && user.bio.toLowerCase().includes(searchTerm.toLowerCase()))
-    );
+    const loadMore = async () => {
+        const id = requestId.current;
+        setLoadingMore(true);
+        try {
+            const response = await getAllUsers(localStorage.getItem('token'), nextCursor, activeSearch);
+            if (id !== requestId.current) return;
+            setUsers(prev => [...prev, ...response.data]);
+            setNextCursor(response.headers['x-next-cursor'] || null);
+        } catch (err) {
+            setError('Failed to fetch users. Please try again later.');
+            console.error('Error fetching users:', err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
 
     if (loading) {
         return (
@@ -70,7 +101,7 @@ const UsersList = () => {
                         <input
                             type="text"
                             className="block w-full pl-10 pr-3 py-3 border border-gray-300 rounded-lg bg-white shadow-sm focus:outline-none focus:ring-2 focus:ring-purple-500 focus:border-transparent"
-                            placeholder="Search by name or bio..."
+                            placeholder="Search by name, bio, location or skill..."
                             value={searchTerm}
                             onChange={(e) => setSearchTerm(e.target.value)}
                         />
@@ -79,8 +110,8 @@ const UsersList = () => {
 
                 {/* Users Grid */}
                 <div className="grid grid-cols-1 gap-6 sm:grid-cols-2 lg:grid-cols-3">
-                    {filteredUsers.length > 0 ? (
-                        filteredUsers.map(user => (
+                    {users.length > 0 ? (
+                        users.map(user => (
                             <div key={user.id} className="bg-white overflow-hidden shadow rounded-lg">
                                 <div className="px-4 py-5 sm:p-6">
                                     <div className="flex items-center">
@@ -199,6 +230,18 @@ const UsersList = () => {
                         </div>
                     )}
                 </div>
+
+                {nextCursor && (
+                    <div className="mt-8 text-center">
+                        <button
+                            onClick={loadMore}
+                            disabled={loadingMore}
+                            className="px-6 py-2 border border-purple-600 rounded-md text-sm font-medium text-purple-600 hover:bg-purple-50 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-purple-500 disabled:opacity-50"
+                        >
+                            {loadingMore ? 'Loading...' : 'Load more'}
+                        </button>
+                    </div>
+                )}
             </div>
         </div>
     );